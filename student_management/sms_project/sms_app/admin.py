@@ -1,7 +1,17 @@
 from django.contrib import admin
-from .models import ClassInformation, Student, Course, Score
+from .models import (
+    ClassInformation, Student, Course, Score, Job, ImportCheckpoint, DataVersion, GradingScheme,
+    StudentSummary, Snapshot, Tombstone,
+)
 
 admin.site.register(ClassInformation)
 admin.site.register(Student)
 admin.site.register(Course)
-admin.site.register(Score)
\ No newline at end of file
+admin.site.register(Score)
+admin.site.register(Job)
+admin.site.register(ImportCheckpoint)
+admin.site.register(DataVersion)
+admin.site.register(GradingScheme)
+admin.site.register(StudentSummary)
+admin.site.register(Snapshot)
+admin.site.register(Tombstone)
@@ -0,0 +1,221 @@
+"""
+带统计的缓存后端。
+
+InstrumentedCache 包装 settings.CACHES 中 OPTIONS['TARGET'] 指定的实际后端
+（Redis、文件缓存等），所有调用原样转发，同时按缓存键前缀（第一个冒号之前的部分）
+统计命中、未命中、写入、删除次数和耗时。
+
+统计数据保存在当前进程内；多进程部署时每个进程分别统计，
+通过 ``/api/cache/metrics/`` 查看处理该请求的进程的数据。
+
+AtomicFileBasedCache 是未配置 Redis 时使用的文件缓存，add() 在同一台机器的进程之间是原子的。
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+
+class CacheMetrics:
+    """按缓存键前缀累计的调用统计，线程安全。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes = {}
+
+    @staticmethod
+    def prefix(key):
+        """缓存键的前缀，如 ``course_stats:01`` 的前缀为 ``course_stats``"""
+        return str(key).split(':', 1)[0]
+
+    def record(self, key, operation, elapsed, hits=0, misses=0):
+        """
+        记录一次缓存调用。
+
+        参数:
+            key (str): 缓存键，按前缀归类。
+            operation (str): 调用类型，get / set / delete 等。
+            elapsed (float): 耗时（秒）。
+            hits (int): 命中的键数。
+            misses (int): 未命中的键数。
+        """
+        with self._lock:
+            counters = self._prefixes.setdefault(self.prefix(key), {
+                'hits': 0, 'misses': 0, 'calls': {}, 'total_seconds': 0.0, 'max_seconds': 0.0,
+            })
+            counters['hits'] += hits
+            counters['misses'] += misses
+            counters['calls'][operation] = counters['calls'].get(operation, 0) + 1
+            counters['total_seconds'] += elapsed
+            counters['max_seconds'] = max(counters['max_seconds'], elapsed)
+
+    def snapshot(self):
+        """
+        返回当前统计数据。
+
+        返回:
+            dict: 前缀到 hits、misses、hit_rate、calls、avg_ms、max_ms 的字典。
+        """
+        with self._lock:
+            result = {}
+            for prefix, counters in sorted(self._prefixes.items()):
+                lookups = counters['hits'] + counters['misses']
+                calls = sum(counters['calls'].values())
+                result[prefix] = {
+                    'hits': counters['hits'],
+                    'misses': counters['misses'],
+                    'hit_rate': round(counters['hits'] / lookups, 4) if lookups else None,
+                    'calls': dict(counters['calls']),
+                    'avg_ms': round(counters['total_seconds'] / calls * 1000, 3),
+                    'max_ms': round(counters['max_seconds'] * 1000, 3),
+                }
+            return result
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self._prefixes.clear()
+
+
+# 进程内所有 InstrumentedCache 实例（Django 为每个线程创建一个）共用的统计
+metrics = CacheMetrics()
+
+
+class InstrumentedCache(BaseCache):
+    """
+    转发到实际后端并记录统计的缓存后端。
+
+    配置示例:
+        CACHES = {
+            'default': {
+                'BACKEND': 'sms_app.cache_backends.InstrumentedCache',
+                'OPTIONS': {
+                    'TARGET': {
+                        'BACKEND': 'django_redis.cache.RedisCache',
+                        'LOCATION': 'redis://127.0.0.1:6379/1',
+                    },
+                },
+            }
+        }
+
+    TARGET 的写法与 CACHES 中的一项相同；键前缀、版本和超时由实际后端处理。
+    """
+
+    def __init__(self, location, params):
+        super().__init__({})
+        target = dict(params.get('OPTIONS', {})['TARGET'])
+        backend = target.pop('BACKEND')
+        self.backend_name = backend
+        self._cache = import_string(backend)(target.pop('LOCATION', ''), target)
+
+    @contextmanager
+    def _timed(self, key, operation, **counts):
+        started = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            metrics.record(key, operation, time.perf_counter() - started, **counts)
+
+    def get(self, key, default=None, version=None):
+        with self._timed(key, 'get') as counts:
+            value = self._cache.get(key, _MISSING, version=version)
+            hit = value is not _MISSING
+            counts['hits' if hit else 'misses'] = 1
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with self._timed(keys[0] if keys else '', 'get_many') as counts:
+            values = self._cache.get_many(keys, version=version)
+            counts['hits'] = len(values)
+            counts['misses'] = len(keys) - len(values)
+        return values
+
+    def has_key(self, key, version=None):
+        with self._timed(key, 'has_key'):
+            return self._cache.has_key(key, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._timed(key, 'add'):
+            return self._cache.add(key, value, timeout=timeout, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._timed(key, 'set'):
+            return self._cache.set(key, value, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._timed(next(iter(data), ''), 'set_many'):
+            return self._cache.set_many(data, timeout=timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._timed(key, 'touch'):
+            return self._cache.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        with self._timed(key, 'delete'):
+            return self._cache.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        with self._timed(keys[0] if keys else '', 'delete_many'):
+            return self._cache.delete_many(keys, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._timed(key, 'incr'):
+            return self._cache.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        with self._timed(key, 'decr'):
+            return self._cache.decr(key, delta, version=version)
+
+    def clear(self):
+        return self._cache.clear()
+
+    def close(self, **kwargs):
+        return self._cache.close(**kwargs)
+
+
+class AtomicFileBasedCache(FileBasedCache):
+    """
+    add() 为原子操作的文件缓存。
+
+    FileBasedCache.add() 先 has_key 再 set，多个进程同时调用时可能都返回 True，
+    caching 模块用 add() 实现的重新计算锁因此失效。这里在缓存目录中的锁文件上加排他文件锁
+    （POSIX 上为 flock），使同一台机器上所有进程和线程的 add() 依次执行。
+    文件锁不能跨机器，多台机器部署时必须配置 REDIS_URL。
+    """
+
+    # 锁文件不以缓存文件后缀结尾，不会被淘汰或 clear() 删除
+    LOCK_FILE = 'add.lock'
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        with open(os.path.join(self._dir, self.LOCK_FILE), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                return super().add(key, value, timeout, version)
+            finally:
+                locks.unlock(lock_file)
+
+
+def cache_metrics():
+    """
+    返回当前进程的缓存统计。
+
+    返回:
+        dict: 包含进程号、实际后端和按前缀统计的数据。
+    """
+    backend = caches['default']
+    return {
+        'pid': os.getpid(),
+        'backend': getattr(backend, 'backend_name', f'{type(backend).__module__}.{type(backend).__name__}'),
+        'prefixes': metrics.snapshot(),
+    }
@@ -0,0 +1,174 @@
+"""
+按数据版本失效的缓存。
+
+Student、ClassInformation、Course、Score 每次写入都会递增各自模型的数据版本号
+（单条写入由 signals 模块处理，批量写入由 VersionedQuerySet 处理）。
+缓存值记录生成时所依赖模型的版本号，任一依赖的数据变化后即被视为过期，
+无需在视图中手动删除缓存，管理后台、批量导入和 shell 中的写入同样生效。
+过期后的重新计算只由一个请求执行，其他请求返回旧值或等待结果（见 get_or_refresh）；
+这依赖缓存后端原子的 add()，多台机器部署时需要使用 Redis（见 settings 中的 CACHES）。
+
+用法:
+    stats = get_or_compute('dashboard_stats', (Student, Score), compute_stats)
+"""
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+from .models import DataVersion
+
+# 默认缓存有效时间（秒），数据版本变化时不等超时即重新计算
+DEFAULT_TIMEOUT = 300
+
+# 过期后仍可作为旧值返回的时间（秒），其间只有一个请求重新计算
+STALE_TIMEOUT = 300
+
+# 提前刷新的强度（XFetch 算法中的 beta），越大越早开始刷新，0 表示不提前
+EARLY_REFRESH_BETA = 1.0
+
+# 重新计算锁的超时（秒），持有锁的进程异常退出后锁自动释放
+LOCK_TIMEOUT = 30
+
+# 没有旧值可返回时，等待其他请求计算完成的最长时间和轮询间隔（秒）
+WAIT_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def dependency_versions(depends_on):
+    """
+    用一条查询获取多个模型的当前数据版本号。
+
+    参数:
+        depends_on (iterable): 模型类。
+
+    返回:
+        tuple: 与 depends_on 顺序一致的版本号，从未写入过的模型为 0。
+    """
+    names = [DataVersion.model_key(model) for model in depends_on]
+    versions = dict(DataVersion.objects.filter(Name__in=names).values_list('Name', 'Version'))
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def single_flight(key, compute, ready):
+    """
+    同一时间只允许一个调用方执行 compute，其余调用方等待其结果。
+
+    锁通过 cache.add 获取，只在 add() 为原子操作的共享后端上对所有进程有效：
+    Redis 对所有机器上的进程有效，默认的文件缓存（AtomicFileBasedCache，加文件锁）只对同一台机器上的进程有效。
+
+    参数:
+        key (str): 锁的名称。
+        compute (callable): 无参数，执行计算并保存结果，返回结果。
+        ready (callable): 无参数，返回已保存的结果，尚未就绪时返回 None。
+
+    返回:
+        compute 或 ready 的返回值；等待超时或持锁方失败时由当前调用方自行计算。
+    """
+    lock_key = f'{key}:lock'
+    # 只有一个调用方的 add 返回 True，见上面对缓存后端的要求
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return compute()
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        result = ready()
+        if result is not None:
+            return result
+        if cache.get(lock_key) is None:
+            # 持锁方已结束但没有结果（计算失败），不再等待
+            break
+    result = ready()
+    return result if result is not None else compute()
+
+
+def _store(key, compute, version, timeout, stale_timeout):
+    started = time.monotonic()
+    value = compute()
+    entry = {
+        'value': value,
+        'version': version,
+        'expires': time.time() + timeout,
+        # 计算耗时，耗时越长越早开始提前刷新
+        'delta': time.monotonic() - started,
+    }
+    cache.set(key, entry, timeout + stale_timeout)
+    return entry
+
+
+def _needs_refresh(entry, version, beta):
+    if entry['version'] != version:
+        return True
+    # XFetch：临近过期时以逐渐增大的概率提前刷新，避免大量请求在同一时刻遇到过期
+    early = -entry['delta'] * beta * math.log(1.0 - random.random())
+    return time.time() + early >= entry['expires']
+
+
+def get_or_refresh(key, compute, version=None, timeout=DEFAULT_TIMEOUT,
+                   stale_timeout=STALE_TIMEOUT, beta=EARLY_REFRESH_BETA):
+    """
+    读取缓存的汇总数据，带防击穿保护。
+
+    - 缓存有效时直接返回；
+    - 已过期、即将过期（按概率提前刷新）或版本已变化时，只有取得锁的一个请求重新计算，
+      其他请求在计算期间继续返回旧值；
+    - 完全没有旧值时，其他请求等待取得锁的请求计算完成，而不是同时计算。
+
+    参数:
+        key (str): 缓存键，不包含版本号；旧值在版本变化后仍可在重新计算期间返回。
+        compute (callable): 无参数，返回需要缓存的值（应为可序列化的普通数据）。
+        version: 可比较的数据版本，与缓存值的版本不同即需要重新计算。
+        timeout (int): 缓存有效时间（秒）。
+        stale_timeout (int): 过期后仍可作为旧值返回的时间（秒）。
+        beta (float): 提前刷新的强度，0 表示不提前。
+
+    返回:
+        缓存的值、旧值或新计算的值。
+    """
+    entry = cache.get(key)
+    if entry is not None and not _needs_refresh(entry, version, beta):
+        return entry['value']
+
+    def refresh():
+        return _store(key, compute, version, timeout, stale_timeout)
+
+    if entry is not None:
+        # 与 single_flight 使用同一个锁，只有一个请求取得锁
+        if cache.add(f'{key}:lock', 1, LOCK_TIMEOUT):
+            try:
+                return refresh()['value']
+            finally:
+                cache.delete(f'{key}:lock')
+        # 其他请求正在重新计算，先返回旧值
+        return entry['value']
+
+    def ready():
+        current = cache.get(key)
+        if current is not None and current['version'] == version:
+            return current
+        return None
+
+    return single_flight(key, refresh, ready)['value']
+
+
+def get_or_compute(key, depends_on, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    读取按依赖模型版本缓存的值，不存在或已失效时计算并缓存（带防击穿保护，见 get_or_refresh）。
+
+    版本号在计算之前读取：计算期间发生的写入会递增版本号，下次读取时重新计算，不会长期返回旧数据。
+
+    参数:
+        key (str): 缓存名称。
+        depends_on (iterable): 缓存值依赖的模型类。
+        compute (callable): 无参数，返回需要缓存的值（应为可序列化的普通数据）。
+        timeout (int): 缓存时间（秒）。
+
+    返回:
+        缓存的值、重新计算期间的旧值或新计算的值。
+    """
+    return get_or_refresh(key, compute, version=dependency_versions(depends_on), timeout=timeout)
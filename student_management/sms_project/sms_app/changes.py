@@ -0,0 +1,236 @@
+"""
+增量同步。
+
+下游系统用上一次同步返回的 token 请求之后发生的变化，不再每晚拉取全量导出：
+
+    GET /api/v1/changes/?since=<token>&resources=students,scores
+
+响应为按块输出的 NDJSON，每行一个 JSON 对象：
+
+    {"resource": "scores", "op": "delete", "id": "42"}         删除（来自 Tombstone 删除记录）
+    {"resource": "students", "op": "upsert", "data": {...}}    新增或修改
+    {"next_token": "..."}                                      最后一行，下次同步使用
+
+变化按各模型 (UpdatedAt, 主键) 上的键集分批读取（批量写入同样会更新 UpdatedAt，见 VersionedQuerySet）；
+删除记录先于变化输出（子表在前），变化按父表在前的顺序输出，依次应用即可。
+不带 since 时返回全部数据，用于首次同步。
+
+不遗漏的保证：UpdatedAt 和 DeletedAt 在事务中写入时取当时的时间，事务提交前其他连接看不到这些行。
+token 的截止时间因此取
+    现在 - CHANGES_SETTLE_SECONDS - 最早的未提交写事务已持续的时间，
+截止时间之后的变化留到下次同步。等待时间用于覆盖应用服务器之间的时钟偏差，以及取得时间到
+语句执行之间的间隔；未提交写事务的持续时间（MySQL 查询 information_schema.innodb_trx，
+需要 PROCESS 权限）覆盖长事务，例如在一个事务中重新计算整个方案的成绩。
+其他数据库无法查询其他连接的事务，只使用等待时间：超过 CHANGES_SETTLE_SECONDS 才提交的事务
+写入的行可能被遗漏，生产环境应使用 MySQL 或调大等待时间。
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError, connection as default_connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Tombstone
+from .pagination import KeysetPaginator
+from .responses import dumps
+from .rest_api import RESOURCES
+
+logger = logging.getLogger(__name__)
+
+# 变化的输出顺序：父表在前；删除记录按相反顺序输出
+SYNC_ORDER = ('classes', 'courses', 'students', 'scores')
+
+# 每次查询读取和每块输出的行数
+CHUNK_SIZE = 2000
+
+# 默认只返回多少秒之前的变化，可通过 settings.CHANGES_SETTLE_SECONDS 修改
+DEFAULT_SETTLE_SECONDS = 5
+
+# 删除记录保留天数，更早的 token 无法增量同步，需要重新全量同步
+TOMBSTONE_RETENTION_DAYS = 30
+
+# 查询其他连接中最早的、已写入数据但尚未提交的事务已持续的秒数，没有时结果为 NULL
+OPEN_WRITE_AGE_SQL = {
+    'mysql': (
+        'SELECT TIMESTAMPDIFF(MICROSECOND, MIN(trx_started), NOW(6)) / 1000000 '
+        'FROM information_schema.innodb_trx '
+        'WHERE trx_rows_modified > 0 AND trx_mysql_thread_id <> CONNECTION_ID()'
+    ),
+}
+
+_SALT = 'sms_app.changes'
+
+
+class TokenExpired(ValueError):
+    """token 早于删除记录的保留期限，需要重新全量同步。"""
+
+
+def resource_name(model):
+    """模型对应的资源名称，不参与同步的模型返回 None"""
+    for name, resource in RESOURCES.items():
+        if resource.model is model:
+            return name
+    return None
+
+
+def record_deletion(instance):
+    """
+    为被删除的对象写入删除记录。
+
+    参数:
+        instance (Model): 已删除的班级、学生、课程或成绩。
+    """
+    name = resource_name(type(instance))
+    if name is not None:
+        Tombstone.objects.create(Resource=name, ObjectID=str(instance.pk))
+
+
+def prune_tombstones():
+    """
+    删除超过保留期限的删除记录。
+
+    返回:
+        int: 删除的记录数。
+    """
+    deleted, _counts = Tombstone.objects.filter(
+        DeletedAt__lt=timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    ).delete()
+    return deleted
+
+
+def make_token(until):
+    """将同步截止时间编码为签名的 token"""
+    return signing.dumps({'t': until.isoformat()}, salt=_SALT)
+
+
+def parse_token(token):
+    """
+    解析 token。
+
+    返回:
+        datetime: 上次同步的截止时间。
+
+    异常:
+        ValueError: token 无效。
+        TokenExpired: token 早于删除记录的保留期限。
+    """
+    try:
+        since = parse_datetime(signing.loads(token, salt=_SALT)['t'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise ValueError('无效的同步 token')
+    if since is None:
+        raise ValueError('无效的同步 token')
+    if since < timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise TokenExpired('同步 token 已过期，请不带 since 参数重新全量同步')
+    return since
+
+
+def oldest_open_write_age(connection=None):
+    """
+    查询其他连接中最早的未提交写事务已持续的时间。
+
+    参数:
+        connection: 可选的数据库连接，默认使用 default 连接。
+
+    返回:
+        float: 秒数；没有未提交的写事务、数据库不支持或没有查询权限时为 0。
+    """
+    connection = connection or default_connection
+    sql = OPEN_WRITE_AGE_SQL.get(connection.vendor)
+    if sql is None:
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            row = cursor.fetchone()
+    except DatabaseError as e:
+        logger.warning(f"Cannot read open transactions, relying on the settle window only: {e}")
+        return 0.0
+    return float(row[0] or 0) if row else 0.0
+
+
+def sync_until(since=None):
+    """
+    本次同步的截止时间，见模块说明。
+
+    参数:
+        since (datetime): 上次同步的截止时间，截止时间不会早于它。
+
+    返回:
+        datetime: 截止时间。
+    """
+    settle = getattr(settings, 'CHANGES_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+    until = timezone.now() - timedelta(seconds=settle + oldest_open_write_age())
+    if since is not None and until < since:
+        until = since
+    return until
+
+
+def sync_fields(resource):
+    """
+    同步的字段：只包含资源自身表中的列。
+
+    关联表的名称（如成绩中的学生姓名）在关联对象修改时不会更新本表的 UpdatedAt，
+    不参与同步，下游系统通过关联编号从对应资源获取。
+    """
+    return [field for field, path in resource.fields.items() if '__' not in path]
+
+
+def iter_changes(since, until, resources):
+    """
+    按顺序生成变化。
+
+    参数:
+        since (datetime): 上次同步的截止时间，为 None 时返回全部数据。
+        until (datetime): 本次同步的截止时间。
+        resources (iterable): 需要同步的资源名称。
+
+    返回:
+        generator: 每项为一行 NDJSON 对应的字典，最后一项包含 next_token。
+    """
+    names = [name for name in SYNC_ORDER if name in resources]
+    if since is not None:
+        for name in reversed(names):
+            tombstones = Tombstone.objects.filter(
+                Resource=name, DeletedAt__gt=since, DeletedAt__lte=until
+            ).values('DeletedAt', 'id', 'ObjectID')
+            for batch in KeysetPaginator(tombstones, CHUNK_SIZE, ('DeletedAt', 'pk')).batches():
+                for tombstone in batch:
+                    yield {'resource': name, 'op': 'delete', 'id': tombstone['ObjectID']}
+    for name in names:
+        resource = RESOURCES[name]
+        fields = sync_fields(resource)
+        pk_name = resource.model._meta.pk.name
+        # 分页键以模型字段名为键，输出时只保留同步的字段
+        rows = resource.values('UpdatedAt', pk_name, fields=fields).filter(UpdatedAt__lte=until)
+        if since is not None:
+            rows = rows.filter(UpdatedAt__gt=since)
+        for batch in KeysetPaginator(rows, CHUNK_SIZE, ('UpdatedAt', pk_name)).batches():
+            for row in batch:
+                yield {'resource': name, 'op': 'upsert', 'data': {field: row[field] for field in fields}}
+    yield {'next_token': make_token(until)}
+
+
+def stream_changes(since, resources):
+    """
+    以 NDJSON 块输出 since 之后的变化。
+
+    参数:
+        since (datetime): 上次同步的截止时间，为 None 时返回全部数据。
+        resources (iterable): 需要同步的资源名称。
+
+    返回:
+        generator: 每项为最多 CHUNK_SIZE 行的字节串。
+    """
+    until = sync_until(since)
+    lines = []
+    for change in iter_changes(since, until, resources):
+        lines.append(dumps(change))
+        if len(lines) >= CHUNK_SIZE:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
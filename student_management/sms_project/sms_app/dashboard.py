@@ -0,0 +1,133 @@
+"""
+仪表盘统计快照。
+
+快照由 values() 查询（连同所需的关联字段）得到的字典和列表组成，生成时已全部求值，
+渲染模板不会再查询数据库。快照保存在 Snapshot 表中：
+数据变化后读取请求先返回旧快照并提交一个刷新任务，由 run_jobs 工作进程在后台重新生成，
+只有从未生成过快照时才在请求中同步计算一次，并发请求只计算一次。
+"""
+import logging
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F
+from django.utils.dateparse import parse_datetime
+
+from .caching import dependency_versions, single_flight
+from .models import ClassInformation, Course, Job, Score, Snapshot, Student
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_SNAPSHOT = 'dashboard'
+
+# 仪表盘统计依赖的模型，任一模型的数据版本变化后快照过期
+DASHBOARD_DEPENDS_ON = (Student, ClassInformation, Course, Score)
+
+# 最近添加的学生和成绩显示条数
+RECENT_LIMIT = 5
+
+# 快照过期后提交刷新任务的最短间隔（秒）
+REFRESH_REQUEST_KEY = 'dashboard:refresh_requested'
+REFRESH_REQUEST_INTERVAL = 10
+
+
+def build_snapshot():
+    """
+    从数据库查询仪表盘统计数据。
+
+    返回:
+        dict: 只包含数值、字符串、时间、字典和列表的统计数据。
+    """
+    return {
+        'total_students': Student.objects.count(),
+        'total_classes': ClassInformation.objects.count(),
+        'total_courses': Course.objects.count(),
+        'recent_students': list(
+            Student.objects.order_by('-CreatedAt')
+            .values('StudentID', 'Name', 'CreatedAt', class_name=F('Class__ClassName'))[:RECENT_LIMIT]
+        ),
+        'recent_scores': list(
+            Score.objects.order_by('-CreatedAt')
+            .values(
+                'TotalGrade', 'CreatedAt',
+                student_name=F('Student__Name'), course_name=F('Course__CourseName'),
+            )[:RECENT_LIMIT]
+        ),
+        'average_scores': Score.objects.aggregate(
+            avg_regular=Avg('RegularGrade'),
+            avg_midterm=Avg('MidtermGrade'),
+            avg_final=Avg('FinalGrade'),
+            avg_total=Avg('TotalGrade')
+        ),
+        'class_distribution': list(
+            ClassInformation.objects.annotate(student_count=Count('student'))
+            .values('ClassName', 'student_count')
+        ),
+    }
+
+
+def _versions_tag():
+    return '.'.join(map(str, dependency_versions(DASHBOARD_DEPENDS_ON)))
+
+
+def refresh_snapshot():
+    """
+    重新生成并保存仪表盘快照。
+
+    版本号在查询之前读取：生成期间发生的写入会使快照再次过期，下次读取时重新刷新。
+
+    返回:
+        Snapshot: 保存后的快照。
+    """
+    versions = _versions_tag()
+    snapshot, _created = Snapshot.objects.update_or_create(
+        Name=DASHBOARD_SNAPSHOT,
+        defaults={'Data': build_snapshot(), 'Versions': versions},
+    )
+    logger.info(f"Dashboard snapshot refreshed at versions {versions}")
+    return snapshot
+
+
+def request_refresh():
+    """
+    提交后台刷新任务，已有等待中的刷新任务时不重复提交。
+
+    返回:
+        bool: 是否提交了新任务。
+    """
+    # 过期期间每个请求都会调用，先用缓存锁限制检查频率，再确认数据库中没有等待中的任务
+    if not cache.add(REFRESH_REQUEST_KEY, 1, REFRESH_REQUEST_INTERVAL):
+        return False
+    if Job.objects.filter(Kind=Job.KIND_DASHBOARD, Status=Job.STATUS_PENDING).exists():
+        return False
+    Job.objects.create(Kind=Job.KIND_DASHBOARD)
+    return True
+
+
+def _load_snapshot():
+    return Snapshot.objects.filter(Name=DASHBOARD_SNAPSHOT).first()
+
+
+def get_snapshot():
+    """
+    读取仪表盘快照，过期时返回旧数据并在后台刷新。
+
+    返回:
+        dict: 统计数据，另含 snapshot_built_at（生成时间）和 snapshot_stale（是否正在等待刷新）。
+    """
+    snapshot = _load_snapshot()
+    stale = False
+    if snapshot is None:
+        # 从未生成过快照时只由一个请求同步生成，其余请求等待结果
+        snapshot = single_flight(f'{DASHBOARD_SNAPSHOT}:build', refresh_snapshot, _load_snapshot)
+        # 重新读取，使时间等字段与从数据库读取的快照格式一致
+        snapshot.refresh_from_db()
+    elif snapshot.Versions != _versions_tag():
+        stale = True
+        request_refresh()
+
+    data = snapshot.Data
+    # JSON 中的时间为字符串，还原为 datetime 以便模板格式化
+    for row in data['recent_students'] + data['recent_scores']:
+        row['CreatedAt'] = parse_datetime(row['CreatedAt'])
+    data.update(snapshot_built_at=snapshot.BuiltAt, snapshot_stale=stale)
+    return data
@@ -0,0 +1,193 @@
+"""
+导出文件缓存。
+
+同样的导出（相同筛选条件、导出列和格式）在数据没有变化时会被多人反复下载，
+这里把生成的文件保存在磁盘上，以 (导出参数, 数据版本号) 作为键：
+数据变化后版本号递增，旧文件不再命中，随后按最近使用时间 (LRU) 被淘汰。
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+from .models import DataVersion
+
+logger = logging.getLogger(__name__)
+
+
+class ExportCache:
+    """
+    按总大小限制的导出文件磁盘缓存。
+
+    文件先写入同目录下的临时文件，生成完成且数据版本未变化时再原子地重命名为缓存文件，
+    并发请求不会读到写了一半的文件。命中时更新文件的修改时间，淘汰时删除修改时间最早的文件。
+    重命名和删除前都会先关闭文件（Windows 上不能重命名或删除仍在打开的文件）。
+
+    属性:
+        directory (str): 缓存目录。
+        max_bytes (int): 缓存文件总大小上限。
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = str(directory or settings.EXPORT_CACHE_DIR)
+        self.max_bytes = settings.EXPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    @staticmethod
+    def make_key(fmt, filters, columns, version):
+        """
+        计算缓存键，同时用作 ETag。
+
+        参数:
+            fmt (str): 文件格式，xlsx 或 csv。
+            filters (dict): 筛选条件。
+            columns (list): 导出列，None 表示全部列。
+            version (int): 成绩数据版本号。
+
+        返回:
+            str: 十六进制摘要。
+        """
+        payload = json.dumps(
+            {'format': fmt, 'filters': filters, 'columns': columns, 'version': version},
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, f'{key}.{fmt}')
+
+    def get(self, key, fmt):
+        """
+        查找缓存文件，命中时更新其最近使用时间。
+
+        返回:
+            str: 缓存文件路径；未命中时返回 None。
+        """
+        path = self.path(key, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def build(self, key, fmt, version, write):
+        """
+        生成并缓存导出文件。
+
+        参数:
+            key (str): 缓存键。
+            fmt (str): 文件格式。
+            version (int): 生成时读取的数据版本号。
+            write (callable): 以可写二进制文件为参数，向其中写入导出内容。
+
+        返回:
+            file: 以二进制只读方式打开的导出文件，由调用方负责关闭。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                write(output)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        path = self._commit(tmp_path, key, fmt, version)
+        if path is None:
+            # 文件不放入缓存，复制到匿名临时文件返回本次结果
+            output = tempfile.TemporaryFile()
+            with open(tmp_path, 'rb') as source:
+                shutil.copyfileobj(source, output)
+            os.unlink(tmp_path)
+            output.seek(0)
+            return output
+        # 先打开再淘汰，即使新文件本身超过总大小上限也能返回给本次请求
+        output = open(path, 'rb')
+        self.evict()
+        return output
+
+    def tee(self, key, fmt, version, chunks):
+        """
+        一边向客户端输出文本片段一边写入缓存，适用于 StreamingHttpResponse。
+
+        客户端中途断开时生成器被关闭，临时文件随之删除，不会留下不完整的缓存。
+
+        参数:
+            key (str): 缓存键。
+            fmt (str): 文件格式。
+            version (int): 生成时读取的数据版本号。
+            chunks (iterable): 文本片段。
+
+        返回:
+            generator: 原样产生 chunks 中的片段。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk.encode('utf-8'))
+                    yield chunk
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self._commit(tmp_path, key, fmt, version) is None:
+            os.unlink(tmp_path)
+        else:
+            self.evict()
+
+    def _commit(self, tmp_path, key, fmt, version):
+        """
+        将已关闭的临时文件移入缓存。
+
+        返回:
+            str: 缓存文件路径；生成期间数据发生了变化时返回 None，临时文件由调用方删除。
+        """
+        # 生成期间数据发生了变化时，文件内容可能混合了新旧数据，不放入缓存
+        if DataVersion.current(DataVersion.SCORES)[0] != version:
+            return None
+        path = self.path(key, fmt)
+        try:
+            os.replace(tmp_path, path)
+        except PermissionError:
+            # Windows 上同一缓存文件正被其他请求下载时不能覆盖，内容相同，直接使用已有文件
+            if not os.path.exists(path):
+                raise
+            os.unlink(tmp_path)
+        return path
+
+    def evict(self):
+        """
+        删除最久未使用的缓存文件，直到总大小不超过上限。
+
+        返回:
+            int: 删除的文件数。
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.endswith('.tmp'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        removed = 0
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # Windows 上正在被下载的文件不能删除，留到下次淘汰
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached export files")
+        return removed
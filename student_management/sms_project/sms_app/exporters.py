@@ -0,0 +1,144 @@
+"""
+成绩导出。
+
+导出逻辑与视图分离，以便同步下载和后台任务 (run_jobs) 共用。
+"""
+import csv
+import io
+
+from openpyxl import Workbook
+
+from .models import Score
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+
+# 可导出的列：参数名 -> (表头, 查询字段)
+EXPORT_COLUMNS = {
+    'student_id': ('学号', 'Student__StudentID'),
+    'name': ('姓名', 'Student__Name'),
+    'course_id': ('课程编号', 'Course__CourseID'),
+    'course_name': ('课程名称', 'Course__CourseName'),
+    'regular_grade': ('平时成绩', 'RegularGrade'),
+    'midterm_grade': ('期中成绩', 'MidtermGrade'),
+    'final_grade': ('期末成绩', 'FinalGrade'),
+    'total_grade': ('总成绩', 'TotalGrade'),
+    'grade_level': ('等级', 'GradeLevel'),
+}
+
+# 每次查询读取的成绩条数
+EXPORT_CHUNK_SIZE = 2000
+
+
+def parse_export_columns(values):
+    """
+    解析请求中的导出列参数。
+
+    参数:
+        values (list): ``request.GET.getlist('columns')``，每一项可以是逗号分隔的多个列名。
+
+    返回:
+        list: 按请求顺序去重后的列名；未指定时返回 None 表示导出全部列。
+
+    异常:
+        ValueError: 包含无法识别的列名时抛出。
+    """
+    columns = []
+    for value in values:
+        for name in value.split(','):
+            name = name.strip()
+            if not name or name in columns:
+                continue
+            if name not in EXPORT_COLUMNS:
+                raise ValueError(f'未知的导出列：{name}')
+            columns.append(name)
+    return columns or None
+
+
+def export_header(columns=None):
+    """返回所选导出列的表头。"""
+    return [EXPORT_COLUMNS[name][0] for name in columns or EXPORT_COLUMNS]
+
+
+def iter_score_batches(queryset=None, columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    按主键分批读取成绩，依次产生导出行的列表。
+
+    MySQL 驱动会把整个结果集读入内存，``QuerySet.iterator()`` 并不能限制内存，
+    因此使用 ``ScoreID > 上一批最后的主键`` 的键集分页，每批都是一次走主键索引的短查询。
+    只查询所选列需要的字段，未选择学生或课程列时不会关联对应的表。
+
+    参数:
+        queryset (QuerySet): 已过滤的成绩查询集，默认导出全部成绩。
+        columns (list): 导出列名，默认导出 EXPORT_COLUMNS 中的全部列。
+        chunk_size (int): 每批读取的条数。
+
+    返回:
+        generator: 每次产生一批导出行，每行的列与 export_header(columns) 一致。
+    """
+    fields = [EXPORT_COLUMNS[name][1] for name in columns or EXPORT_COLUMNS]
+    if queryset is None:
+        queryset = Score.objects.all()
+    queryset = queryset.order_by('ScoreID').values_list('ScoreID', *fields)
+    last_id = None
+    while True:
+        batch = queryset if last_id is None else queryset.filter(ScoreID__gt=last_id)
+        batch = list(batch[:chunk_size])
+        if not batch:
+            return
+        # 第 0 列为 ScoreID，只用于分页
+        yield [record[1:] for record in batch]
+        last_id = batch[-1][0]
+
+
+def stream_scores_csv(queryset=None, columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    逐批生成 CSV 文本，供 StreamingHttpResponse 使用。
+
+    参数:
+        queryset (QuerySet): 已过滤的成绩查询集，默认导出全部成绩。
+        columns (list): 导出列名，默认导出全部列。
+        chunk_size (int): 每批读取的条数。
+
+    返回:
+        generator: 依次产生 CSV 文本片段，第一个片段包含 BOM 和表头以便 Excel 正确识别中文。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export_header(columns))
+    yield '\ufeff' + buffer.getvalue()
+    for rows in iter_score_batches(queryset, columns, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def write_scores_xlsx(output, queryset=None, columns=None, progress=None):
+    """
+    以 openpyxl 只写模式将成绩写入 Excel 文件。
+
+    只写模式把工作表逐行写入临时文件而不在内存中保留单元格对象，
+    内存占用只与每批条数和不重复的字符串数量（共享字符串表）有关。
+
+    参数:
+        output (file): 可写的二进制文件对象，建议使用临时文件。
+        queryset (QuerySet): 已过滤的成绩查询集，默认导出全部成绩。
+        columns (list): 导出列名，默认导出全部列。
+        progress (callable): 可选，每写完一批后以已写入条数为参数调用。
+
+    返回:
+        int: 导出的成绩条数。
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('成绩表')
+    sheet.append(export_header(columns))
+    count = 0
+    for rows in iter_score_batches(queryset, columns):
+        for row in rows:
+            sheet.append(row)
+        count += len(rows)
+        if progress is not None:
+            progress(count)
+    workbook.save(output)
+    return count
@@ -0,0 +1,74 @@
+"""
+成绩查询条件。
+
+成绩列表、同步导出和后台导出任务共用同一组 GET 参数，
+保证导出的内容与页面上看到的筛选结果一致，且过滤都在数据库中完成。
+"""
+from .grading import GRADE_LEVELS
+
+# 支持的筛选参数
+SCORE_FILTER_PARAMS = ('student_id', 'course_id', 'class_id', 'grade_level')
+
+# 支持的排序参数 -> 排序字段，以主键作为第二排序字段保证分页稳定
+SCORE_SORTS = {
+    'total': ('TotalGrade', 'ScoreID'),
+    '-total': ('-TotalGrade', '-ScoreID'),
+}
+
+
+def get_score_filters(params):
+    """
+    从请求参数中提取非空的筛选条件。
+
+    参数:
+        params (QueryDict): request.GET 或其他类字典对象。
+
+    返回:
+        dict: 筛选参数名到取值的字典，可直接保存到 Job.Params 或拼接为查询字符串。
+    """
+    filters = {}
+    for name in SCORE_FILTER_PARAMS:
+        value = (params.get(name) or '').strip()
+        if value:
+            filters[name] = value
+    return filters
+
+
+def filter_scores(queryset, filters):
+    """
+    按筛选条件过滤成绩查询集。
+
+    参数:
+        queryset (QuerySet): 成绩查询集。
+        filters (dict): get_score_filters 返回的筛选条件。
+
+    返回:
+        QuerySet: 过滤后的查询集；无法识别的成绩等级会被忽略。
+    """
+    if filters.get('student_id'):
+        queryset = queryset.filter(Student__StudentID=filters['student_id'])
+    if filters.get('course_id'):
+        queryset = queryset.filter(Course__CourseID=filters['course_id'])
+    if filters.get('class_id'):
+        queryset = queryset.filter(Student__Class__ClassID=filters['class_id'])
+
+    grade_level = (filters.get('grade_level') or '').upper()
+    if grade_level in GRADE_LEVELS:
+        queryset = queryset.filter(GradeLevel=grade_level)
+    return queryset
+
+
+def order_scores(queryset, sort):
+    """
+    按排序参数排序成绩查询集，按课程筛选后的总成绩排序可使用 (Course, TotalGrade) 索引。
+
+    参数:
+        queryset (QuerySet): 成绩查询集。
+        sort (str): 排序参数，见 SCORE_SORTS；无法识别时保持默认排序。
+
+    返回:
+        QuerySet: 排序后的查询集。
+    """
+    if sort in SCORE_SORTS:
+        return queryset.order_by(*SCORE_SORTS[sort])
+    return queryset
@@ -4,6 +4,7 @@ from django.utils.translation import gettext_lazy as _
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Fieldset, ButtonHolder, HTML
 from .models import Student, Score, Course
+from .widgets import RemoteSelect
 from django.urls import reverse_lazy
 
 class StudentForm(forms.ModelForm):
@@ -28,8 +29,9 @@ class StudentForm(forms.ModelForm):
             'Gender': forms.Select(
                 attrs={'class': 'form-select'}
             ),
-            'Class': forms.Select(
-                attrs={'class': 'form-select'}
+            # 班级、学生、课程的选项通过查找接口按输入加载，不在页面中列出整张表
+            'Class': RemoteSelect(
+                'classes', attrs={'class': 'form-select'}
             ),
             'Phone': forms.TextInput(
                 attrs={'class': 'form-control', 'placeholder': _('请输入联系电话')}
@@ -126,11 +128,11 @@ class ScoreForm(forms.ModelForm):
             'FinalGrade': _('期末成绩')
         }
         widgets = {
-            'Student': forms.Select(
-                attrs={'class': 'form-select'}
+            'Student': RemoteSelect(
+                'students', attrs={'class': 'form-select'}
             ),
-            'Course': forms.Select(
-                attrs={'class': 'form-select'}
+            'Course': RemoteSelect(
+                'courses', attrs={'class': 'form-select'}
             ),
             'RegularGrade': forms.NumberInput(
                 attrs={'class': 'form-control', 'step': '0.1', 'min': '0', 'max': '100'}
@@ -0,0 +1,123 @@
+"""
+总成绩与等级计算。
+
+批量函数对整列成绩做一次向量化计算，供导入、重新计算和统计使用；
+单条函数（模型保存时调用）使用完全相同的运算顺序和舍入方式，保证两者结果一致。
+
+舍入规则统一为"四舍五入"（ROUND_HALF_UP）保留两位小数，与 models.weighted_total_expression
+在 SQL 中的计算方式相同：先把加权和还原到万分位以消除浮点误差（如 46.965 实际存为 46.96499...），
+再对百分位四舍五入。
+"""
+import math
+
+import numpy as np
+
+# 默认的平时、期中、期末成绩权重，课程未指定成绩计算方案时使用
+DEFAULT_WEIGHTS = (0.3, 0.3, 0.4)
+
+# 全部成绩等级，从高到低
+GRADE_LEVELS = ('A', 'B', 'C', 'D', 'F')
+
+# 各等级对应的绩点，用于计算学分绩点 (GPA)
+GRADE_POINTS = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
+
+# 默认的 A/B/C/D 等级分数线（达到即为该等级），低于 D 的分数线为 F
+DEFAULT_THRESHOLDS = (90, 80, 70, 60)
+
+# 达到的分数线条数 -> 等级
+_LEVELS_BY_BAND = np.array(['F', 'D', 'C', 'B', 'A'])
+
+
+def total_grades(regular, midterm, final, weights=DEFAULT_WEIGHTS):
+    """
+    批量计算总成绩。
+
+    舍入为四舍五入保留两位小数，calculate_total_grade 与此相同。
+
+    参数:
+        regular (array-like): 平时成绩。
+        midterm (array-like): 期中成绩。
+        final (array-like): 期末成绩。
+        weights (tuple): 三项成绩的权重，每项可以是数值或与成绩等长的数组（每行使用各自课程的权重）。
+
+    返回:
+        ndarray: 保留两位小数的总成绩，任一成绩缺失 (NaN/None) 的位置为 0.0。
+    """
+    regular_weight, midterm_weight, final_weight = (np.asarray(weight, dtype=float) for weight in weights)
+    regular = np.asarray(regular, dtype=float)
+    midterm = np.asarray(midterm, dtype=float)
+    final = np.asarray(final, dtype=float)
+    totals = regular * regular_weight + midterm * midterm_weight + final * final_weight
+    totals = np.floor((np.floor(totals * 10000 + 0.5) + 50) / 100) / 100
+    return np.where(np.isnan(totals), 0.0, totals)
+
+
+def grade_levels(totals, thresholds=DEFAULT_THRESHOLDS):
+    """
+    批量将总成绩换算为等级。
+
+    参数:
+        totals (array-like): 总成绩。
+        thresholds (tuple): A/B/C/D 的分数线（从高到低），每项可以是数值或与成绩等长的数组。
+
+    返回:
+        ndarray: 等级字符串数组，缺失的总成绩为 'F'。
+    """
+    totals = np.asarray(totals, dtype=float)
+    # 分数线从高到低排列，达到的条数即等级的序号；NaN 与任何数比较都为 False，结果为 F
+    band = np.zeros(totals.shape, dtype=int)
+    for threshold in thresholds:
+        band += totals >= np.asarray(threshold, dtype=float)
+    return _LEVELS_BY_BAND[band]
+
+
+def grade_batch(regular, midterm, final, weights=DEFAULT_WEIGHTS, thresholds=DEFAULT_THRESHOLDS):
+    """
+    一次计算总成绩和等级。
+
+    返回:
+        tuple: (总成绩数组, 等级数组)。
+    """
+    totals = total_grades(regular, midterm, final, weights)
+    return totals, grade_levels(totals, thresholds)
+
+
+def calculate_total_grade(regular, midterm, final, weights=DEFAULT_WEIGHTS):
+    """
+    计算单条成绩的总成绩，结果与 total_grades 完全一致。
+
+    参数:
+        regular (float): 平时成绩。
+        midterm (float): 期中成绩。
+        final (float): 期末成绩。
+        weights (tuple): 三项成绩的权重。
+
+    返回:
+        float: 保留两位小数的总成绩，成绩缺失时返回 0.0。
+    """
+    regular_weight, midterm_weight, final_weight = weights
+    try:
+        total = regular * regular_weight + midterm * midterm_weight + final * final_weight
+        return math.floor((math.floor(total * 10000 + 0.5) + 50) / 100) / 100
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def grade_level_for(total, thresholds=DEFAULT_THRESHOLDS):
+    """
+    将单个总成绩换算为等级 A/B/C/D/F。
+
+    参数:
+        total (float): 总成绩。
+        thresholds (tuple): A/B/C/D 的分数线，从高到低。
+
+    返回:
+        str: 成绩等级。
+    """
+    try:
+        for level, threshold in zip(GRADE_LEVELS, thresholds):
+            if total >= threshold:
+                return level
+    except TypeError:
+        pass
+    return 'F'
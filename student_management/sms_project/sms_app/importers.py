@@ -0,0 +1,429 @@
+"""
+成绩批量导入引擎。
+
+按块处理导入行：每块先用 pandas 按列完成校验（数值转换、0-100 范围、
+必填键、重复的 (学号, 课程编号)），再用少量 ``IN (...)`` 查询解析学号和
+课程编号，最后通过 ``bulk_create(update_conflicts=True)`` 在
+``Score(Student, Course)`` 唯一约束上批量写入，每块使用独立的短事务。
+每块在同一事务中重新汇总涉及学生的成绩，全部块完成后统一重新计算涉及的班级和年级排名。
+"""
+import logging
+from dataclasses import dataclass, field
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from openpyxl import Workbook
+
+from .models import Student, Course, Score, ImportCheckpoint
+from .summaries import refresh_students, rerank, summary_partitions
+
+logger = logging.getLogger(__name__)
+
+# 导入文件必须包含的列，与 download_template 生成的模板保持一致
+REQUIRED_COLUMNS = ['学号', '课程编号', '平时成绩', '期中成绩', '期末成绩']
+GRADE_COLUMNS = {
+    '平时成绩': 'RegularGrade',
+    '期中成绩': 'MidtermGrade',
+    '期末成绩': 'FinalGrade',
+}
+
+# 每块一个短事务；按列校验每块有固定的 pandas 开销，块过小时开销超过逐行校验本身
+DEFAULT_CHUNK_SIZE = 5000
+
+# ImportResult 中保留的错误样例条数，完整错误写入错误报告
+MAX_SAMPLE_ERRORS = 100
+
+# 拼接 (学号, 课程编号) 时使用的分隔符，不会出现在编号中
+PAIR_SEPARATOR = '\x1f'
+
+
+@dataclass
+class ImportResult:
+    """
+    导入结果汇总。
+
+    属性:
+        processed_rows (int): 已处理的行数。
+        resumed_rows (int): 断点续传时跳过写入的行数（这些行在之前的导入中已提交）。
+        success_count (int): 校验通过（非试运行时即成功写入）的记录数。
+        error_count (int): 失败的记录数。
+        errors (list): 前 MAX_SAMPLE_ERRORS 条失败记录，元素为 (行号, 错误信息)。
+    """
+    processed_rows: int = 0
+    resumed_rows: int = 0
+    success_count: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_errors(self, errors):
+        """
+        记录一块数据中的失败行。
+
+        参数:
+            errors (Series): 以行号为索引、错误信息为值的 Series。
+        """
+        self.error_count += len(errors)
+        room = MAX_SAMPLE_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors.iloc[:room].items())
+
+    def error_details(self):
+        """返回适合展示给用户的错误描述列表。"""
+        return [f'第{row_number}行: {message}' for row_number, message in self.errors]
+
+
+class ErrorReport:
+    """
+    导入错误报告，以只写模式逐块追加到 Excel 工作簿，可作为 ScoreImporter 的 error_sink。
+    """
+    HEADER = ['行号', *REQUIRED_COLUMNS, '错误原因']
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('导入错误')
+        self.sheet.append(self.HEADER)
+        self.count = 0
+
+    def __call__(self, rows, errors):
+        """
+        追加失败行。
+
+        参数:
+            rows (DataFrame): 失败行的原始数据，以行号为索引。
+            errors (Series): 对应的错误信息。
+        """
+        rows = rows.astype(object).where(rows.notna(), None)
+        for row_number, values, message in zip(rows.index.tolist(), rows.to_numpy().tolist(), errors.tolist()):
+            self.sheet.append([row_number, *values, message])
+        self.count += len(errors)
+
+    def save(self, output):
+        self.workbook.save(output)
+
+
+class ChunkCheckpoints:
+    """
+    按文件内容摘要和块大小记录已提交的导入块。
+
+    参数:
+        file_hash (str): 导入文件的 SHA-256 摘要。
+        chunk_size (int): 导入块大小，块大小不同时块序号不可比，检查点互不影响。
+    """
+
+    def __init__(self, file_hash, chunk_size):
+        self.file_hash = file_hash
+        self.chunk_size = chunk_size
+        self.completed = set(self.queryset().values_list('ChunkNo', flat=True))
+
+    def queryset(self):
+        return ImportCheckpoint.objects.filter(FileHash=self.file_hash, ChunkSize=self.chunk_size)
+
+    def is_done(self, chunk_no):
+        return chunk_no in self.completed
+
+    def record(self, chunk_no, raw, success_count, error_count):
+        """记录块已提交，需在写入该块成绩的事务中调用。"""
+        ImportCheckpoint.objects.create(
+            FileHash=self.file_hash,
+            ChunkSize=self.chunk_size,
+            ChunkNo=chunk_no,
+            FirstRow=int(raw.index[0]),
+            LastRow=int(raw.index[-1]),
+            SuccessCount=success_count,
+            ErrorCount=error_count,
+        )
+        self.completed.add(chunk_no)
+
+    def clear(self):
+        """导入全部完成后删除检查点，之后再次上传同一文件将重新导入。"""
+        ImportCheckpoint.objects.filter(FileHash=self.file_hash).delete()
+        self.completed.clear()
+
+
+def chunked(iterable, size):
+    """
+    将可迭代对象按固定大小切分为列表。
+
+    参数:
+        iterable (iterable): 任意可迭代对象。
+        size (int): 每块的最大元素数。
+
+    返回:
+        generator: 依次产生长度不超过 size 的列表。
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def build_frame(chunk):
+    """将 (行号, 行数据字典) 列表转换为以行号为索引的 DataFrame。"""
+    return pd.DataFrame(
+        [tuple(map(row.get, REQUIRED_COLUMNS)) for _, row in chunk],
+        index=[row_number for row_number, _ in chunk],
+        columns=REQUIRED_COLUMNS,
+    )
+
+
+def _flag(errors, mask, message):
+    """
+    为尚无错误的行记录错误信息，每行只保留第一条错误。
+
+    errors、mask 和 Series 类型的 message 按位置对应；按位置赋值避开了
+    pandas 布尔索引赋值的固定开销，后者在千行的块上比实际计算慢一个数量级。
+    """
+    positions = np.flatnonzero(np.asarray(mask) & (np.asarray(errors) == ''))
+    if len(positions):
+        if isinstance(message, pd.Series):
+            message = message.to_numpy()[positions]
+        if isinstance(errors, pd.Series):
+            errors.iloc[positions] = message
+        else:
+            errors[positions] = message
+
+
+def _cell_text(value):
+    """单元格转换为字符串，空值为空字符串，整数形式的浮点数不带 '.0' 后缀。"""
+    if value is None or value != value:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _text_column(column):
+    """将编号列转换为去除首尾空白的字符串数组。"""
+    if pd.api.types.is_integer_dtype(column.dtype):
+        return column.to_numpy().astype(str).astype(object)
+    values = column.tolist()
+    if pd.api.types.infer_dtype(values, skipna=False) != 'string':
+        values = map(_cell_text, values)
+    # str.strip 经 map 在 C 层逐个调用，比 Series.str.strip 快一个数量级
+    return np.array(list(map(str.strip, values)), dtype=object)
+
+
+def validate_frame(raw):
+    """
+    按列校验一块原始数据，不访问数据库。
+
+    每块只有几千行，pandas 每次运算的固定开销远大于实际计算，
+    因此中间结果使用 numpy 数组，最后才组装为 DataFrame。
+
+    参数:
+        raw (DataFrame): build_frame 或 readers.read_score_frames 生成的原始数据。
+
+    返回:
+        tuple: (frame, errors)。frame 包含规范化后的 student_id、course_id
+            字符串列和三个浮点成绩列；errors 为每行的错误信息，空字符串表示通过。
+    """
+    student_ids = _text_column(raw['学号'])
+    course_ids = _text_column(raw['课程编号'])
+    grades = {
+        name: pd.to_numeric(raw[column].to_numpy(), errors='coerce').astype(float)
+        for column, name in GRADE_COLUMNS.items()
+    }
+    values = np.column_stack(list(grades.values()))
+
+    errors = np.full(len(raw), '', dtype=object)
+    _flag(errors, student_ids == '', '学号不能为空')
+    _flag(errors, course_ids == '', '课程编号不能为空')
+    _flag(errors, np.isnan(values).any(axis=1), '成绩必须是数字')
+    _flag(errors, ~((values >= 0) & (values <= 100)).all(axis=1), '成绩必须在0-100之间')
+    frame = pd.DataFrame({'student_id': student_ids, 'course_id': course_ids, **grades}, index=raw.index)
+    return frame, pd.Series(errors, index=raw.index)
+
+
+def flag_duplicates(frame, errors, seen_pairs):
+    """
+    标记重复的 (学号, 课程编号)：同一组合只保留第一次出现的行，包括之前块中出现过的。
+
+    参数:
+        frame (DataFrame): 已解析课程编号的数据。
+        errors (Series): 每行的错误信息，会被原地更新。
+        seen_pairs (set): 之前块中已接受的组合，会被原地更新。
+    """
+    valid = np.asarray(errors) == ''
+    pairs = frame['student_id'].to_numpy()[valid] + PAIR_SEPARATOR + frame['course_id'].to_numpy()[valid]
+    # 集合成员检查经 map 在 C 层完成，代价只与本块行数有关；Series.isin(set) 每块都会复制整个集合
+    duplicated = pd.Index(pairs).duplicated(keep='first') | np.fromiter(
+        map(seen_pairs.__contains__, pairs), dtype=bool, count=len(pairs)
+    )
+    seen_pairs.update(pairs[~duplicated].tolist())
+    valid[valid] = duplicated
+    _flag(errors, valid, '(学号, 课程编号) 与前面的行重复')
+
+
+class ScoreImporter:
+    """
+    基于集合操作的成绩导入器。
+
+    参数:
+        chunk_size (int): 每个事务处理的行数。
+        dry_run (bool): 为 True 时只校验不写入数据库。
+        error_sink (callable): 可选，以 (失败行原始数据, 错误信息) 调用，例如 ErrorReport。
+        file_hash (str): 可选，导入文件的内容摘要；提供时按块记录检查点并跳过已提交的块。
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, error_sink=None, file_hash=None):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.error_sink = error_sink
+        self.checkpoints = None
+        if file_hash and not dry_run:
+            self.checkpoints = ChunkCheckpoints(file_hash, chunk_size)
+        self.seen_pairs = set()
+        self.rerank_class_ids = set()
+        self.rerank_grades = set()
+
+    def run(self, rows, progress=None):
+        """
+        导入所有行。
+
+        参数:
+            rows (iterable): 依次产生 (行号, 行数据字典) 的可迭代对象，
+                行数据以模板中的中文列名为键。
+            progress (callable): 可选，每处理完一块后以 ImportResult 为参数调用。
+
+        返回:
+            ImportResult: 导入结果。
+        """
+        return self.import_frames((build_frame(chunk) for chunk in chunked(rows, self.chunk_size)), progress)
+
+    def import_frames(self, frames, progress=None):
+        """
+        导入已按块读取的原始数据，例如 readers.read_score_frames 的结果。
+
+        参数:
+            frames (iterable): 依次产生以行号为索引、以模板中文列名为列的 DataFrame，
+                每块不超过 chunk_size 行。
+            progress (callable): 可选，每处理完一块后以 ImportResult 为参数调用。
+
+        返回:
+            ImportResult: 导入结果。
+        """
+        result = ImportResult()
+        self.seen_pairs = set()
+        self.rerank_class_ids = set()
+        self.rerank_grades = set()
+        for chunk_no, raw in enumerate(frames):
+            # 已提交的块仍需校验，以便统计结果、生成错误报告和识别后续块中的重复行，但不再写入
+            resumed = self.checkpoints is not None and self.checkpoints.is_done(chunk_no)
+            self.import_chunk(raw, result, chunk_no=chunk_no, write=not resumed)
+            result.processed_rows += len(raw)
+            if resumed:
+                result.resumed_rows += len(raw)
+            if progress is not None:
+                progress(result)
+        # 排名依赖整个班级和年级的汇总，全部导入后只计算一次
+        rerank(self.rerank_class_ids, self.rerank_grades)
+        if self.checkpoints is not None:
+            self.checkpoints.clear()
+        logger.info(
+            f"{'Validated' if self.dry_run else 'Imported'} {result.success_count} scores, "
+            f"{result.error_count} rows failed"
+        )
+        return result
+
+    def import_chunk(self, raw, result, chunk_no=0, write=True):
+        """
+        校验并写入一块数据，结果累加到 result 中。
+
+        参数:
+            raw (DataFrame): 以行号为索引的原始数据，见 build_frame。
+            result (ImportResult): 累加结果的对象。
+            chunk_no (int): 块序号，用于记录检查点。
+            write (bool): 为 False 时只校验不写入。
+        """
+        frame, errors = validate_frame(raw)
+        self.resolve_keys(frame, errors)
+        flag_duplicates(frame, errors, self.seen_pairs)
+
+        valid = frame[errors == '']
+        failed = errors != ''
+        if write and not self.dry_run:
+            # 总成绩和等级由 ScoreQuerySet.bulk_create 按各课程的方案整块计算
+            objs = [
+                Score(Student_id=student_id, Course_id=course_id,
+                      RegularGrade=regular, MidtermGrade=midterm, FinalGrade=final)
+                for student_id, course_id, regular, midterm, final in valid.itertuples(index=False)
+            ]
+            # 成绩与检查点在同一事务中提交，中断后重新导入不会重复或遗漏
+            with transaction.atomic():
+                # bulk_create 由 ScoreQuerySet 递增导出缓存、课程统计和学生成绩单的数据版本号
+                self.write(objs)
+                if objs:
+                    class_ids, grades = refresh_students(valid['student_id'].unique().tolist())
+                    self.rerank_class_ids |= class_ids
+                    self.rerank_grades |= grades
+                if self.checkpoints is not None:
+                    self.checkpoints.record(chunk_no, raw, len(valid), int(failed.sum()))
+        elif not self.dry_run and len(valid):
+            # 续传跳过的块：汇总已随上次运行提交，但上次运行中断在重新排名之前，这些班级和年级仍需重新排名
+            class_ids, grades = summary_partitions(valid['student_id'].unique().tolist())
+            self.rerank_class_ids |= class_ids
+            self.rerank_grades |= grades
+        result.success_count += len(valid)
+
+        if failed.any():
+            result.add_errors(errors[failed])
+            if self.error_sink is not None:
+                self.error_sink(raw[failed], errors[failed])
+
+    @staticmethod
+    def resolve_keys(frame, errors):
+        """
+        用两条 IN 查询确认学号和课程编号存在，课程编号不存在时尝试补零到2位。
+
+        参数:
+            frame (DataFrame): validate_frame 返回的数据，course_id 列会被替换为解析后的编号。
+            errors (Series): 每行的错误信息，会被原地更新。
+        """
+        pending = errors == ''
+        if not pending.any():
+            return
+        student_ids = frame['student_id']
+        course_ids = frame['course_id']
+        padded_course_ids = course_ids.str.zfill(2)
+
+        known_students = set(Student.objects.filter(
+            StudentID__in=student_ids[pending].unique().tolist()
+        ).values_list('StudentID', flat=True))
+        known_courses = set(Course.objects.filter(
+            CourseID__in=list(set(course_ids[pending]) | set(padded_course_ids[pending]))
+        ).values_list('CourseID', flat=True))
+
+        _flag(errors, pending & ~student_ids.isin(known_students), '学号 ' + student_ids + ' 不存在')
+        resolved = course_ids.where(
+            course_ids.isin(known_courses),
+            padded_course_ids.where(padded_course_ids.isin(known_courses), '')
+        )
+        _flag(errors, pending & (resolved == ''), '课程编号 ' + course_ids + ' 不存在')
+        frame['course_id'] = resolved
+
+    @staticmethod
+    def write(objs):
+        """
+        在唯一约束 (Student, Course) 上批量插入或更新成绩。
+
+        参数:
+            objs (list): 未保存的 Score 实例列表，TotalGrade 和 GradeLevel 由 bulk_create 计算。
+        """
+        if not objs:
+            return
+        # MySQL 的 ON DUPLICATE KEY UPDATE 不支持指定冲突列
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = ['Student', 'Course']
+        Score.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['RegularGrade', 'MidtermGrade', 'FinalGrade', 'TotalGrade', 'GradeLevel', 'UpdatedAt'],
+            # 导入每块汇总一次，全部完成后统一重新排名
+            summarize=False,
+        )
@@ -0,0 +1,291 @@
+"""
+后台任务队列。
+
+任务保存在数据库的 Job 表中，由 ``python manage.py run_jobs`` 启动的本地
+工作进程轮询执行，无需额外的消息中间件，单机即可部署。
+"""
+import hashlib
+import logging
+import tempfile
+import threading
+
+from django.core.files import File
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .dashboard import refresh_snapshot
+from .exporters import write_scores_xlsx
+from .filters import filter_scores
+from .importers import ErrorReport, ScoreImporter
+from .models import Job, ImportCheckpoint, Score
+from .readers import count_score_rows, read_score_frames
+
+logger = logging.getLogger(__name__)
+
+# Job.Errors 中最多保存的错误条数，完整错误见错误报告文件
+MAX_STORED_ERRORS = 20
+
+# 任务执行期间更新 UpdatedAt 的间隔（秒），应远小于 run_jobs 的 --stale-after
+HEARTBEAT_INTERVAL = 30
+
+# 任务结束时写回的字段，其余字段（如 Params、CreatedBy）不会被覆盖
+RESULT_FIELDS = (
+    'Status', 'Message', 'ResultFile', 'ErrorFile', 'TotalRows', 'ProcessedRows',
+    'SuccessCount', 'ErrorCount', 'Errors', 'FinishedAt',
+)
+
+
+def enqueue_import(uploaded_file, user, dry_run=False):
+    """
+    保存上传文件并创建导入任务。
+
+    参数:
+        uploaded_file (UploadedFile): 用户上传的成绩文件。
+        user (User): 提交任务的用户。
+        dry_run (bool): 为 True 时只校验不写入数据库。
+
+    返回:
+        Job: 新建的任务。
+    """
+    job = Job(
+        Kind=Job.KIND_IMPORT,
+        CreatedBy=user,
+        FileHash=file_digest(uploaded_file),
+        Params={'filename': uploaded_file.name, 'dry_run': dry_run},
+    )
+    job.InputFile.save(uploaded_file.name, uploaded_file, save=False)
+    job.save()
+    logger.info(f"Import job {job.pk} queued by {user}")
+    return job
+
+
+def file_digest(uploaded_file):
+    """计算上传文件内容的 SHA-256 摘要，用于识别重新上传的同一文件。"""
+    digest = hashlib.sha256()
+    for block in uploaded_file.chunks():
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def has_unfinished_import(file_hash):
+    """同一文件是否有中断的导入（存在未清理的检查点）。"""
+    return ImportCheckpoint.objects.filter(FileHash=file_hash).exists()
+
+
+def enqueue_export(user, filters=None, columns=None):
+    """
+    创建导出任务。
+
+    参数:
+        user (User): 提交任务的用户。
+        filters (dict): 成绩筛选条件，见 filters.get_score_filters。
+        columns (list): 导出列名，None 表示全部列。
+
+    返回:
+        Job: 新建的任务。
+    """
+    job = Job.objects.create(
+        Kind=Job.KIND_EXPORT,
+        CreatedBy=user,
+        Params={'filters': filters or {}, 'columns': columns},
+    )
+    logger.info(f"Export job {job.pk} queued by {user}")
+    return job
+
+
+def claim_next_job():
+    """
+    领取最早提交的等待中任务。
+
+    通过带状态条件的 UPDATE 抢占任务，多个工作进程同时运行时同一任务只会被领取一次。
+
+    返回:
+        Job: 已标记为执行中的任务；没有等待中的任务时返回 None。
+    """
+    pending = Job.objects.filter(Status=Job.STATUS_PENDING).order_by('CreatedAt')
+    for job_id in pending.values_list('pk', flat=True)[:10]:
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job_id, Status=Job.STATUS_PENDING).update(
+            Status=Job.STATUS_RUNNING, StartedAt=now, UpdatedAt=now
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def claimed(job):
+    """
+    仍由本次领取执行的任务的查询集。
+
+    任务被重新排队并由其他工作进程再次领取后 StartedAt 会变化，
+    原执行者的进度、心跳和最终状态都不再写入。
+    """
+    return Job.objects.filter(pk=job.pk, Status=Job.STATUS_RUNNING, StartedAt=job.StartedAt)
+
+
+class Heartbeat:
+    """
+    任务执行期间在后台线程中定期更新 UpdatedAt，表示工作进程仍然存活。
+
+    导出的 count() 和保存工作簿、导入完成后的重新排名、刷新仪表盘等阶段可能长时间没有进度，
+    心跳使这些任务不会被 requeue_stale_jobs 误判为中断而重复执行。
+
+    参数:
+        job (Job): 已领取的任务。
+        interval (float): 心跳间隔（秒）。
+    """
+
+    def __init__(self, job, interval=HEARTBEAT_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-{job.pk}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    if not claimed(self.job).update(UpdatedAt=timezone.now()):
+                        # 任务已被重新排队，不再续期
+                        return
+                except DatabaseError as e:
+                    logger.warning(f"Heartbeat for job {self.job.pk} failed: {str(e)}")
+        finally:
+            # 线程使用独立的数据库连接，退出前关闭
+            connection.close()
+
+
+def requeue_stale_jobs(timeout):
+    """
+    将长时间没有心跳的执行中任务重新置为等待中。
+
+    工作进程被杀死或重启时任务会停留在执行中状态；导入任务按检查点从中断处继续。
+    正常执行的任务由 Heartbeat 每 HEARTBEAT_INTERVAL 秒更新一次 UpdatedAt，不会被重新排队。
+
+    参数:
+        timeout (timedelta): 超过该时长没有心跳即视为中断，应远大于 HEARTBEAT_INTERVAL。
+
+    返回:
+        int: 重新排队的任务数。
+    """
+    count = Job.objects.filter(
+        Status=Job.STATUS_RUNNING, UpdatedAt__lt=timezone.now() - timeout
+    ).update(Status=Job.STATUS_PENDING, UpdatedAt=timezone.now())
+    if count:
+        logger.warning(f"Requeued {count} stale jobs")
+    return count
+
+
+def run_job(job, heartbeat_interval=HEARTBEAT_INTERVAL):
+    """
+    执行任务并记录最终状态，任务中的异常不会向外抛出。
+
+    只写回 RESULT_FIELDS；执行期间任务已被重新排队（心跳中断）时不写回，以免覆盖新一次执行的状态。
+
+    参数:
+        job (Job): 已领取的任务。
+        heartbeat_interval (float): 心跳间隔（秒）。
+    """
+    handler = JOB_HANDLERS[job.Kind]
+    with Heartbeat(job, heartbeat_interval):
+        try:
+            handler(job)
+            job.Status = Job.STATUS_SUCCESS
+        except Exception as e:
+            logger.exception(f"Job {job.pk} failed: {str(e)}")
+            job.Status = Job.STATUS_FAILED
+            job.Message = f'任务执行失败：{str(e)}'
+    job.FinishedAt = timezone.now()
+    # 按本次领取的 StartedAt 条件更新，任务已被其他工作进程重新领取时不覆盖其状态
+    fields = {name: getattr(job, name) for name in RESULT_FIELDS}
+    if not claimed(job).update(UpdatedAt=job.FinishedAt, **fields):
+        logger.warning(f"Job {job.pk} was requeued while running, result discarded")
+
+
+def eta_seconds(job):
+    """
+    按已处理速度估算剩余秒数，无法估算时返回 None。
+    """
+    if job.Status != Job.STATUS_RUNNING or not job.TotalRows or not job.ProcessedRows or not job.StartedAt:
+        return None
+    elapsed = (timezone.now() - job.StartedAt).total_seconds()
+    remaining = max(job.TotalRows - job.ProcessedRows, 0)
+    return round(remaining * elapsed / job.ProcessedRows)
+
+
+def _save_progress(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    claimed(job).update(UpdatedAt=timezone.now(), **fields)
+
+
+def _run_import(job):
+    filename = job.Params.get('filename') or job.InputFile.name
+    dry_run = job.Params.get('dry_run', False)
+    report = ErrorReport()
+    with job.InputFile.open('rb') as fileobj:
+        _save_progress(job, TotalRows=count_score_rows(fileobj, filename))
+        importer = ScoreImporter(dry_run=dry_run, error_sink=report, file_hash=job.FileHash)
+        frames = read_score_frames(fileobj, filename, importer.chunk_size)
+        result = importer.import_frames(frames, progress=lambda result: _save_progress(
+            job,
+            ProcessedRows=result.processed_rows,
+            SuccessCount=result.success_count,
+            ErrorCount=result.error_count,
+        ))
+
+    if report.count:
+        with tempfile.TemporaryFile() as output:
+            report.save(output)
+            output.seek(0)
+            job.ErrorFile.save(f'import_errors_{job.pk}.xlsx', File(output), save=False)
+
+    job.ProcessedRows = result.processed_rows
+    job.SuccessCount = result.success_count
+    job.ErrorCount = result.error_count
+    job.Errors = result.error_details()[:MAX_STORED_ERRORS]
+    if dry_run:
+        job.Message = f'校验完成（未写入数据库）：{result.success_count} 条记录有效'
+    else:
+        job.Message = f'成功导入 {result.success_count} 条成绩记录'
+        if result.resumed_rows:
+            job.Message += f'（其中 {result.resumed_rows} 行已在之前中断的导入中提交）'
+    if result.error_count:
+        job.Message += f'，{result.error_count} 条记录有误，详见错误报告'
+
+
+def _run_export(job):
+    queryset = filter_scores(Score.objects.all(), job.Params.get('filters') or {})
+    _save_progress(job, TotalRows=queryset.count())
+    with tempfile.TemporaryFile() as output:
+        count = write_scores_xlsx(
+            output,
+            queryset=queryset,
+            columns=job.Params.get('columns'),
+            progress=lambda count: _save_progress(job, ProcessedRows=count),
+        )
+        output.seek(0)
+        job.ResultFile.save(f'scores_{job.pk}.xlsx', File(output), save=False)
+    job.TotalRows = job.ProcessedRows = job.SuccessCount = count
+    job.Message = f'成功导出 {count} 条成绩记录'
+
+
+def _run_dashboard(job):
+    snapshot = refresh_snapshot()
+    job.Message = f'仪表盘数据已刷新（数据版本 {snapshot.Versions}）'
+
+
+JOB_HANDLERS = {
+    Job.KIND_IMPORT: _run_import,
+    Job.KIND_EXPORT: _run_export,
+    Job.KIND_DASHBOARD: _run_dashboard,
+}
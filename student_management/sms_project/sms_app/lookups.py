@@ -0,0 +1,96 @@
+"""
+下拉选择框的远程查找。
+
+学生、课程、班级的下拉框不再在页面中列出整张表，而是输入编号或名称的开头部分后
+通过 ``/api/lookup/<kind>/?q=`` 查找，每次最多返回 MAX_LIMIT 条。
+编号前缀使用主键索引，名称前缀使用名称上的索引，两条查询分别限制条数后合并；
+结果按所查模型的数据版本缓存。
+"""
+import hashlib
+
+from .caching import get_or_compute
+from .models import ClassInformation, Course, Student
+
+# 每次查找默认和最多返回的条数
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+# 查找结果的缓存时间（秒），数据版本变化时立即失效
+LOOKUP_CACHE_TIMEOUT = 600
+
+
+class Lookup:
+    """
+    一类对象的前缀查找。
+
+    参数:
+        model (Model): 查找的模型。
+        name_field (str): 名称字段，与主键一起按前缀匹配。
+        permission (str): 调用查找接口所需的权限。
+        show_pk (bool): 选项文本是否附带编号。
+    """
+
+    def __init__(self, model, name_field, permission, show_pk=False):
+        self.model = model
+        self.name_field = name_field
+        self.permission = permission
+        self.show_pk = show_pk
+
+    def label(self, pk, name):
+        """下拉选项显示的文本"""
+        return f'{name} ({pk})' if self.show_pk else name
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        按编号或名称前缀查找。
+
+        参数:
+            query (str): 编号或名称的开头部分。
+            limit (int): 最多返回的条数。
+
+        返回:
+            list: [{'id': 主键, 'text': 显示文本}]，编号匹配的排在前面。
+        """
+        query = query.strip()
+        if not query:
+            return []
+        manager = self.model._default_manager
+        rows = list(
+            manager.filter(pk__startswith=query).order_by('pk').values_list('pk', self.name_field)[:limit]
+        )
+        if len(rows) < limit:
+            found = {pk for pk, _name in rows}
+            rows += [
+                row for row in manager.filter(**{f'{self.name_field}__startswith': query})
+                .order_by(self.name_field, 'pk').values_list('pk', self.name_field)[:limit]
+                if row[0] not in found
+            ][:limit - len(rows)]
+        return [{'id': pk, 'text': self.label(pk, name)} for pk, name in rows]
+
+    def cached_search(self, query, limit=DEFAULT_LIMIT):
+        """带缓存的 search，缓存随本模型的数据版本失效"""
+        query = query.strip()
+        digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+        key = f'lookup:{self.model._meta.model_name}:{limit}:{digest}'
+        return get_or_compute(key, (self.model,), lambda: self.search(query, limit), LOOKUP_CACHE_TIMEOUT)
+
+
+LOOKUPS = {
+    'students': Lookup(Student, 'Name', 'sms_app.view_student', show_pk=True),
+    'courses': Lookup(Course, 'CourseName', 'sms_app.view_course'),
+    'classes': Lookup(ClassInformation, 'ClassName', 'sms_app.view_classinformation'),
+}
+
+
+def parse_limit(value):
+    """
+    解析请求中的条数参数。
+
+    返回:
+        int: 1 到 MAX_LIMIT 之间的条数，无效时为 DEFAULT_LIMIT。
+    """
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+    return min(max(limit, 1), MAX_LIMIT)
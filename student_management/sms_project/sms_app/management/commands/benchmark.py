@@ -0,0 +1,411 @@
+"""
+性能基准测试命令。
+
+所有基准都在临时创建的测试数据库中运行，不会读写正式数据。
+
+用法:
+    python manage.py benchmark import --rows 40000
+    python manage.py benchmark validate --rows 100000
+    python manage.py benchmark export --rows 1000000
+    python manage.py benchmark grading --rows 1000000
+    python manage.py benchmark api --students 40
+"""
+import csv
+import json
+import multiprocessing
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date
+from io import BytesIO, StringIO
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from sms_app.exporters import write_scores_xlsx
+from sms_app.grading import grade_batch
+from sms_app.importers import (
+    DEFAULT_CHUNK_SIZE, REQUIRED_COLUMNS, ScoreImporter, flag_duplicates, validate_frame,
+)
+from sms_app.models import ClassInformation, Student, Course, Score, GradingScheme
+from sms_app.readers import read_score_frames, read_score_rows
+from sms_app.responses import orjson
+from sms_app.score_batch import scores_by_student
+
+COURSES_PER_STUDENT = 8
+
+
+def legacy_validate(rows):
+    """逐行校验的旧实现，只保留不访问数据库的部分，作为对比基线。"""
+    errors = []
+    for index, row in rows:
+        try:
+            try:
+                grades = [float(row['平时成绩']), float(row['期中成绩']), float(row['期末成绩'])]
+            except ValueError:
+                raise ValueError('成绩必须是数字')
+            if not all(0 <= grade <= 100 for grade in grades):
+                raise ValueError('成绩必须在0-100之间')
+        except ValueError as e:
+            errors.append(f'第{index}行: {str(e)}')
+    return errors
+
+
+def legacy_import(rows):
+    """逐行导入的旧实现（重构前 import_scores 中的循环），作为对比基线。"""
+    success_count = 0
+    for index, row in rows:
+        try:
+            student_id = str(row['学号']).strip()
+            course_id = str(row['课程编号']).strip()
+            if not Student.objects.filter(StudentID=student_id).exists():
+                raise ValueError(f'学号 {student_id} 不存在')
+            if not Course.objects.filter(CourseID=course_id).exists():
+                course_id = course_id.zfill(2)
+                if not Course.objects.filter(CourseID=course_id).exists():
+                    raise ValueError(f'课程编号 {row["课程编号"]} 不存在')
+            regular_grade = float(row['平时成绩'])
+            midterm_grade = float(row['期中成绩'])
+            final_grade = float(row['期末成绩'])
+            if not all(0 <= grade <= 100 for grade in [regular_grade, midterm_grade, final_grade]):
+                raise ValueError('成绩必须在0-100之间')
+            student = Student.objects.get(StudentID=student_id)
+            course = Course.objects.get(CourseID=course_id)
+            Score.objects.update_or_create(
+                Student=student,
+                Course=course,
+                defaults={
+                    'RegularGrade': regular_grade,
+                    'MidtermGrade': midterm_grade,
+                    'FinalGrade': final_grade
+                }
+            )
+            success_count += 1
+        except ValueError:
+            pass
+    return success_count
+
+
+def legacy_export_xlsx():
+    """重构前 export_scores 的实现：模型实例 -> 字典列表 -> DataFrame -> 内存中的 xlsx。"""
+    data = []
+    for score in Score.objects.select_related('Student', 'Course').all():
+        data.append({
+            '学号': score.Student.StudentID,
+            '姓名': score.Student.Name,
+            '课程编号': score.Course.CourseID,
+            '课程名称': score.Course.CourseName,
+            '平时成绩': score.RegularGrade,
+            '期中成绩': score.MidtermGrade,
+            '期末成绩': score.FinalGrade,
+            '总成绩': score.total_grade,
+            '等级': score.grade_level
+        })
+    df = pd.DataFrame(data)
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='成绩表')
+    return len(output.getvalue())
+
+
+def streaming_export_xlsx():
+    """当前实现：只写模式写入临时文件。"""
+    with tempfile.TemporaryFile() as output:
+        write_scores_xlsx(output)
+        return output.tell()
+
+
+def _read_status_kb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def _measure_child(func, pipe):
+    # 非 SQLite 的连接不能跨进程共享，子进程重新连接到测试数据库
+    if connection.vendor != 'sqlite':
+        connections.close_all()
+    start_rss = _read_status_kb('VmRSS')
+    try:
+        # 重置 VmHWM，使峰值只统计本次运行
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+    start = time.perf_counter()
+    size = func()
+    elapsed = time.perf_counter() - start
+    pipe.send((elapsed, (_read_status_kb('VmHWM') - start_rss) / 1024, size))
+    pipe.close()
+
+
+def run_isolated(func):
+    """
+    在 fork 出的子进程中运行 func，避免各实现之间相互影响内存峰值。
+
+    返回:
+        tuple: (耗时秒数, 峰值 RSS 增量 MB, func 的返回值)。仅支持 Linux。
+    """
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_child, args=(func, sender))
+    process.start()
+    result = receiver.recv()
+    process.join()
+    return result
+
+
+class Command(BaseCommand):
+    help = '在临时测试数据库中运行性能基准测试'
+
+    # 不访问数据库、无需创建测试数据库的基准
+    IN_MEMORY_TARGETS = {'validate', 'grading'}
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='target', required=True)
+
+        import_parser = subparsers.add_parser('import', help='成绩导入：逐行实现与批量引擎对比')
+        import_parser.add_argument('--rows', type=int, default=5000, help='导入的行数')
+        import_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='批量引擎的块大小')
+        import_parser.add_argument('--skip-legacy', action='store_true', help='不运行逐行实现')
+
+        export_parser = subparsers.add_parser('export', help='xlsx 导出：pandas 实现与只写模式对比，统计耗时和峰值内存')
+        export_parser.add_argument('--rows', type=int, default=100000, help='成绩条数')
+        export_parser.add_argument('--skip-legacy', action='store_true', help='不运行 pandas 实现')
+
+        validate_parser = subparsers.add_parser('validate', help='导入校验：逐行校验与按列校验对比（不访问数据库）')
+        validate_parser.add_argument('--rows', type=int, default=100000, help='校验的行数')
+        validate_parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最短耗时')
+
+        grading_parser = subparsers.add_parser('grading', help='总成绩计算：逐个模型实例与批量向量化计算对比（不访问数据库）')
+        grading_parser.add_argument('--rows', type=int, default=1000000, help='成绩条数')
+
+        api_parser = subparsers.add_parser('api', help='成绩接口：逐个学生调用与批量接口对比')
+        api_parser.add_argument('--students', type=int, default=40, help='一个班级的学生数')
+        api_parser.add_argument('--repeat', type=int, default=20, help='重复次数')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        bench = getattr(self, f"bench_{options['target']}")
+        if options['target'] in self.IN_MEMORY_TARGETS:
+            bench(**options)
+            return
+        with self.benchmark_database():
+            bench(**options)
+
+    @contextmanager
+    def benchmark_database(self):
+        """创建临时测试数据库，结束后销毁。"""
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, rows):
+        """生成足以覆盖 rows 条成绩的班级、学生和课程。"""
+        student_count = max(1, -(-rows // COURSES_PER_STUDENT))
+        classes = [
+            ClassInformation(ClassID=f'C{i:03d}', ClassName=f'班级{i}', Grade='2024', ClassAdviser='班主任')
+            for i in range(max(1, student_count // 40))
+        ]
+        ClassInformation.objects.bulk_create(classes)
+        Student.objects.bulk_create([
+            Student(
+                StudentID=f'{2024000000 + i}', Name=f'学生{i}', Gender='男', Age=18,
+                Class=classes[i % len(classes)], EnrollmentDate=date(2024, 9, 1)
+            )
+            for i in range(student_count)
+        ], batch_size=1000)
+        Course.objects.bulk_create([
+            Course(CourseID=f'{i:02d}', CourseName=f'课程{i}', CourseDescription='', Credits=3)
+            for i in range(1, COURSES_PER_STUDENT + 1)
+        ])
+        return student_count
+
+    def report(self, label, rows, elapsed, queries):
+        self.stdout.write(
+            f'{label:<12} rows={rows:<8} time={elapsed:8.2f}s '
+            f'rows/s={rows / elapsed:10.1f} queries={queries:<8} queries/row={queries / rows:.3f}'
+        )
+
+    def timed(self, func, *args):
+        """运行 func 并返回 (返回值, 耗时秒数, 执行的SQL语句数)。"""
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            value = func(*args)
+            elapsed = time.perf_counter() - start
+        return value, elapsed, queries
+
+    def bench_import(self, rows, chunk_size, skip_legacy, **options):
+        student_count = self.seed(rows)
+        # 与真实表格一样，课程编号为去掉前导零的数字，约 1% 的行学号不存在
+        sheet = [
+            (i + 2, {
+                '学号': 2024000000 + (i // COURSES_PER_STUDENT) + (student_count if random.random() < 0.01 else 0),
+                '课程编号': str(i % COURSES_PER_STUDENT + 1),
+                '平时成绩': round(random.uniform(40, 100), 1),
+                '期中成绩': round(random.uniform(40, 100), 1),
+                '期末成绩': round(random.uniform(40, 100), 1),
+            })
+            for i in range(rows)
+        ]
+
+        if not skip_legacy:
+            _, elapsed, queries = self.timed(legacy_import, sheet)
+            self.report('legacy', rows, elapsed, queries)
+            Score.objects.all().delete()
+
+        importer = ScoreImporter(chunk_size=chunk_size)
+        _, elapsed, queries = self.timed(importer.run, sheet)
+        self.report('bulk insert', rows, elapsed, queries)
+        _, elapsed, queries = self.timed(importer.run, sheet)
+        self.report('bulk update', rows, elapsed, queries)
+
+    def bench_validate(self, rows, repeat, **options):
+        # 约 1% 的行成绩不是数字，1% 超出范围，1% 与前面的行重复。
+        # 两条路径读取同一个 CSV 文件：旧实现逐行构造字典，新实现由 pandas 按导入块解析
+        text = StringIO()
+        writer = csv.writer(text)
+        writer.writerow(REQUIRED_COLUMNS)
+        for i in range(rows):
+            grade = random.choice(['缺考', 120]) if random.random() < 0.02 else round(random.uniform(40, 100), 1)
+            pair = i - 1 if i and random.random() < 0.01 else i
+            writer.writerow([
+                2024000000 + pair // COURSES_PER_STUDENT, f'{pair % COURSES_PER_STUDENT + 1:02d}',
+                grade, round(random.uniform(40, 100), 1), round(random.uniform(40, 100), 1),
+            ])
+        data = text.getvalue().encode('utf-8')
+
+        def legacy():
+            return len(legacy_validate(read_score_rows(BytesIO(data), 'bench.csv')))
+
+        def vectorized():
+            seen_pairs = set()
+            error_count = 0
+            for raw in read_score_frames(BytesIO(data), 'bench.csv', DEFAULT_CHUNK_SIZE):
+                frame, errors = validate_frame(raw)
+                flag_duplicates(frame, errors, seen_pairs)
+                error_count += int((errors != '').sum())
+            return error_count
+
+        # 取多次运行中的最短耗时，排除首次运行的导入和缓存预热
+        for label, func in [('legacy', legacy), ('vectorized', vectorized)]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                error_count = func()
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(f'{label:<12} rows={rows:<8} time={min(timings):8.3f}s errors={error_count}')
+
+    def seed_scores(self, rows):
+        """生成 rows 条成绩。"""
+        student_count = self.seed(rows)
+        courses = list(Course.objects.values_list('CourseID', flat=True))
+        for start in range(0, rows, 5000):
+            count = min(5000, rows - start)
+            grades = [[round(random.uniform(40, 100), 1) for _ in range(count)] for _ in range(3)]
+            # 总成绩和等级由 bulk_create 计算
+            Score.objects.bulk_create([
+                Score(
+                    Student_id=f'{2024000000 + i // len(courses)}', Course_id=courses[i % len(courses)],
+                    RegularGrade=regular, MidtermGrade=midterm, FinalGrade=final,
+                )
+                for i, regular, midterm, final in zip(range(start, start + count), *grades)
+            ])
+        return student_count
+
+    def bench_export(self, rows, skip_legacy, **options):
+        self.seed_scores(rows)
+        implementations = [('write-only', streaming_export_xlsx)]
+        if not skip_legacy:
+            implementations.insert(0, ('legacy', legacy_export_xlsx))
+        for label, func in implementations:
+            elapsed, peak_mb, size = run_isolated(func)
+            self.stdout.write(
+                f'{label:<12} rows={rows:<8} time={elapsed:8.2f}s peak_rss=+{peak_mb:.1f}MB '
+                f'file={size / 1024 / 1024:.1f}MB'
+            )
+
+    def bench_grading(self, rows, **options):
+        grades = np.round(np.random.default_rng(0).uniform(0, 100, size=(3, rows)), 1)
+        scores = [
+            Score(RegularGrade=regular, MidtermGrade=midterm, FinalGrade=final)
+            for regular, midterm, final in zip(*grades.tolist())
+        ]
+
+        scheme = GradingScheme.default()
+        start = time.perf_counter()
+        for score in scores:
+            score.update_total_grade(scheme)
+        self.stdout.write(f'{"per-object":<12} rows={rows:<8} time={time.perf_counter() - start:8.3f}s')
+
+        start = time.perf_counter()
+        totals, levels = grade_batch(*grades)
+        self.stdout.write(f'{"vectorized":<12} rows={rows:<8} time={time.perf_counter() - start:8.3f}s')
+
+        mismatches = sum(
+            score.TotalGrade != total or score.GradeLevel != level
+            for score, total, level in zip(scores, totals.tolist(), levels.tolist())
+        )
+        self.stdout.write(f'mismatches={mismatches}')
+
+    def bench_api(self, students, repeat, **options):
+        # 生成的班级约 40 人，取第一个班级作为页面上的班级
+        self.seed_scores(max(students, 40) * COURSES_PER_STUDENT)
+        class_id = ClassInformation.objects.order_by('pk').values_list('pk', flat=True)[0]
+        student_ids = list(Student.objects.filter(Class_id=class_id).values_list('pk', flat=True)[:students])
+
+        setup_test_environment()
+        try:
+            client = Client()
+            client.force_login(User.objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark'))
+
+            def per_student():
+                return sum(len(client.get(f'/api/scores/{student_id}/').content) for student_id in student_ids)
+
+            def batch(**params):
+                return lambda: len(client.get('/api/scores/batch/', {
+                    'student_ids': ','.join(student_ids), **params,
+                }).content)
+
+            for label, func, requests in (
+                ('per-student', per_student, len(student_ids)),
+                ('batch', batch(), 1),
+                ('batch fields', batch(fields='course_id,total_grade'), 1),
+            ):
+                size, elapsed, queries = self.timed(lambda: [func() for _ in range(repeat)][-1])
+                self.stdout.write(
+                    f'{label:<12} students={len(student_ids):<4} requests={requests:<4} '
+                    f'time={elapsed / repeat * 1000:8.2f}ms queries={queries // repeat:<4} bytes={size}'
+                )
+        finally:
+            teardown_test_environment()
+
+        # 编码器对比：同一份批量数据编码 repeat 次
+        data = {'students': scores_by_student(student_ids=student_ids)}
+        encoders = [('json', lambda: json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8'))]
+        if orjson is not None:
+            encoders.append(('orjson', lambda: orjson.dumps(data)))
+        for label, encode in encoders:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                encode()
+            self.stdout.write(f'{label:<12} encode time={(time.perf_counter() - start) / repeat * 1000:8.3f}ms')
@@ -0,0 +1,17 @@
+"""
+清理超过保留期限的删除记录（见 changes.TOMBSTONE_RETENTION_DAYS），建议每天执行一次。
+
+用法:
+    python manage.py prune_tombstones
+"""
+from django.core.management.base import BaseCommand
+
+from sms_app.changes import TOMBSTONE_RETENTION_DAYS, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = '删除超过保留期限的增量同步删除记录'
+
+    def handle(self, *args, **options):
+        count = prune_tombstones()
+        self.stdout.write(f'Pruned {count} tombstones older than {TOMBSTONE_RETENTION_DAYS} days')
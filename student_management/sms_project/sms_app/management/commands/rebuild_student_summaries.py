@@ -0,0 +1,20 @@
+"""
+从成绩表整体重建学生成绩汇总（学分加权平均分、学分绩点、班级和年级排名）。
+
+用法:
+    python manage.py rebuild_student_summaries
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from sms_app.summaries import rebuild_all
+
+
+class Command(BaseCommand):
+    help = '按成绩表批量重建全部学生成绩汇总和排名'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_all()
+        self.stdout.write(f'Rebuilt {count} student summaries in {time.perf_counter() - started:.2f}s')
@@ -0,0 +1,42 @@
+"""
+后台任务工作进程。
+
+用法:
+    python manage.py run_jobs            # 持续轮询并执行任务
+    python manage.py run_jobs --once     # 执行完当前等待中的任务后退出
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from sms_app.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = '轮询数据库中的后台任务（成绩导入/导出）并依次执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='没有等待中的任务时立即退出')
+        parser.add_argument('--interval', type=float, default=2.0, help='空闲时的轮询间隔（秒）')
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='执行中的任务超过该秒数没有心跳时视为中断并重新排队（心跳间隔见 jobs.HEARTBEAT_INTERVAL）'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Job worker started')
+        while True:
+            # 长时间运行的进程需要主动回收失效的数据库连接
+            close_old_connections()
+            requeue_stale_jobs(timedelta(seconds=options['stale_after']))
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+            self.stdout.write(f'Running {job}')
+            run_job(job)
+            self.stdout.write(f'{job}: {job.get_Status_display()} {job.Message}')
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sms_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('JobID', models.AutoField(primary_key=True, serialize=False, verbose_name='任务编号')),
+                ('Kind', models.CharField(choices=[('import', '成绩导入'), ('export', '成绩导出')], max_length=20, verbose_name='任务类型')),
+                ('Status', models.CharField(choices=[('pending', '等待中'), ('running', '执行中'), ('success', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('InputFile', models.FileField(blank=True, upload_to='jobs/input/', verbose_name='上传文件')),
+                ('ResultFile', models.FileField(blank=True, upload_to='jobs/result/', verbose_name='结果文件')),
+                ('Params', models.JSONField(blank=True, default=dict, verbose_name='任务参数')),
+                ('TotalRows', models.IntegerField(blank=True, null=True, verbose_name='总行数')),
+                ('ProcessedRows', models.IntegerField(default=0, verbose_name='已处理行数')),
+                ('SuccessCount', models.IntegerField(default=0, verbose_name='成功数')),
+                ('ErrorCount', models.IntegerField(default=0, verbose_name='失败数')),
+                ('Errors', models.JSONField(blank=True, default=list, verbose_name='错误信息')),
+                ('Message', models.TextField(blank=True, default='', verbose_name='结果说明')),
+                ('StartedAt', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('FinishedAt', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('UpdatedAt', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('CreatedBy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'ordering': ['-CreatedAt'],
+                'indexes': [models.Index(fields=['Status', 'CreatedAt'], name='sms_app_job_Status_bb653c_idx')],
+            },
+        ),
+    ]
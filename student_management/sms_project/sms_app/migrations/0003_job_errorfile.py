@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0002_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='ErrorFile',
+            field=models.FileField(blank=True, upload_to='jobs/errors/', verbose_name='错误报告'),
+        ),
+    ]
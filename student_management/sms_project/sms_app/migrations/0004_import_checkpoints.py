@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0003_job_errorfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='FileHash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='文件摘要'),
+        ),
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('FileHash', models.CharField(max_length=64, verbose_name='文件摘要')),
+                ('ChunkSize', models.IntegerField(verbose_name='块大小')),
+                ('ChunkNo', models.IntegerField(verbose_name='块序号')),
+                ('FirstRow', models.IntegerField(verbose_name='起始行号')),
+                ('LastRow', models.IntegerField(verbose_name='结束行号')),
+                ('SuccessCount', models.IntegerField(default=0, verbose_name='成功数')),
+                ('ErrorCount', models.IntegerField(default=0, verbose_name='失败数')),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '导入检查点',
+                'verbose_name_plural': '导入检查点',
+                'ordering': ['FileHash', 'ChunkNo'],
+                'unique_together': {('FileHash', 'ChunkSize', 'ChunkNo')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0004_import_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('Name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='名称')),
+                ('Version', models.PositiveBigIntegerField(default=0, verbose_name='版本号')),
+                ('UpdatedAt', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '数据版本',
+                'verbose_name_plural': '数据版本',
+            },
+        ),
+    ]
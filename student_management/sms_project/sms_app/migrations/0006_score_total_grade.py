@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:33
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Round
+
+
+def backfill_total_grades(apps, schema_editor):
+    """用两条 UPDATE 语句为已有成绩计算总成绩和等级，不把数据读入 Python。"""
+    Score = apps.get_model('sms_app', 'Score')
+    Score.objects.update(TotalGrade=Round(
+        F('RegularGrade') * 0.3 + F('MidtermGrade') * 0.3 + F('FinalGrade') * 0.4, 2
+    ))
+    Score.objects.update(GradeLevel=Case(
+        When(TotalGrade__gte=90, then=Value('A')),
+        When(TotalGrade__gte=80, then=Value('B')),
+        When(TotalGrade__gte=70, then=Value('C')),
+        When(TotalGrade__gte=60, then=Value('D')),
+        default=Value('F'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0005_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='score',
+            name='GradeLevel',
+            field=models.CharField(default='F', editable=False, max_length=1, verbose_name='等级'),
+        ),
+        migrations.AddField(
+            model_name='score',
+            name='TotalGrade',
+            field=models.FloatField(default=0, editable=False, verbose_name='总成绩'),
+        ),
+        migrations.RunPython(backfill_total_grades, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['Course', 'TotalGrade'], name='sms_app_sco_Course__7173b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['Course', 'GradeLevel'], name='sms_app_sco_Course__f2e279_idx'),
+        ),
+    ]
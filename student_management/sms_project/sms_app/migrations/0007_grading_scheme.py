@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:37
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0006_score_total_grade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingScheme',
+            fields=[
+                ('SchemeID', models.AutoField(primary_key=True, serialize=False, verbose_name='方案编号')),
+                ('Name', models.CharField(max_length=100, unique=True, verbose_name='方案名称')),
+                ('RegularWeight', models.FloatField(default=0.3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)], verbose_name='平时成绩权重')),
+                ('MidtermWeight', models.FloatField(default=0.3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)], verbose_name='期中成绩权重')),
+                ('FinalWeight', models.FloatField(default=0.4, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)], verbose_name='期末成绩权重')),
+                ('ThresholdA', models.FloatField(default=90, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='A等级分数线')),
+                ('ThresholdB', models.FloatField(default=80, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='B等级分数线')),
+                ('ThresholdC', models.FloatField(default=70, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='C等级分数线')),
+                ('ThresholdD', models.FloatField(default=60, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='D等级分数线')),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('UpdatedAt', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '成绩计算方案',
+                'verbose_name_plural': '成绩计算方案',
+                'ordering': ['Name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='Scheme',
+            field=models.ForeignKey(blank=True, help_text='不选择时使用默认方案', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='courses', to='sms_app.gradingscheme', verbose_name='成绩计算方案'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0007_grading_scheme'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSummary',
+            fields=[
+                ('Student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='sms_app.student', verbose_name='学生')),
+                ('Grade', models.CharField(max_length=50, verbose_name='年级')),
+                ('CourseCount', models.IntegerField(default=0, verbose_name='课程数')),
+                ('TotalCredits', models.IntegerField(default=0, verbose_name='总学分')),
+                ('WeightedAverage', models.FloatField(default=0, verbose_name='学分加权平均分')),
+                ('GPA', models.FloatField(default=0, verbose_name='学分绩点')),
+                ('ClassRank', models.IntegerField(blank=True, null=True, verbose_name='班级排名')),
+                ('GradeRank', models.IntegerField(blank=True, null=True, verbose_name='年级排名')),
+                ('UpdatedAt', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('Class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sms_app.classinformation', verbose_name='班级')),
+            ],
+            options={
+                'verbose_name': '学生成绩汇总',
+                'verbose_name_plural': '学生成绩汇总',
+                'ordering': ['Class', 'ClassRank'],
+                'indexes': [models.Index(fields=['Class', 'ClassRank'], name='sms_app_stu_Class_i_d37d51_idx'), models.Index(fields=['Grade', 'GradeRank'], name='sms_app_stu_Grade_0e22c6_idx')],
+            },
+        ),
+    ]
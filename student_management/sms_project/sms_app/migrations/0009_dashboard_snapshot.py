@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:47
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0008_student_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Snapshot',
+            fields=[
+                ('Name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='名称')),
+                ('Data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='数据')),
+                ('Versions', models.CharField(blank=True, default='', max_length=200, verbose_name='数据版本')),
+                ('BuiltAt', models.DateTimeField(auto_now=True, verbose_name='生成时间')),
+            ],
+            options={
+                'verbose_name': '数据快照',
+                'verbose_name_plural': '数据快照',
+            },
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='Kind',
+            field=models.CharField(choices=[('import', '成绩导入'), ('export', '成绩导出'), ('dashboard', '刷新仪表盘')], max_length=20, verbose_name='任务类型'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# 迁移不引用 sms_app.search：以后修改搜索实现不会改变已执行迁移的含义。
+# 表名和对象名与 search 模块中的常量一致。
+
+MYSQL_INSTALL = (
+    'ALTER TABLE `sms_app_student` ADD FULLTEXT INDEX `sms_student_name_ft` (`Name`) WITH PARSER ngram',
+    'ALTER TABLE `sms_app_classinformation` ADD FULLTEXT INDEX `sms_class_name_ft` (`ClassName`) WITH PARSER ngram',
+)
+
+MYSQL_UNINSTALL = (
+    'ALTER TABLE `sms_app_student` DROP INDEX `sms_student_name_ft`',
+    'ALTER TABLE `sms_app_classinformation` DROP INDEX `sms_class_name_ft`',
+)
+
+# FTS5 trigram 虚拟表的 rowid 与学生表的 rowid 一致，触发器按 rowid 同步
+SQLITE_CLASS_NAME = '(SELECT "ClassName" FROM "sms_app_classinformation" WHERE "ClassID" = new."Class_id")'
+
+SQLITE_INSTALL = (
+    'CREATE VIRTUAL TABLE "sms_app_student_fts" '
+    'USING fts5("StudentID" UNINDEXED, "Name", "ClassName", tokenize=\'trigram\')',
+    'INSERT INTO "sms_app_student_fts" (rowid, "StudentID", "Name", "ClassName") '
+    'SELECT s.rowid, s."StudentID", s."Name", c."ClassName" '
+    'FROM "sms_app_student" s LEFT JOIN "sms_app_classinformation" c ON c."ClassID" = s."Class_id"',
+    'CREATE TRIGGER sms_student_fts_insert AFTER INSERT ON "sms_app_student" BEGIN '
+    'INSERT INTO "sms_app_student_fts" (rowid, "StudentID", "Name", "ClassName") '
+    f'VALUES (new.rowid, new."StudentID", new."Name", {SQLITE_CLASS_NAME}); END',
+    'CREATE TRIGGER sms_student_fts_update AFTER UPDATE OF "StudentID", "Name", "Class_id" ON "sms_app_student" BEGIN '
+    'DELETE FROM "sms_app_student_fts" WHERE rowid = old.rowid; '
+    'INSERT INTO "sms_app_student_fts" (rowid, "StudentID", "Name", "ClassName") '
+    f'VALUES (new.rowid, new."StudentID", new."Name", {SQLITE_CLASS_NAME}); END',
+    'CREATE TRIGGER sms_student_fts_delete AFTER DELETE ON "sms_app_student" BEGIN '
+    'DELETE FROM "sms_app_student_fts" WHERE rowid = old.rowid; END',
+    'CREATE TRIGGER sms_class_fts_rename AFTER UPDATE OF "ClassName" ON "sms_app_classinformation" BEGIN '
+    'UPDATE "sms_app_student_fts" SET "ClassName" = new."ClassName" '
+    'WHERE rowid IN (SELECT rowid FROM "sms_app_student" WHERE "Class_id" = new."ClassID"); END',
+)
+
+SQLITE_UNINSTALL = (
+    'DROP TRIGGER IF EXISTS sms_student_fts_insert',
+    'DROP TRIGGER IF EXISTS sms_student_fts_update',
+    'DROP TRIGGER IF EXISTS sms_student_fts_delete',
+    'DROP TRIGGER IF EXISTS sms_class_fts_rename',
+    'DROP TABLE IF EXISTS "sms_app_student_fts"',
+)
+
+STATEMENTS = {
+    'mysql': (MYSQL_INSTALL, MYSQL_UNINSTALL),
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+}
+
+
+def install_search_index(apps, schema_editor):
+    """创建当前数据库的学生搜索索引（MySQL FULLTEXT / SQLite FTS5 及同步触发器），其他数据库不创建。"""
+    install, _uninstall = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in install:
+        schema_editor.execute(statement)
+
+
+def uninstall_search_index(apps, schema_editor):
+    _install, uninstall = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in uninstall:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0009_dashboard_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
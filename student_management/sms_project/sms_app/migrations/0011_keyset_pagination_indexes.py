@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0010_student_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['CreatedAt', 'ScoreID'], name='sms_app_sco_Created_510f4f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['CreatedAt', 'StudentID'], name='sms_app_stu_Created_a3f897_idx'),
+        ),
+    ]
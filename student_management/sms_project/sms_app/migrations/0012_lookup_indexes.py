@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0011_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classinformation',
+            index=models.Index(fields=['ClassName'], name='sms_app_cla_ClassNa_60bade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['CourseName'], name='sms_app_cou_CourseN_6d2ca1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['Name'], name='sms_app_stu_Name_27d139_idx'),
+        ),
+    ]
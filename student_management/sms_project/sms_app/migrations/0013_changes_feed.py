@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0012_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Resource', models.CharField(max_length=20, verbose_name='资源')),
+                ('ObjectID', models.CharField(max_length=20, verbose_name='对象编号')),
+                ('DeletedAt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='删除时间')),
+            ],
+            options={
+                'verbose_name': '删除记录',
+                'verbose_name_plural': '删除记录',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='classinformation',
+            index=models.Index(fields=['UpdatedAt'], name='sms_app_cla_Updated_5c1eed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['UpdatedAt'], name='sms_app_cou_Updated_d25b6b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['UpdatedAt'], name='sms_app_sco_Updated_5ea904_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['UpdatedAt'], name='sms_app_stu_Updated_1d982b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['Resource', 'DeletedAt'], name='sms_app_tom_Resourc_090ad5_idx'),
+        ),
+    ]
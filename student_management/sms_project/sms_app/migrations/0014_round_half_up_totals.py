@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:10
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Floor
+from django.db.models.lookups import GreaterThanOrEqual
+
+# 与 grading.DEFAULT_WEIGHTS 和 DEFAULT_THRESHOLDS 相同，课程未指定方案时使用
+DEFAULT_WEIGHTS = (0.3, 0.3, 0.4)
+DEFAULT_THRESHOLDS = (90, 80, 70, 60)
+
+
+def regrade(scores, weights, thresholds):
+    """按给定权重和分数线，用一条 UPDATE 以四舍五入重新计算总成绩和等级。"""
+    regular_weight, midterm_weight, final_weight = weights
+    total = F('RegularGrade') * regular_weight + F('MidtermGrade') * midterm_weight + F('FinalGrade') * final_weight
+    total = Floor((Floor(total * Value(10000.0) + Value(0.5)) + Value(50.0)) / Value(100.0)) / Value(100.0)
+    scores.update(
+        TotalGrade=total,
+        # 等级不引用 TotalGrade 列：MySQL 在同一条 UPDATE 中会读到已更新的值，其他数据库读到旧值
+        GradeLevel=Case(
+            *[When(GreaterThanOrEqual(total, Value(float(threshold))), then=Value(level))
+              for level, threshold in zip('ABCD', thresholds)],
+            default=Value('F'),
+            output_field=models.CharField(),
+        ),
+    )
+
+
+def regrade_all(apps, schema_editor):
+    """按各课程的方案重新计算已保存的总成绩，统一为与 Python 相同的四舍五入规则。"""
+    GradingScheme = apps.get_model('sms_app', 'GradingScheme')
+    Score = apps.get_model('sms_app', 'Score')
+    for scheme in GradingScheme.objects.all():
+        regrade(
+            Score.objects.filter(Course__Scheme=scheme),
+            (scheme.RegularWeight, scheme.MidtermWeight, scheme.FinalWeight),
+            (scheme.ThresholdA, scheme.ThresholdB, scheme.ThresholdC, scheme.ThresholdD),
+        )
+    regrade(Score.objects.filter(Course__Scheme__isnull=True), DEFAULT_WEIGHTS, DEFAULT_THRESHOLDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sms_app', '0013_changes_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(regrade_all, migrations.RunPython.noop),
+    ]
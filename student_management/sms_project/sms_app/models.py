@@ -1,7 +1,106 @@
-from django.db import models
+import threading
+
+from django.conf import settings
+import numpy as np
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce, Floor
+from django.db.models.lookups import GreaterThanOrEqual
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .grading import (
+    DEFAULT_THRESHOLDS, DEFAULT_WEIGHTS, GRADE_LEVELS, calculate_total_grade, grade_batch, grade_level_for,
+)
+
+# 当前线程的事务中待递增的数据版本名称，按保存点分组，见 DataVersion.bump_on_commit
+_pending_bumps = threading.local()
+
+
+class _PendingBumps:
+    """同一事务（保存点）中待递增的数据版本名称，提交时由第一个执行的回调一次递增。"""
+
+    def __init__(self):
+        self.names = set()
+
+    def __call__(self):
+        names, self.names = self.names, set()
+        if names:
+            DataVersion.bump(*names)
+
+    def registered(self, connection):
+        """回调是否仍在连接的提交回调中，回滚时 Django 会丢弃对应保存点中注册的回调"""
+        return any(entry[1] is self for entry in reversed(connection.run_on_commit))
+
+class VersionedQuerySet(models.QuerySet):
+    """
+    批量写入后递增数据版本号的查询集。
+
+    update / bulk_create / bulk_update / delete 不会逐条发送 post_save 信号，
+    在此统一使依赖该模型的缓存失效（见 caching 模块）：除模型版本号外，
+    还按 dependent_versions 递增与 signals 模块单条写入相同的成绩、课程和学生版本号。
+    使用本查询集的模型都有 UpdatedAt 字段，update / bulk_update 会同时更新它。
+    """
+
+    def dependent_versions(self, objs=None):
+        """
+        写入的数据所影响的其他数据版本名称，子类按 signals 模块中单条写入的规则覆盖。
+
+        参数:
+            objs (list): bulk_create / bulk_update 写入的实例；为 None 时指本查询集中的行，
+                update 在写入之前调用，筛选条件引用被修改的字段时也能找到原来的行。
+
+        返回:
+            iterable: 数据版本名称。
+        """
+        return ()
+
+    def bump_version(self, dependents=()):
+        """递增本模型的数据版本号以及 dependents 中的数据版本号"""
+        DataVersion.bump(DataVersion.model_key(self.model), *dependents)
+
+    def update(self, **kwargs):
+        # UPDATE 语句不会触发 auto_now，补上更新时间，增量同步接口据此发现变化
+        kwargs.setdefault('UpdatedAt', timezone.now())
+        dependents = list(self.dependent_versions())
+        rows = super().update(**kwargs)
+        if rows:
+            self.bump_version(dependents)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            self.bump_version(self.dependent_versions(objs))
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if 'UpdatedAt' not in fields:
+            now = timezone.now()
+            for obj in objs:
+                obj.UpdatedAt = now
+            fields = [*fields, 'UpdatedAt']
+        rows = super().bulk_update(objs, fields, batch_size=batch_size)
+        if rows:
+            self.bump_version(self.dependent_versions(objs))
+        return rows
+
+    bulk_update.alters_data = True
+
+    def delete(self):
+        deleted, counts = super().delete()
+        if deleted:
+            self.bump_version()
+        return deleted, counts
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
 class ClassInformation(models.Model):
     ClassID = models.CharField(max_length=20, primary_key=True, verbose_name=_('班级编号'))
     ClassName = models.CharField(max_length=100, verbose_name=_('班级名称'))
@@ -10,14 +109,37 @@ class ClassInformation(models.Model):
     CreatedAt = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
     UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
 
+    objects = VersionedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('班级信息')
         verbose_name_plural = _('班级信息')
         ordering = ['-CreatedAt']
+        indexes = [
+            # 下拉框按班级名称前缀查找
+            models.Index(fields=['ClassName']),
+            # 增量同步按更新时间查找变化
+            models.Index(fields=['UpdatedAt']),
+        ]
 
     def __str__(self):
         return self.ClassName
 
+    def save(self, *args, **kwargs):
+        """保存班级，年级变化时同步学生成绩汇总中的年级和年级排名"""
+        previous_grade = ClassInformation.objects.filter(pk=self.pk).values_list('Grade', flat=True).first()
+        super().save(*args, **kwargs)
+        if previous_grade is not None and previous_grade != self.Grade:
+            from .summaries import move_class_grade
+            move_class_grade(self, previous_grade)
+
+class StudentQuerySet(VersionedQuerySet):
+    def dependent_versions(self, objs=None):
+        # 学生姓名等信息出现在其所选课程的统计排名中
+        student_ids = self.values('pk') if objs is None else [obj.pk for obj in objs]
+        course_ids = Score.objects.filter(Student__in=student_ids).values_list('Course_id', flat=True).distinct()
+        return [DataVersion.SCORES, *map(DataVersion.course_key, course_ids)]
+
 class Student(models.Model):
     StudentID = models.CharField(max_length=20, primary_key=True, verbose_name=_('学号'))
     Name = models.CharField(max_length=100, verbose_name=_('姓名'))
@@ -34,14 +156,172 @@ class Student(models.Model):
     CreatedAt = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
     UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
 
+    objects = StudentQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('学生信息')
         verbose_name_plural = _('学生信息')
         ordering = ['-CreatedAt']
+        indexes = [
+            # 学生列表按 (CreatedAt, StudentID) 键集分页
+            models.Index(fields=['CreatedAt', 'StudentID']),
+            # 下拉框按姓名前缀查找
+            models.Index(fields=['Name']),
+            # 增量同步按更新时间查找变化
+            models.Index(fields=['UpdatedAt']),
+        ]
 
     def __str__(self):
         return f"{self.Name} ({self.StudentID})"
 
+def weighted_total_expression(regular_weight, midterm_weight, final_weight, grades=None):
+    """
+    返回按权重计算总成绩（保留两位小数）的数据库表达式。
+
+    不使用 ROUND()：各数据库对浮点数 ROUND 的实现不同（MySQL 的 DOUBLE 按 C 库舍入，SQLite 先转十进制），
+    这里用 FLOOR 实现与 grading.total_grades 完全相同的四舍五入。常量写成浮点数，
+    避免 SQLite 上 FLOOR 返回整数后做整数除法。
+
+    参数:
+        regular_weight, midterm_weight, final_weight: 三项成绩的权重，数值或数据库表达式。
+        grades (tuple): 可选，三项成绩的数据库表达式，默认为 Score 的三个成绩字段。
+
+    返回:
+        Expression: 总成绩表达式。
+    """
+    regular, midterm, final = grades or (F(name) for name in Score.GRADE_FIELDS)
+    total = regular * regular_weight + midterm * midterm_weight + final * final_weight
+    return Floor((Floor(total * Value(10000.0) + Value(0.5)) + Value(50.0)) / Value(100.0)) / Value(100.0)
+
+def grade_level_expression(total, thresholds):
+    """
+    返回将总成绩换算为等级的 CASE 表达式。
+
+    参数:
+        total (Expression): 总成绩表达式。
+        thresholds (iterable): A/B/C/D 的分数线，从高到低，数值或数据库表达式。
+
+    返回:
+        Case: 等级表达式。
+    """
+    return Case(
+        *[When(GreaterThanOrEqual(total, threshold), then=Value(level))
+          for level, threshold in zip(GRADE_LEVELS, thresholds)],
+        default=Value('F'),
+        output_field=models.CharField(),
+    )
+
+class GradingScheme(models.Model):
+    """
+    成绩计算方案：三项成绩的权重和各等级的分数线，可被多门课程共用。
+
+    未指定方案的课程使用默认方案（平时30% + 期中30% + 期末40%，90/80/70/60 分数线）。
+    修改权重或分数线后，使用该方案的课程的成绩会通过一条 UPDATE 语句重新计算。
+    """
+    WEIGHT_FIELDS = ('RegularWeight', 'MidtermWeight', 'FinalWeight')
+    THRESHOLD_FIELDS = ('ThresholdA', 'ThresholdB', 'ThresholdC', 'ThresholdD')
+
+    SchemeID = models.AutoField(primary_key=True, verbose_name=_('方案编号'))
+    Name = models.CharField(max_length=100, unique=True, verbose_name=_('方案名称'))
+    RegularWeight = models.FloatField(
+        default=DEFAULT_WEIGHTS[0],
+        validators=[MinValueValidator(0), MaxValueValidator(1)],
+        verbose_name=_('平时成绩权重')
+    )
+    MidtermWeight = models.FloatField(
+        default=DEFAULT_WEIGHTS[1],
+        validators=[MinValueValidator(0), MaxValueValidator(1)],
+        verbose_name=_('期中成绩权重')
+    )
+    FinalWeight = models.FloatField(
+        default=DEFAULT_WEIGHTS[2],
+        validators=[MinValueValidator(0), MaxValueValidator(1)],
+        verbose_name=_('期末成绩权重')
+    )
+    ThresholdA = models.FloatField(
+        default=DEFAULT_THRESHOLDS[0],
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        verbose_name=_('A等级分数线')
+    )
+    ThresholdB = models.FloatField(
+        default=DEFAULT_THRESHOLDS[1],
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        verbose_name=_('B等级分数线')
+    )
+    ThresholdC = models.FloatField(
+        default=DEFAULT_THRESHOLDS[2],
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        verbose_name=_('C等级分数线')
+    )
+    ThresholdD = models.FloatField(
+        default=DEFAULT_THRESHOLDS[3],
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        verbose_name=_('D等级分数线')
+    )
+    CreatedAt = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
+    UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
+
+    class Meta:
+        verbose_name = _('成绩计算方案')
+        verbose_name_plural = _('成绩计算方案')
+        ordering = ['Name']
+
+    def __str__(self):
+        return self.Name
+
+    @classmethod
+    def default(cls):
+        """返回未保存的默认方案，用于未指定方案的课程。"""
+        return cls(Name=_('默认'))
+
+    @property
+    def weights(self):
+        return tuple(getattr(self, name) for name in self.WEIGHT_FIELDS)
+
+    @property
+    def thresholds(self):
+        return tuple(getattr(self, name) for name in self.THRESHOLD_FIELDS)
+
+    def clean(self):
+        """校验权重之和为1，分数线从A到D依次降低"""
+        if abs(sum(self.weights) - 1) > 1e-6:
+            raise ValidationError(_('三项成绩的权重之和必须为1'))
+        thresholds = self.thresholds
+        if any(higher <= lower for higher, lower in zip(thresholds, thresholds[1:])):
+            raise ValidationError(_('等级分数线必须按A、B、C、D依次降低'))
+
+    def save(self, *args, **kwargs):
+        """保存方案，权重或分数线有变化时重新计算使用该方案的全部成绩"""
+        rule_fields = self.WEIGHT_FIELDS + self.THRESHOLD_FIELDS
+        previous = None
+        if self.pk is not None:
+            previous = GradingScheme.objects.filter(pk=self.pk).values_list(*rule_fields).first()
+        super().save(*args, **kwargs)
+        if previous is not None and previous != self.weights + self.thresholds:
+            self.regrade()
+
+    def total_expression(self, grades=None):
+        """本方案的总成绩数据库表达式，grades 见 weighted_total_expression"""
+        return weighted_total_expression(*self.weights, grades=grades)
+
+    def level_expression(self, total):
+        """本方案的等级数据库表达式"""
+        return grade_level_expression(total, self.thresholds)
+
+    def regrade(self):
+        """
+        重新计算使用本方案的全部课程的成绩。
+
+        返回:
+            int: 更新的成绩条数。
+        """
+        return Score.objects.filter(Course__in=self.courses.values('pk')).regrade(self)
+
+class CourseQuerySet(VersionedQuerySet):
+    def dependent_versions(self, objs=None):
+        course_ids = self.values_list('pk', flat=True) if objs is None else [obj.pk for obj in objs]
+        return [DataVersion.SCORES, *map(DataVersion.course_key, course_ids)]
+
 class Course(models.Model):
     CourseID = models.CharField(max_length=20, primary_key=True, verbose_name=_('课程编号'))
     CourseName = models.CharField(max_length=100, verbose_name=_('课程名称'))
@@ -50,18 +330,244 @@ class Course(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(10)],
         verbose_name=_('学分')
     )
+    Scheme = models.ForeignKey(
+        GradingScheme,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='courses',
+        verbose_name=_('成绩计算方案'),
+        help_text=_('不选择时使用默认方案')
+    )
     CreatedAt = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
     UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
 
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('课程信息')
         verbose_name_plural = _('课程信息')
         ordering = ['CourseName']
+        indexes = [
+            # 默认排序和下拉框按课程名称前缀查找
+            models.Index(fields=['CourseName']),
+            # 增量同步按更新时间查找变化
+            models.Index(fields=['UpdatedAt']),
+        ]
 
     def __str__(self):
         return self.CourseName
 
+    def save(self, *args, **kwargs):
+        """保存课程，更换成绩计算方案时重新计算该课程的全部成绩，学分变化时重新汇总选课学生的成绩"""
+        previous = Course.objects.filter(pk=self.pk).values_list('Scheme_id', 'Credits').first()
+        super().save(*args, **kwargs)
+        if previous is None:
+            return
+        previous_scheme_id, previous_credits = previous
+        scores = Score.objects.filter(Course=self)
+        if previous_scheme_id != self.Scheme_id:
+            # 重新计算成绩时会一并重新汇总学生成绩
+            scores.regrade(self.grading_scheme)
+        elif previous_credits != self.Credits:
+            from .summaries import update_students
+            update_students(scores.values_list('Student_id', flat=True))
+
+    @property
+    def grading_scheme(self):
+        """课程使用的成绩计算方案，未指定时为默认方案"""
+        return self.Scheme or GradingScheme.default()
+
+class ScoreQuerySet(VersionedQuerySet):
+    """
+    成绩查询集。
+
+    bulk_create / bulk_update / update 不调用 Score.save()，也不触发信号：写入三项成绩或课程时
+    在此按各课程的方案重新计算 TotalGrade 和 GradeLevel，与逐条保存的结果一致；写入影响汇总的字段时
+    重新汇总涉及的学生（见 summaries.update_students）。
+    """
+
+    def dependent_versions(self, objs=None):
+        if objs is None:
+            pairs = set(self.values_list('Course_id', 'Student_id').distinct())
+        else:
+            pairs = {(obj.Course_id, obj.Student_id) for obj in objs}
+        return [
+            DataVersion.SCORES,
+            *{DataVersion.course_key(course_id) for course_id, _student_id in pairs},
+            *{DataVersion.student_key(student_id) for _course_id, student_id in pairs},
+        ]
+
+    def fill_totals(self, objs):
+        """
+        按各课程的成绩计算方案一次计算 objs 的 TotalGrade 和 GradeLevel，不保存。
+
+        参数:
+            objs (list): Score 实例，需已设置三项成绩和 Course_id。
+        """
+        if not objs:
+            return
+        schemes = {
+            course.pk: course.grading_scheme
+            for course in Course.objects.filter(pk__in={obj.Course_id for obj in objs}).select_related('Scheme')
+        }
+        default = GradingScheme.default()
+        rows = [schemes.get(obj.Course_id, default) for obj in objs]
+        weights = np.array([scheme.weights for scheme in rows], dtype=float).T
+        thresholds = np.array([scheme.thresholds for scheme in rows], dtype=float).T
+        totals, levels = grade_batch(
+            *([getattr(obj, name) for obj in objs] for name in Score.GRADE_FIELDS), weights, thresholds
+        )
+        for obj, total, level in zip(objs, totals.tolist(), levels.tolist()):
+            obj.TotalGrade = total
+            obj.GradeLevel = level
+
+    def summarize(self, student_ids):
+        """重新汇总给定学生的成绩并重新排名。"""
+        from .summaries import update_students
+        update_students(student_ids)
+
+    def bulk_create(self, objs, *args, summarize=True, **kwargs):
+        """
+        批量创建成绩。
+
+        参数:
+            summarize (bool): 是否重新汇总涉及的学生；自行汇总的调用方（如 ScoreImporter）传 False。
+        """
+        objs = list(objs)
+        self.fill_totals(objs)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if summarize and objs:
+                self.summarize({obj.Student_id for obj in objs})
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None, summarize=True):
+        """
+        批量更新成绩。
+
+        参数:
+            summarize (bool): 是否重新汇总涉及的学生（更换学生时包括原来的学生）。
+        """
+        objs = list(objs)
+        if Score.TOTAL_INPUTS & set(fields):
+            self.fill_totals(objs)
+            fields = [*fields, *(name for name in ('TotalGrade', 'GradeLevel') if name not in fields)]
+        summarize = summarize and bool(objs) and bool(Score.SUMMARY_INPUTS & set(fields))
+        with transaction.atomic(using=self.db):
+            student_ids = {obj.Student_id for obj in objs} if summarize else set()
+            if summarize and Score.STUDENT_FIELDS & set(fields):
+                student_ids.update(
+                    Score.objects.filter(pk__in=[obj.pk for obj in objs]).values_list('Student_id', flat=True)
+                )
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+            if rows and student_ids:
+                self.summarize(student_ids)
+        return rows
+
+    bulk_update.alters_data = True
+
+    def update(self, **kwargs):
+        """
+        批量更新成绩；写入三项成绩或课程且未直接指定 TotalGrade 时，
+        在同一条 UPDATE 中按各课程的方案重新计算总成绩和等级，写入影响汇总的字段时重新汇总涉及的学生。
+        """
+        if not Score.SUMMARY_INPUTS & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # 筛选条件可能引用被修改的字段，写入前记下涉及的学生
+            student_ids = set(self.values_list('Student_id', flat=True).distinct())
+            student = kwargs.get('Student', kwargs.get('Student_id'))
+            if student is not None:
+                student_ids.add(getattr(student, 'pk', student))
+            if 'TotalGrade' in kwargs or not Score.TOTAL_INPUTS & kwargs.keys():
+                count = super().update(**kwargs)
+            else:
+                count = self._update_totals(kwargs)
+            if count:
+                self.summarize(student_ids)
+        return count
+
+    update.alters_data = True
+
+    def _update_totals(self, kwargs):
+        """按各课程的方案分组执行 UPDATE，写入 kwargs 并重新计算总成绩和等级。"""
+        # 写入的值代替对应字段参与计算，未写入的成绩读取原值
+        grades = [
+            F(name) if name not in kwargs
+            else kwargs[name] if hasattr(kwargs[name], 'resolve_expression') else Value(float(kwargs[name]))
+            for name in Score.GRADE_FIELDS
+        ]
+        course = kwargs.get('Course', kwargs.get('Course_id'))
+        if course is not None:
+            if not isinstance(course, Course):
+                course = Course.objects.select_related('Scheme').get(pk=course)
+            groups = [(self, course.grading_scheme)]
+        else:
+            # UPDATE 不能引用关联表的字段，按方案分组执行，方案的权重和分数线作为常量写入语句
+            scheme_ids = set(self.values_list('Course__Scheme', flat=True).distinct())
+            groups = [
+                (self.filter(Course__Scheme=scheme), scheme)
+                for scheme in GradingScheme.objects.filter(pk__in=scheme_ids)
+            ]
+            if None in scheme_ids:
+                groups.append((self.filter(Course__Scheme__isnull=True), GradingScheme.default()))
+        count = 0
+        for queryset, scheme in groups:
+            total = scheme.total_expression(grades)
+            # MySQL 按 SET 子句的顺序赋值并读取已赋值的列，总成绩和等级放在最前面，与其他数据库一样读取原值
+            count += super(ScoreQuerySet, queryset).update(
+                TotalGrade=total, GradeLevel=scheme.level_expression(total), **kwargs
+            )
+        return count
+
+    def with_totals(self):
+        """
+        按各课程的成绩计算方案在 SQL 中计算总成绩和等级。
+
+        返回:
+            QuerySet: 增加 weighted_total 和 weighted_level 注解的查询集，未指定方案的课程使用默认方案。
+        """
+        weights = [
+            Coalesce(F(f'Course__Scheme__{name}'), Value(float(default)))
+            for name, default in zip(GradingScheme.WEIGHT_FIELDS, DEFAULT_WEIGHTS)
+        ]
+        thresholds = [
+            Coalesce(F(f'Course__Scheme__{name}'), Value(float(default)))
+            for name, default in zip(GradingScheme.THRESHOLD_FIELDS, DEFAULT_THRESHOLDS)
+        ]
+        total = weighted_total_expression(*weights)
+        return self.annotate(weighted_total=total, weighted_level=grade_level_expression(total, thresholds))
+
+    def regrade(self, scheme):
+        """
+        用一条 UPDATE 语句按给定方案重新计算查询集中全部成绩的 TotalGrade 和 GradeLevel。
+
+        UPDATE 不能引用关联表的字段，因此按方案分别执行，方案的权重和分数线作为常量写入语句。
+
+        参数:
+            scheme (GradingScheme): 成绩计算方案。
+
+        返回:
+            int: 更新的成绩条数。
+        """
+        total = scheme.total_expression()
+        # update 递增成绩、课程和学生的数据版本号，并重新汇总涉及的学生
+        return self.update(
+            TotalGrade=total,
+            # 等级不引用 TotalGrade 列：MySQL 在同一条 UPDATE 中会读到已更新的值，其他数据库读到旧值
+            GradeLevel=scheme.level_expression(total),
+            UpdatedAt=timezone.now(),
+        )
+
 class Score(models.Model):
+    # 参与计算总成绩和等级的字段，课程决定使用的成绩计算方案
+    GRADE_FIELDS = ('RegularGrade', 'MidtermGrade', 'FinalGrade')
+    TOTAL_INPUTS = frozenset({*GRADE_FIELDS, 'Course', 'Course_id'})
+    # 影响学生成绩汇总的字段
+    STUDENT_FIELDS = frozenset({'Student', 'Student_id'})
+    SUMMARY_INPUTS = TOTAL_INPUTS | STUDENT_FIELDS | {'TotalGrade', 'GradeLevel'}
+
     ScoreID = models.AutoField(primary_key=True, verbose_name=_('成绩编号'))
     Student = models.ForeignKey(Student, on_delete=models.CASCADE, verbose_name=_('学生'))
     Course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name=_('课程'))
@@ -77,40 +583,313 @@ class Score(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)],
         verbose_name=_('期末成绩')
     )
+    # 总成绩和等级由三项成绩计算，保存时同步写入，以便在数据库中排序、过滤和统计
+    TotalGrade = models.FloatField(default=0, editable=False, verbose_name=_('总成绩'))
+    GradeLevel = models.CharField(max_length=1, default='F', editable=False, verbose_name=_('等级'))
     CreatedAt = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
     UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
 
+    objects = ScoreQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('成绩信息')
         verbose_name_plural = _('成绩信息')
         ordering = ['-CreatedAt']
         unique_together = ['Student', 'Course']
+        indexes = [
+            models.Index(fields=['Course', 'TotalGrade']),
+            models.Index(fields=['Course', 'GradeLevel']),
+            # 成绩列表按 (CreatedAt, ScoreID) 键集分页
+            models.Index(fields=['CreatedAt', 'ScoreID']),
+            # 增量同步按更新时间查找变化
+            models.Index(fields=['UpdatedAt']),
+        ]
 
     def __str__(self):
         return f"{self.Student.Name} - {self.Course.CourseName}"
 
+    def save(self, *args, **kwargs):
+        """保存前根据三项成绩重新计算总成绩和等级"""
+        self.update_total_grade()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.TOTAL_INPUTS & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'TotalGrade', 'GradeLevel'}
+        super().save(*args, **kwargs)
+
+    def update_total_grade(self, scheme=None):
+        """
+        根据三项成绩和课程的成绩计算方案设置 TotalGrade 和 GradeLevel，不保存。
+
+        bulk_create / bulk_update 不会调用 save()，由 ScoreQuerySet.fill_totals 批量计算。
+
+        参数:
+            scheme (GradingScheme): 可选，默认使用课程的成绩计算方案。
+        """
+        if scheme is None:
+            scheme = self.Course.grading_scheme
+        self.TotalGrade = calculate_total_grade(
+            self.RegularGrade, self.MidtermGrade, self.FinalGrade, scheme.weights
+        )
+        self.GradeLevel = grade_level_for(self.TotalGrade, scheme.thresholds)
+
     @property
     def total_grade(self):
-        """计算总成绩"""
-        try:
-            return round(self.RegularGrade * 0.3 + self.MidtermGrade * 0.3 + self.FinalGrade * 0.4, 2)
-        except (TypeError, AttributeError):
-            return 0.0
+        """总成绩"""
+        return self.TotalGrade
 
     @property
     def grade_level(self):
-        """获取成绩等级"""
-        try:
-            total = self.total_grade
-            if total >= 90:
-                return 'A'
-            elif total >= 80:
-                return 'B'
-            elif total >= 70:
-                return 'C'
-            elif total >= 60:
-                return 'D'
-            else:
-                return 'F'
-        except (TypeError, AttributeError):
-            return 'F'
\ No newline at end of file
+        """成绩等级"""
+        return self.GradeLevel
+
+class StudentSummary(models.Model):
+    """
+    学生成绩汇总（物化表）：学分加权平均分、学分绩点以及班级和年级排名。
+
+    由 summaries 模块在成绩保存/删除和批量导入时增量维护，
+    也可以用 ``python manage.py rebuild_student_summaries`` 整体重建。
+    没有成绩的学生没有汇总记录。
+    """
+    Student = models.OneToOneField(
+        Student, on_delete=models.CASCADE, primary_key=True, related_name='summary', verbose_name=_('学生')
+    )
+    # 冗余保存学生的班级和年级，排行榜查询只需读取本表的索引
+    Class = models.ForeignKey(ClassInformation, on_delete=models.CASCADE, verbose_name=_('班级'))
+    Grade = models.CharField(max_length=50, verbose_name=_('年级'))
+    CourseCount = models.IntegerField(default=0, verbose_name=_('课程数'))
+    TotalCredits = models.IntegerField(default=0, verbose_name=_('总学分'))
+    WeightedAverage = models.FloatField(default=0, verbose_name=_('学分加权平均分'))
+    GPA = models.FloatField(default=0, verbose_name=_('学分绩点'))
+    ClassRank = models.IntegerField(null=True, blank=True, verbose_name=_('班级排名'))
+    GradeRank = models.IntegerField(null=True, blank=True, verbose_name=_('年级排名'))
+    UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
+
+    class Meta:
+        verbose_name = _('学生成绩汇总')
+        verbose_name_plural = _('学生成绩汇总')
+        ordering = ['Class', 'ClassRank']
+        indexes = [
+            models.Index(fields=['Class', 'ClassRank']),
+            models.Index(fields=['Grade', 'GradeRank']),
+        ]
+
+    def __str__(self):
+        return f"{self.Student_id} {self.WeightedAverage}"
+
+class Job(models.Model):
+    """后台任务：由 run_jobs 管理命令在请求之外执行的成绩导入/导出和仪表盘刷新。"""
+    KIND_IMPORT = 'import'
+    KIND_EXPORT = 'export'
+    KIND_DASHBOARD = 'dashboard'
+    KIND_CHOICES = [
+        (KIND_IMPORT, _('成绩导入')),
+        (KIND_EXPORT, _('成绩导出')),
+        (KIND_DASHBOARD, _('刷新仪表盘')),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('等待中')),
+        (STATUS_RUNNING, _('执行中')),
+        (STATUS_SUCCESS, _('已完成')),
+        (STATUS_FAILED, _('失败')),
+    ]
+
+    JobID = models.AutoField(primary_key=True, verbose_name=_('任务编号'))
+    Kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name=_('任务类型'))
+    Status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name=_('状态'))
+    InputFile = models.FileField(upload_to='jobs/input/', blank=True, verbose_name=_('上传文件'))
+    ResultFile = models.FileField(upload_to='jobs/result/', blank=True, verbose_name=_('结果文件'))
+    ErrorFile = models.FileField(upload_to='jobs/errors/', blank=True, verbose_name=_('错误报告'))
+    FileHash = models.CharField(max_length=64, blank=True, db_index=True, verbose_name=_('文件摘要'))
+    Params = models.JSONField(default=dict, blank=True, verbose_name=_('任务参数'))
+    TotalRows = models.IntegerField(null=True, blank=True, verbose_name=_('总行数'))
+    ProcessedRows = models.IntegerField(default=0, verbose_name=_('已处理行数'))
+    SuccessCount = models.IntegerField(default=0, verbose_name=_('成功数'))
+    ErrorCount = models.IntegerField(default=0, verbose_name=_('失败数'))
+    Errors = models.JSONField(default=list, blank=True, verbose_name=_('错误信息'))
+    Message = models.TextField(blank=True, default='', verbose_name=_('结果说明'))
+    CreatedBy = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_('创建人')
+    )
+    StartedAt = models.DateTimeField(null=True, blank=True, verbose_name=_('开始时间'))
+    FinishedAt = models.DateTimeField(null=True, blank=True, verbose_name=_('结束时间'))
+    CreatedAt = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
+    UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
+
+    class Meta:
+        verbose_name = _('后台任务')
+        verbose_name_plural = _('后台任务')
+        ordering = ['-CreatedAt']
+        indexes = [
+            models.Index(fields=['Status', 'CreatedAt']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_Kind_display()} #{self.JobID}"
+
+    @property
+    def is_finished(self):
+        return self.Status in (self.STATUS_SUCCESS, self.STATUS_FAILED)
+
+class ImportCheckpoint(models.Model):
+    """
+    导入检查点：每个成功提交的导入块一条记录，与该块的成绩写入在同一事务中创建。
+
+    同一文件（按内容摘要识别）重新导入时，已有检查点的块不再写入，从中断处继续。
+    """
+    FileHash = models.CharField(max_length=64, verbose_name=_('文件摘要'))
+    ChunkSize = models.IntegerField(verbose_name=_('块大小'))
+    ChunkNo = models.IntegerField(verbose_name=_('块序号'))
+    FirstRow = models.IntegerField(verbose_name=_('起始行号'))
+    LastRow = models.IntegerField(verbose_name=_('结束行号'))
+    SuccessCount = models.IntegerField(default=0, verbose_name=_('成功数'))
+    ErrorCount = models.IntegerField(default=0, verbose_name=_('失败数'))
+    CreatedAt = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
+
+    class Meta:
+        verbose_name = _('导入检查点')
+        verbose_name_plural = _('导入检查点')
+        ordering = ['FileHash', 'ChunkNo']
+        unique_together = ['FileHash', 'ChunkSize', 'ChunkNo']
+
+    def __str__(self):
+        return f"{self.FileHash[:12]} #{self.ChunkNo}"
+
+class DataVersion(models.Model):
+    """
+    数据版本号：相关数据发生变化时递增，用于判断基于这些数据生成的缓存（如导出文件）是否过期。
+
+    版本号保存在数据库中，Web 进程和 run_jobs 工作进程看到的是同一个值。
+    """
+    # 成绩导出涉及的数据（成绩、学生、课程）
+    SCORES = 'scores'
+
+    Name = models.CharField(max_length=50, primary_key=True, verbose_name=_('名称'))
+    Version = models.PositiveBigIntegerField(default=0, verbose_name=_('版本号'))
+    UpdatedAt = models.DateTimeField(auto_now=True, verbose_name=_('更新时间'))
+
+    class Meta:
+        verbose_name = _('数据版本')
+        verbose_name_plural = _('数据版本')
+
+    def __str__(self):
+        return f"{self.Name} v{self.Version}"
+
+    @classmethod
+    def current(cls, name):
+        """
+        获取数据的当前版本。
+
+        参数:
+            name (str): 数据名称，如 DataVersion.SCORES。
+
+        返回:
+            tuple: (版本号, 最后变化时间)。
+        """
+        version, _created = cls.objects.get_or_create(Name=name)
+        return version.Version, version.UpdatedAt
+
+    @staticmethod
+    def course_key(course_id):
+        """单门课程成绩数据的版本名称，用于课程统计等按课程缓存的数据。"""
+        return f'course:{course_id}'
+
+    @staticmethod
+    def student_key(student_id):
+        """单个学生成绩数据的版本名称，用于按学生缓存的成绩单。"""
+        return f'student:{student_id}'
+
+    @staticmethod
+    def model_key(model):
+        """模型数据的版本名称，用于按依赖模型失效的缓存（见 caching 模块）。"""
+        return f'model:{model._meta.label_lower}'
+
+    @classmethod
+    def bump(cls, *names):
+        """
+        将数据版本号加一。在事务中调用时随事务一起提交。
+
+        参数:
+            names (str): 一个或多个数据名称，已有的版本用一条 UPDATE 语句递增。
+        """
+        names = set(names)
+        updated = cls.objects.filter(Name__in=names).update(
+            Version=F('Version') + 1, UpdatedAt=timezone.now()
+        )
+        if updated < len(names):
+            existing = set(cls.objects.filter(Name__in=names).values_list('Name', flat=True))
+            cls.objects.bulk_create(
+                [cls(Name=name, Version=1) for name in names - existing],
+                ignore_conflicts=True
+            )
+
+    @classmethod
+    def bump_on_commit(cls, *names):
+        """
+        在当前事务提交后将数据版本号加一，不在事务中时立即递增。
+
+        用于逐条发送的信号：级联删除、查询集的 delete() 和 admin 保存在一个事务中逐条发送信号，
+        同一事务中的名称合并后只执行一次 bump（嵌套保存点中的名称各执行一次）。
+
+        参数:
+            names (str): 一个或多个数据名称。
+        """
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            cls.bump(*names)
+            return
+        groups = getattr(_pending_bumps, 'groups', {})
+        key = tuple(connection.savepoint_ids)
+        pending = groups.get(key)
+        if pending is None or not pending.registered(connection):
+            # 已提交或已回滚的事务遗留的分组不再递增
+            groups = {other: group for other, group in groups.items() if group.registered(connection)}
+            pending = groups[key] = _PendingBumps()
+            _pending_bumps.groups = groups
+        pending.names.update(names)
+        # 每次调用都注册回调，第一个执行的回调递增全部名称，其余不执行查询
+        transaction.on_commit(pending)
+
+class Snapshot(models.Model):
+    """
+    预先计算的汇总数据快照（如仪表盘统计），只包含可 JSON 序列化的普通数据。
+
+    快照保存在数据库中，由 run_jobs 工作进程在后台刷新，所有 Web 进程读取同一份数据。
+    Versions 记录生成快照时所依赖模型的数据版本号，与当前版本不同即为过期。
+    """
+    Name = models.CharField(max_length=50, primary_key=True, verbose_name=_('名称'))
+    Data = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name=_('数据'))
+    Versions = models.CharField(max_length=200, blank=True, default='', verbose_name=_('数据版本'))
+    BuiltAt = models.DateTimeField(auto_now=True, verbose_name=_('生成时间'))
+
+    class Meta:
+        verbose_name = _('数据快照')
+        verbose_name_plural = _('数据快照')
+
+    def __str__(self):
+        return f"{self.Name} ({self.Versions})"
+
+
+class Tombstone(models.Model):
+    """
+    删除记录：班级、学生、课程或成绩被删除时由信号写入，供增量同步接口告知下游系统删除对应数据。
+
+    超过 changes.TOMBSTONE_RETENTION_DAYS 的记录由 prune_tombstones 命令清理。
+    """
+    Resource = models.CharField(max_length=20, verbose_name=_('资源'))
+    ObjectID = models.CharField(max_length=20, verbose_name=_('对象编号'))
+    DeletedAt = models.DateTimeField(default=timezone.now, verbose_name=_('删除时间'))
+
+    class Meta:
+        verbose_name = _('删除记录')
+        verbose_name_plural = _('删除记录')
+        indexes = [
+            models.Index(fields=['Resource', 'DeletedAt']),
+        ]
+
+    def __str__(self):
+        return f"{self.Resource}:{self.ObjectID}"
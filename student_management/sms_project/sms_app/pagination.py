@@ -0,0 +1,274 @@
+"""
+键集（游标）分页。
+
+按排序字段（最后一个字段为主键，保证顺序唯一）的取值定位下一页：
+``WHERE (CreatedAt, pk) < (上一页最后一行)``，配合索引每页的代价与页码无关，
+不需要 OFFSET 跳过前面的行。翻页参数是签名后的不透明游标，被篡改时页面回到第一页，
+JSON 接口（strict=True）则报告参数错误。
+
+总数可以精确统计、缓存或完全不统计（此时页面不显示总页数）。
+为兼容已有链接，``?page=N`` 仍按 OFFSET 定位，``?page=last`` 定位到最后一页。
+"""
+import hashlib
+import math
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .caching import get_or_compute
+
+# 翻页参数名
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+PAGE_PARAM = 'page'
+LAST_PAGE = 'last'
+
+# 总数统计方式
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_NONE = 'none'
+
+_SALT = 'sms_app.pagination'
+
+
+class KeysetPaginator:
+    """
+    键集分页器。
+
+    参数:
+        queryset (QuerySet): 已过滤的查询集。
+        per_page (int): 每页行数。
+        ordering (tuple): 排序字段，如 ('-CreatedAt', '-ScoreID')；最后一个字段不是主键时自动追加主键。
+        count (callable): 可选，无参数返回总行数（可返回缓存的值）；为 None 时不统计总数。
+        strict (bool): 为 True 时游标无效抛出 ValueError，否则回到第一页。
+    """
+
+    def __init__(self, queryset, per_page, ordering, count=None, strict=False):
+        self.queryset = queryset
+        self.strict = strict
+        self.per_page = per_page
+        model = queryset.model
+        fields = [name.lstrip('-') for name in ordering]
+        pk_names = {'pk', model._meta.pk.name}
+        if fields[-1] not in pk_names:
+            ordering = (*ordering, f"{'-' if ordering[-1].startswith('-') else ''}pk")
+        self.ordering = tuple(ordering)
+        self.fields = [
+            (model._meta.pk if name.lstrip('-') == 'pk' else model._meta.get_field(name.lstrip('-')),
+             name.startswith('-'))
+            for name in self.ordering
+        ]
+        self._count_func = count
+        self._count = None
+
+    @property
+    def count(self):
+        """总行数，未统计时为 None"""
+        if self._count is None and self._count_func is not None:
+            self._count = self._count_func()
+        return self._count
+
+    @property
+    def num_pages(self):
+        """总页数，未统计总数时为 None"""
+        if self.count is None:
+            return None
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    def key(self, obj):
+        """一行（模型实例或包含排序字段的 values() 字典）的排序字段取值"""
+        return [
+            obj[field.attname] if isinstance(obj, dict) else getattr(obj, field.attname)
+            for field, _descending in self.fields
+        ]
+
+    def encode(self, obj, number):
+        """将一行的排序字段取值和页码编码为游标"""
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in self.key(obj)]
+        return signing.dumps({'k': values, 'n': number}, salt=_SALT, compress=True)
+
+    def decode(self, cursor):
+        """
+        解析游标。
+
+        返回:
+            tuple: (排序字段取值列表, 页码)；游标无效时返回 None。
+        """
+        try:
+            data = signing.loads(cursor, salt=_SALT)
+            if len(data['k']) != len(self.fields):
+                return None
+            values = [field.to_python(value) for (field, _descending), value in zip(self.fields, data['k'])]
+        except (signing.BadSignature, KeyError, TypeError, ValueError, ValidationError):
+            return None
+        return values, data.get('n')
+
+    def _seek(self, values, forward):
+        """排序位置在 values 之后（forward）或之前的行的过滤条件"""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= equal & Q(**{f'{field.attname}__{lookup}': value})
+            equal &= Q(**{field.attname: value})
+        # 冗余的首字段范围条件使数据库按索引顺序扫描并在取满一页后停止，
+        # 否则 OR 的各分支分别查找后需要对余下的全部行排序
+        (first, descending), value = self.fields[0], values[0]
+        lookup = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{first.attname}__{lookup}': value}) & condition
+
+    def batches(self):
+        """
+        按排序依次产生每页的行，用于遍历整个查询集（如增量同步）。
+
+        MySQL 驱动会把整个结果集读入内存，``QuerySet.iterator()`` 不能限制内存；
+        这里每页都是一次从上一页最后一行开始、走排序索引的短查询。
+
+        返回:
+            generator: 每次产生最多 per_page 行的列表。
+        """
+        ordered = self.queryset.order_by(*self.ordering)
+        rows = list(ordered[:self.per_page])
+        while rows:
+            yield rows
+            if len(rows) < self.per_page:
+                return
+            rows = list(ordered.filter(self._seek(self.key(rows[-1]), forward=True))[:self.per_page])
+
+    def _reversed_ordering(self):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def page(self, params):
+        """
+        按请求参数取得一页。
+
+        参数:
+            params (QueryDict): 请求参数，使用 after / before / page。
+
+        返回:
+            KeysetPage: 当前页。
+
+        异常:
+            ValueError: strict 为 True 且游标无效。
+        """
+        ordered = self.queryset.order_by(*self.ordering)
+        size = self.per_page
+
+        after = params.get(AFTER_PARAM)
+        before = params.get(BEFORE_PARAM)
+        page = params.get(PAGE_PARAM)
+        cursor = self.decode(after or before) if (after or before) else None
+        if cursor is None and (after or before) and self.strict:
+            raise ValueError('翻页游标无效')
+
+        if cursor is not None and after:
+            values, number = cursor
+            rows = list(ordered.filter(self._seek(values, forward=True))[:size + 1])
+            return KeysetPage(self, rows[:size], number, has_previous=True, has_next=len(rows) > size)
+
+        if cursor is not None and before:
+            values, number = cursor
+            rows = list(
+                self.queryset.filter(self._seek(values, forward=False))
+                .order_by(*self._reversed_ordering())[:size + 1]
+            )
+            has_previous = len(rows) > size
+            if number is not None and number <= 1:
+                has_previous = False
+            return KeysetPage(self, rows[:size][::-1], number, has_previous=has_previous, has_next=True)
+
+        if page == LAST_PAGE:
+            num_pages = self.num_pages
+            # 已知总数时最后一页只包含余下的行，与按页码计算的分页一致
+            last_size = size
+            if num_pages is not None:
+                last_size = self.count - (num_pages - 1) * size or size
+            rows = list(self.queryset.order_by(*self._reversed_ordering())[:last_size + 1])
+            has_previous = len(rows) > last_size
+            return KeysetPage(self, rows[:last_size][::-1], num_pages, has_previous=has_previous, has_next=False)
+
+        if page and page.isdigit() and int(page) > 1:
+            number = int(page)
+            offset = (number - 1) * size
+            rows = list(ordered[offset:offset + size + 1])
+            return KeysetPage(self, rows[:size], number, has_previous=True, has_next=len(rows) > size)
+
+        rows = list(ordered[:size + 1])
+        return KeysetPage(self, rows[:size], 1, has_previous=False, has_next=len(rows) > size)
+
+
+class KeysetPage:
+    """
+    键集分页的一页，属性与模板中使用的 Django Page 对象保持一致。
+
+    属性:
+        object_list (list): 本页的行。
+        number (int): 页码，未知时为 None（例如通过无效页码之外的方式进入且未统计总数）。
+        next_cursor (str): 下一页游标，没有下一页时为 None。
+        previous_cursor (str): 上一页游标，没有上一页时为 None。
+    """
+
+    def __init__(self, paginator, object_list, number, has_previous, has_next):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.number = number
+        self._has_previous = has_previous and bool(object_list)
+        self._has_next = has_next and bool(object_list)
+        following = number + 1 if number is not None else None
+        preceding = number - 1 if number is not None else None
+        self.next_cursor = paginator.encode(object_list[-1], following) if self._has_next else None
+        self.previous_cursor = paginator.encode(object_list[0], preceding) if self._has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginationMixin:
+    """
+    为 ListView 提供键集分页的混入类，模板中的 page_obj、is_paginated 用法不变。
+
+    属性:
+        keyset_ordering (tuple): 查询集没有显式排序时使用的排序字段。
+        keyset_count (str): 总数统计方式，COUNT_EXACT 每次统计，COUNT_CACHED 按 keyset_count_depends_on
+            的数据版本缓存，COUNT_NONE 不统计；请求参数 count=0 时也不统计。
+        keyset_count_depends_on (tuple): 缓存总数时依赖的模型类（包括过滤条件关联的模型）。
+    """
+    keyset_ordering = ('-CreatedAt', '-pk')
+    keyset_count = COUNT_EXACT
+    keyset_count_depends_on = ()
+
+    def get_keyset_count(self, queryset):
+        """
+        返回统计总数的函数。
+
+        返回:
+            callable: 无参数，返回总行数；不统计时返回 None。
+        """
+        if self.keyset_count == COUNT_NONE or self.request.GET.get('count') == '0':
+            return None
+        if self.keyset_count == COUNT_EXACT:
+            return queryset.count
+        # 以过滤条件生成的 SQL 区分缓存，同一筛选条件的各页共用一个总数
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(f'{sql}{params!r}'.encode('utf-8')).hexdigest()
+        key = f'list_count:{queryset.model._meta.label_lower}:{digest}'
+        return lambda: get_or_compute(key, self.keyset_count_depends_on, queryset.count)
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = tuple(queryset.query.order_by) or self.keyset_ordering
+        paginator = KeysetPaginator(queryset, page_size, ordering, count=self.get_keyset_count(queryset))
+        page = paginator.page(self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,266 @@
+"""
+成绩导入文件的流式读取。
+
+.xlsx 文件使用 openpyxl 的 read_only 模式逐行读取，内存占用只与导入块大小有关，
+与文件大小无关。导入任务使用 read_score_frames 按块产生 DataFrame：.csv 文件由 pandas
+的 C 解析器按块解析，不再逐行构造字典；read_score_rows 逐行产生字典，.csv 文件使用
+标准库 csv 模块解析。
+"""
+import codecs
+import csv
+import io
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from .importers import REQUIRED_COLUMNS, build_frame, chunked
+
+# 用于探测 CSV 编码的字节数
+ENCODING_SNIFF_SIZE = 64 * 1024
+
+
+def read_score_rows(fileobj, filename):
+    """
+    打开成绩导入文件并校验表头。
+
+    参数:
+        fileobj (file): 以二进制方式打开的文件对象，例如 UploadedFile。
+        filename (str): 原始文件名，用于判断文件格式。
+
+    返回:
+        generator: 依次产生 (行号, 行数据字典)，行号与表格中的行号一致。
+
+    异常:
+        ValueError: 文件格式不受支持或缺少必要的列。
+    """
+    header, rows = _open(fileobj, filename)
+    _check_header(header, rows)
+    positions = {col: header.index(col) for col in REQUIRED_COLUMNS}
+    return _iter_rows(rows, positions)
+
+
+def read_score_frames(fileobj, filename, chunk_size):
+    """
+    打开成绩导入文件并校验表头，按块读取数据。
+
+    参数:
+        fileobj (file): 以二进制方式打开的文件对象，例如 UploadedFile。
+        filename (str): 原始文件名，用于判断文件格式。
+        chunk_size (int): 每块的最大行数。
+
+    返回:
+        generator: 依次产生以行号为索引、以 REQUIRED_COLUMNS 为列的 DataFrame，已跳过空行。
+
+    异常:
+        ValueError: 文件格式不受支持或缺少必要的列。
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return _csv_frames(fileobj, chunk_size)
+    if extension == '.xls':
+        return _xls_frames(fileobj, chunk_size)
+    return (build_frame(chunk) for chunk in chunked(read_score_rows(fileobj, filename), chunk_size))
+
+
+def validate_score_file(fileobj, filename):
+    """
+    只读取表头进行校验，并将文件指针复位，供提交后台任务前快速检查。
+
+    异常:
+        ValueError: 文件格式不受支持或缺少必要的列。
+    """
+    header, rows = _open(fileobj, filename)
+    try:
+        _check_header(header, rows)
+    finally:
+        rows.close()
+        fileobj.seek(0)
+
+
+def count_score_rows(fileobj, filename):
+    """
+    估算文件中的数据行数（不含表头），用于计算进度；无法估算时返回 None。
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    try:
+        if extension == '.csv':
+            lines = 0
+            last = b''
+            for block in iter(lambda: fileobj.read(ENCODING_SNIFF_SIZE), b''):
+                lines += block.count(b'\n')
+                last = block
+            if last and not last.endswith(b'\n'):
+                lines += 1
+            return max(lines - 1, 0)
+        if extension == '.xlsx':
+            workbook = load_workbook(fileobj, read_only=True)
+            try:
+                max_row = workbook.active.max_row
+            finally:
+                workbook.close()
+            return max(max_row - 1, 0) if max_row else None
+        return None
+    finally:
+        fileobj.seek(0)
+
+
+def _open(fileobj, filename):
+    """按扩展名打开文件，返回 (表头, 剩余行迭代器)。"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        header, rows = _open_csv(fileobj)
+    elif extension == '.xlsx':
+        header, rows = _open_xlsx(fileobj)
+    elif extension == '.xls':
+        header, rows = _open_xls(fileobj)
+    else:
+        raise ValueError(f'不支持的文件格式：{extension or filename}，请上传 .xlsx 或 .csv 文件')
+    header = [str(name).strip() if name is not None else '' for name in header]
+    return header, rows
+
+
+def _check_header(header, rows):
+    try:
+        _check_columns(header)
+    except ValueError:
+        rows.close()
+        raise
+
+
+def _check_columns(header):
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing_columns:
+        raise ValueError(f'文件缺少以下列：{", ".join(missing_columns)}')
+
+
+def _iter_rows(rows, positions):
+    """将原始单元格元组转换为以列名为键的字典，跳过空行。"""
+    try:
+        for row_number, values in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in values):
+                continue
+            yield row_number, {
+                col: _normalize_cell(values[index]) if index < len(values) else None
+                for col, index in positions.items()
+            }
+    finally:
+        rows.close()
+
+
+def _normalize_cell(value):
+    """Excel 中的整数常以浮点数存储，转换为整数以免学号、课程编号出现 '.0' 后缀。"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _open_xlsx(fileobj):
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    rows = _xlsx_rows(workbook)
+    header = next(rows, None) or ()
+    return header, rows
+
+
+def _xlsx_rows(workbook):
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _open_xls(fileobj):
+    # openpyxl 不支持旧版 .xls 格式，退回 pandas/xlrd 一次性读取
+    df = pd.read_excel(fileobj, dtype={'课程编号': str})
+    rows = (tuple(record) for record in df.itertuples(index=False))
+    return list(df.columns), rows
+
+
+def _xls_frames(fileobj, chunk_size):
+    """一次性读取的 .xls 文件直接按行切片，不再转换为逐行的元组。"""
+    df = pd.read_excel(fileobj, dtype={'课程编号': str})
+    df.columns = [str(name).strip() for name in df.columns]
+    _check_columns(df.columns)
+    df = df[REQUIRED_COLUMNS].set_axis(range(2, len(df) + 2))
+    df = df[df.notna().any(axis=1)]
+    return (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+
+def _csv_frames(fileobj, chunk_size):
+    """
+    表头由 csv 模块读取和校验，其余内容交给 pandas 的 C 解析器按块读取必填列。
+
+    所有单元格按字符串读取，保留学号、课程编号的前导零，数值转换由 validate_frame 完成。
+    """
+    encoding = _detect_encoding(fileobj)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+    header = [name.strip() for name in next(csv.reader(text), [])]
+    try:
+        _check_columns(header)
+    except ValueError:
+        text.detach()
+        raise
+    positions = [header.index(col) for col in REQUIRED_COLUMNS]
+    return _csv_chunks(text, positions, chunk_size)
+
+
+def _csv_chunks(text, positions, chunk_size):
+    try:
+        # 指定 usecols 时 C 解析器容忍列数不一致的行，缺少的单元格读为空字符串；
+        # 编号按字符串读取以保留前导零，成绩列由 C 解析器直接转换为数值，空单元格读为 NaN
+        student_position, course_position, *grade_positions = positions
+        reader = pd.read_csv(
+            text, header=None, usecols=positions, dtype={student_position: str, course_position: str},
+            keep_default_na=False, na_values={position: [''] for position in grade_positions},
+            skip_blank_lines=False, chunksize=chunk_size,
+        )
+        # usecols 返回的列按文件中的顺序排列
+        columns = [REQUIRED_COLUMNS[positions.index(position)] for position in sorted(positions)]
+        start = 2
+        for chunk in reader:
+            chunk.columns = columns
+            chunk.index = range(start, start + len(chunk))
+            start += len(chunk)
+            blank = (chunk['学号'].to_numpy() == '') & (chunk['课程编号'].to_numpy() == '')
+            if blank.any():
+                blank &= chunk[REQUIRED_COLUMNS[2:]].isna().to_numpy().all(axis=1)
+                chunk = chunk[~blank]
+            if len(chunk):
+                yield chunk if columns == REQUIRED_COLUMNS else chunk[REQUIRED_COLUMNS]
+    finally:
+        # 分离而不是关闭包装器，避免顺带关闭上传文件
+        text.detach()
+
+
+def _open_csv(fileobj):
+    encoding = _detect_encoding(fileobj)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+    rows = _csv_rows(text)
+    header = next(rows, None) or ()
+    return header, rows
+
+
+def _csv_rows(text):
+    try:
+        yield from csv.reader(text)
+    finally:
+        # 分离而不是关闭包装器，避免顺带关闭上传文件
+        text.detach()
+
+
+def _detect_encoding(fileobj):
+    """
+    探测 CSV 文件编码：优先 UTF-8（含 BOM），否则按 Excel 中文版默认的 GBK 处理。
+    """
+    head = fileobj.read(ENCODING_SNIFF_SIZE)
+    fileobj.seek(0)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # 截断处可能正好落在多字节字符中间，使用增量解码器忽略末尾的不完整字符
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gbk'
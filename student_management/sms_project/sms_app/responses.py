@@ -0,0 +1,47 @@
+"""
+JSON 响应。
+
+安装了 orjson 时用它编码（比标准库 json 快数倍，直接输出 UTF-8 字节），
+否则回退到 DjangoJSONEncoder。两者的时间格式不同（orjson 保留微秒并输出 +00:00，
+DjangoJSONEncoder 截断到毫秒并输出 Z），因此 orjson 不直接编码时间，而是交给
+DjangoJSONEncoder.default 处理，Decimal、UUID 等类型同样如此，保证两种编码结果完全一致。
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+_encoder = DjangoJSONEncoder()
+
+
+def dumps(data):
+    """
+    将数据编码为 JSON 字节串。
+
+    参数:
+        data: 由字典、列表、字符串、数值和时间组成的数据。
+
+    返回:
+        bytes: UTF-8 编码的 JSON。
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    使用 dumps 编码的 JSON 响应，用法与 JsonResponse 相同（不支持 encoder 和 safe 参数）。
+
+    参数:
+        data: 需要编码的数据。
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
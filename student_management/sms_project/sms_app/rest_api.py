@@ -0,0 +1,190 @@
+"""
+只读 JSON 接口。
+
+供排课系统、家长门户等下游系统读取班级、学生、课程和成绩，替代抓取列表页面或导出文件：
+
+    GET /api/v1/<resource>/?fields=...&<筛选参数>=...&limit=...&after=<游标>
+
+- 每页由一条 values() 查询得到，关联对象的名称通过 JOIN 取出，查询数与每页行数无关；
+- fields 只返回需要的字段，未指定时返回 default_fields；
+- 只允许按有索引的列筛选；
+- 按 pagination.KeysetPaginator 的游标分页，不统计总数。
+"""
+from django.db.models import F
+
+from .models import ClassInformation, Course, Score, Student
+from .pagination import AFTER_PARAM, BEFORE_PARAM, KeysetPaginator
+from .score_batch import parse_list
+
+# 每页默认和最多返回的行数
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class Resource:
+    """
+    一个只读资源。
+
+    参数:
+        model (Model): 资源对应的模型。
+        fields (dict): 接口字段名 -> 模型字段路径，关联字段使用 ``外键__字段``。
+        filters (dict): 筛选参数名 -> 模型字段，只应包含有索引的列。
+        ordering (tuple): 分页排序字段，应有对应的索引，最后一个字段为主键。
+        default_fields (tuple): 未指定 fields 时返回的字段，默认为全部字段。
+    """
+
+    def __init__(self, model, fields, filters, ordering, default_fields=None):
+        self.model = model
+        self.fields = fields
+        self.filters = filters
+        self.ordering = ordering
+        self.default_fields = tuple(default_fields or fields)
+
+    @property
+    def permission(self):
+        """读取该资源所需的权限"""
+        return f'{self.model._meta.app_label}.view_{self.model._meta.model_name}'
+
+    def parse_fields(self, value):
+        """
+        解析 fields 参数。
+
+        返回:
+            tuple: 字段名列表。
+
+        异常:
+            ValueError: 包含无法识别的字段。
+        """
+        fields = parse_list(value) or self.default_fields
+        unknown = [field for field in fields if field not in self.fields]
+        if unknown:
+            raise ValueError(f'无法识别的字段: {", ".join(unknown)}')
+        return tuple(fields)
+
+    def values(self, *keys, fields=None):
+        """
+        返回只包含指定接口字段的 values() 查询集。
+
+        参数:
+            keys (str): 额外包含的模型字段（以模型字段名为键）。
+            fields (iterable): 接口字段，默认为全部字段。
+        """
+        fields = self.fields if fields is None else fields
+        return self.model._default_manager.values(*keys, **{field: F(self.fields[field]) for field in fields})
+
+    def queryset(self, params, fields):
+        """
+        按筛选参数和字段生成 values() 查询集。
+
+        除请求的字段外，结果中还包含分页排序字段（以模型字段名为键），用于生成游标。
+
+        异常:
+            ValueError: 筛选参数不受支持。
+        """
+        lookups = {}
+        for name, value in params.items():
+            if name in ('fields', 'limit', AFTER_PARAM, BEFORE_PARAM):
+                continue
+            if name not in self.filters:
+                raise ValueError(f'不支持按 {name} 筛选，可用的筛选参数: {", ".join(self.filters)}')
+            lookups[self.filters[name]] = value
+        keys = [name.lstrip('-') for name in self.ordering]
+        return self.values(*keys, fields=fields).filter(**lookups)
+
+    def page(self, params):
+        """
+        读取一页数据。
+
+        参数:
+            params (QueryDict): 请求参数。
+
+        返回:
+            dict: results（数据行）、next_cursor、previous_cursor。
+
+        异常:
+            ValueError: 字段、筛选参数或翻页游标无效。
+        """
+        fields = self.parse_fields(params.get('fields'))
+        try:
+            limit = min(max(int(params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            raise ValueError('limit 必须是整数')
+        paginator = KeysetPaginator(self.queryset(params, fields), limit, self.ordering, strict=True)
+        page = paginator.page({
+            name: params[name] for name in (AFTER_PARAM, BEFORE_PARAM) if params.get(name)
+        })
+        return {
+            'results': [{field: row[field] for field in fields} for row in page.object_list],
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+
+
+RESOURCES = {
+    'classes': Resource(
+        ClassInformation,
+        fields={
+            'class_id': 'ClassID',
+            'class_name': 'ClassName',
+            'grade': 'Grade',
+            'class_adviser': 'ClassAdviser',
+            'created_at': 'CreatedAt',
+            'updated_at': 'UpdatedAt',
+        },
+        filters={'class_name': 'ClassName'},
+        ordering=('ClassID',),
+    ),
+    'students': Resource(
+        Student,
+        fields={
+            'student_id': 'StudentID',
+            'name': 'Name',
+            'gender': 'Gender',
+            'age': 'Age',
+            'class_id': 'Class_id',
+            'class_name': 'Class__ClassName',
+            'enrollment_date': 'EnrollmentDate',
+            'phone': 'Phone',
+            'email': 'Email',
+            'address': 'Address',
+            'created_at': 'CreatedAt',
+            'updated_at': 'UpdatedAt',
+        },
+        filters={'class_id': 'Class_id', 'name': 'Name'},
+        ordering=('-CreatedAt', '-StudentID'),
+    ),
+    'courses': Resource(
+        Course,
+        fields={
+            'course_id': 'CourseID',
+            'course_name': 'CourseName',
+            'course_description': 'CourseDescription',
+            'credits': 'Credits',
+            'scheme': 'Scheme__Name',
+            'created_at': 'CreatedAt',
+            'updated_at': 'UpdatedAt',
+        },
+        filters={'course_name': 'CourseName'},
+        ordering=('CourseID',),
+    ),
+    'scores': Resource(
+        Score,
+        fields={
+            'score_id': 'ScoreID',
+            'student_id': 'Student_id',
+            'student_name': 'Student__Name',
+            'class_id': 'Student__Class_id',
+            'course_id': 'Course_id',
+            'course_name': 'Course__CourseName',
+            'regular_grade': 'RegularGrade',
+            'midterm_grade': 'MidtermGrade',
+            'final_grade': 'FinalGrade',
+            'total_grade': 'TotalGrade',
+            'grade_level': 'GradeLevel',
+            'created_at': 'CreatedAt',
+            'updated_at': 'UpdatedAt',
+        },
+        filters={'student_id': 'Student_id', 'course_id': 'Course_id'},
+        ordering=('-CreatedAt', '-ScoreID'),
+    ),
+}
@@ -0,0 +1,70 @@
+"""
+批量查询多个学生的成绩。
+
+门户的班级页面原来为每个学生调用一次 ``/api/scores/<学号>/``；
+``/api/scores/batch/`` 一次接收多个学号（或一个班级编号），
+用一条 values() 查询取出所需的列并按学生分组，不创建模型实例。
+"""
+from django.db.models import F
+
+from .models import Score, Student
+
+# 一次最多查询的学生数
+MAX_STUDENTS = 500
+
+# 可选字段 -> values() 的表达式，总成绩和等级直接读取保存的列
+SCORE_FIELDS = {
+    'course_id': F('Course_id'),
+    'course_name': F('Course__CourseName'),
+    'regular_grade': F('RegularGrade'),
+    'midterm_grade': F('MidtermGrade'),
+    'final_grade': F('FinalGrade'),
+    'total_grade': F('TotalGrade'),
+    'grade_level': F('GradeLevel'),
+}
+
+# 未指定 fields 时返回的字段，与单个学生的接口一致
+DEFAULT_FIELDS = ('course_name', 'regular_grade', 'midterm_grade', 'final_grade', 'total_grade', 'grade_level')
+
+
+def parse_list(value):
+    """将逗号分隔的参数拆分为去重后的列表，保持原有顺序"""
+    items = (item.strip() for item in (value or '').split(','))
+    return list(dict.fromkeys(item for item in items if item))
+
+
+def scores_by_student(student_ids=None, class_id=None, fields=DEFAULT_FIELDS):
+    """
+    查询多个学生的成绩，按学生分组。
+
+    参数:
+        student_ids (list): 学号列表。
+        class_id (str): 班级编号，与 student_ids 二选一，查询该班级的全部学生。
+        fields (iterable): 每条成绩包含的字段，见 SCORE_FIELDS。
+
+    返回:
+        dict: 学号到成绩列表的字典，没有成绩或学号不存在的学生对应空列表。
+
+    异常:
+        ValueError: 字段无法识别或学生数超过 MAX_STUDENTS。
+    """
+    unknown = [field for field in fields if field not in SCORE_FIELDS]
+    if unknown:
+        raise ValueError(f'无法识别的字段: {", ".join(unknown)}')
+
+    if class_id is not None:
+        student_ids = list(Student.objects.filter(Class_id=class_id).order_by('pk').values_list('pk', flat=True))
+    if len(student_ids) > MAX_STUDENTS:
+        raise ValueError(f'一次最多查询 {MAX_STUDENTS} 名学生')
+
+    grouped = {student_id: [] for student_id in student_ids}
+    if not student_ids:
+        return grouped
+    rows = (
+        Score.objects.filter(Student_id__in=student_ids)
+        .order_by('Student_id', 'Course_id')
+        .values_list('Student_id', *(SCORE_FIELDS[field] for field in fields))
+    )
+    for student_id, *values in rows:
+        grouped[student_id].append(dict(zip(fields, values)))
+    return grouped
@@ -0,0 +1,73 @@
+"""
+学生成绩单缓存。
+
+``/api/scores/<学号>/`` 的响应只在该学生的成绩变化（或课程改名）时才会改变。
+编码后的 JSON 按 (学生成绩版本, 课程版本) 缓存：学生的成绩在单条保存/删除、
+批量写入、重新计算方案和批量导入时都会递增 ``student:<学号>`` 的版本号（见 signals
+和 models.VersionedQuerySet），旧版本的缓存不再被读取，随超时淘汰。
+同一版本号同时作为 ETag，客户端重新验证时数据未变化返回 304，不查询成绩表。
+"""
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Course, DataVersion, Score
+from .responses import dumps
+
+# 成绩单缓存时间（秒），版本号变化时不等超时即失效
+SCORECARD_TIMEOUT = 24 * 60 * 60
+
+
+def scorecard_version(student_id):
+    """
+    获取学生成绩单的当前版本。
+
+    参数:
+        student_id (str): 学号。
+
+    返回:
+        str: 由学生成绩版本号和课程版本号组成的字符串，用于缓存键和 ETag。
+    """
+    names = [DataVersion.student_key(student_id), DataVersion.model_key(Course)]
+    versions = dict(DataVersion.objects.filter(Name__in=names).values_list('Name', 'Version'))
+    return '-'.join(str(versions.get(name, 0)) for name in names)
+
+
+def build_scorecard(student_id):
+    """
+    查询学生的成绩单。
+
+    返回:
+        dict: {'scores': [...]}，各成绩包含课程名称、三项成绩、总成绩和等级。
+    """
+    rows = (
+        Score.objects.filter(Student_id=student_id)
+        .order_by('-CreatedAt')
+        .values(
+            course_name=F('Course__CourseName'),
+            regular_grade=F('RegularGrade'),
+            midterm_grade=F('MidtermGrade'),
+            final_grade=F('FinalGrade'),
+            total_grade=F('TotalGrade'),
+            grade_level=F('GradeLevel'),
+        )
+    )
+    return {'scores': list(rows)}
+
+
+def get_scorecard(student_id, version):
+    """
+    读取缓存的成绩单 JSON，不存在时查询并缓存。
+
+    参数:
+        student_id (str): 学号。
+        version (str): scorecard_version 返回的版本。
+
+    返回:
+        bytes: 编码后的 JSON。
+    """
+    key = f'scorecard:{student_id}:{version}'
+    content = cache.get(key)
+    if content is None:
+        content = dumps(build_scorecard(student_id))
+        cache.set(key, content, SCORECARD_TIMEOUT)
+    return content
@@ -0,0 +1,161 @@
+"""
+学生搜索。
+
+按姓名、班级名称（子串）和学号（前缀）搜索学生，按数据库选择使用索引的实现：
+
+- MySQL：姓名和班级名称上带 ngram 分词器的 FULLTEXT 索引，InnoDB 在写入时自动维护；
+- SQLite：FTS5 trigram 虚拟表，由触发器在学生增删改和班级改名时同步；
+- 其他数据库：不使用索引的 LIKE 查询。
+
+学号前缀使用主键索引的范围查询。三类条件分别走各自的索引，再以 UNION 合并，
+避免 OR 条件导致全表扫描。索引和触发器由迁移 0010_student_search 创建。
+可通过 settings.STUDENT_SEARCH_BACKEND 指定实现类的导入路径，其所需的索引需另行创建。
+"""
+import re
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import ClassInformation, Student
+
+
+class StudentSearchBackend:
+    """不使用全文索引的搜索实现，也是其他实现的基类。"""
+
+    def __init__(self, connection=None):
+        self.connection = connection or default_connection
+        quote = self.connection.ops.quote_name
+        self.student_table = quote(Student._meta.db_table)
+        self.class_table = quote(ClassInformation._meta.db_table)
+
+    def search(self, queryset, query):
+        """
+        过滤出姓名或班级名称包含 query、或学号以 query 开头的学生。
+
+        参数:
+            queryset (QuerySet): 学生查询集。
+            query (str): 搜索词。
+
+        返回:
+            QuerySet: 过滤后的查询集，空搜索词时原样返回。
+        """
+        query = query.strip()
+        if not query:
+            return queryset
+        return queryset.filter(
+            Q(Name__icontains=query) |
+            Q(StudentID__istartswith=query) |
+            Q(Class__ClassName__icontains=query)
+        )
+
+
+class MySQLFulltextSearch(StudentSearchBackend):
+    """MySQL 5.7+ 的 FULLTEXT 索引（ngram 分词器，默认按两个字切分，适合中文姓名）。"""
+
+    # BOOLEAN MODE 中有特殊含义的字符，不作为搜索内容
+    BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+    @classmethod
+    def boolean_query(cls, query):
+        """
+        将搜索词转换为 BOOLEAN MODE 查询：去掉运算符后整体作为短语匹配；
+        短于 ngram 切分长度的单字使用前缀通配，否则无法命中。
+
+        返回:
+            str: 查询字符串；去掉运算符后没有内容时返回 None。
+        """
+        query = ' '.join(cls.BOOLEAN_OPERATORS.sub(' ', query).split())
+        if not query:
+            return None
+        if len(query) < 2:
+            return f'{query}*'
+        return f'"{query}"'
+
+    def search(self, queryset, query):
+        query = query.strip()
+        if not query:
+            return queryset
+        prefix = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        selects = [f'SELECT `StudentID` FROM {self.student_table} WHERE `StudentID` LIKE %s']
+        params = [prefix]
+        match = self.boolean_query(query)
+        if match is not None:
+            selects += [
+                f'SELECT `StudentID` FROM {self.student_table} WHERE MATCH(`Name`) AGAINST (%s IN BOOLEAN MODE)',
+                f'SELECT `StudentID` FROM {self.student_table} WHERE `Class_id` IN ('
+                f'SELECT `ClassID` FROM {self.class_table} WHERE MATCH(`ClassName`) AGAINST (%s IN BOOLEAN MODE))',
+            ]
+            params += [match, match]
+        # UNION 放在派生表中：MySQL 先物化一次匹配的学号再与学生表半连接，
+        # 而不是对学生表的每一行执行一次 UNION（DEPENDENT SUBQUERY）
+        sql = f'SELECT `matched`.`StudentID` FROM ({" UNION ".join(selects)}) AS `matched`'
+        return queryset.filter(pk__in=RawSQL(sql, tuple(params)))
+
+
+class SQLiteFTS5Search(StudentSearchBackend):
+    """
+    SQLite 3.34+ 的 FTS5 trigram 虚拟表，用于本地开发和测试。
+
+    虚拟表的 rowid 与学生表的 rowid 一致，触发器按 rowid 同步。
+    trigram 索引要求搜索词至少 3 个字符，更短的搜索词在虚拟表上做 LIKE 扫描。
+    """
+
+    FTS_TABLE = 'sms_app_student_fts'
+
+    @staticmethod
+    def match_query(query):
+        """将搜索词转换为 FTS5 短语查询"""
+        return '"' + query.replace('"', '""') + '"'
+
+    def search(self, queryset, query):
+        query = query.strip()
+        if not query:
+            return queryset
+        if len(query) >= 3:
+            sql = f'SELECT "StudentID" FROM {self.FTS_TABLE} WHERE {self.FTS_TABLE} MATCH %s'
+            params = (self.match_query(query),)
+        else:
+            pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            sql = (
+                f'SELECT "StudentID" FROM {self.FTS_TABLE} '
+                f"WHERE \"Name\" LIKE %s ESCAPE '\\' OR \"ClassName\" LIKE %s ESCAPE '\\'"
+            )
+            params = (pattern, pattern)
+        # 学号前缀使用主键的范围查询（SQLite 的 LIKE 不能使用区分大小写的索引）
+        return queryset.filter(
+            Q(pk__in=RawSQL(sql, params)) |
+            Q(StudentID__gte=query, StudentID__lt=query + '\U0010ffff')
+        )
+
+
+SEARCH_BACKENDS = {
+    'mysql': MySQLFulltextSearch,
+    'sqlite': SQLiteFTS5Search,
+}
+
+
+def get_search_backend(connection=None):
+    """
+    返回当前数据库使用的学生搜索实现。
+
+    参数:
+        connection: 可选的数据库连接，默认使用 default 连接。
+
+    返回:
+        StudentSearchBackend: 搜索实现实例。
+    """
+    connection = connection or default_connection
+    backend_path = getattr(settings, 'STUDENT_SEARCH_BACKEND', None)
+    if backend_path:
+        backend_class = import_string(backend_path)
+    else:
+        backend_class = SEARCH_BACKENDS.get(connection.vendor, StudentSearchBackend)
+    return backend_class(connection)
+
+
+def search_students(queryset, query):
+    """按姓名、班级名称或学号前缀搜索学生，见 StudentSearchBackend.search"""
+    return get_search_backend().search(queryset, query)
@@ -0,0 +1,81 @@
+"""
+模型信号处理。
+
+班级、学生、课程或成绩发生变化时递增对应模型的数据版本号（见 caching 模块），
+以及成绩数据版本号和相关课程、学生的版本号，使缓存的导出文件、课程统计和学生成绩单失效；
+成绩变化或学生调班时增量更新学生成绩汇总和排名；删除时写入删除记录供增量同步使用。
+版本号在事务提交后递增，同一事务中逐条发送的信号（如级联删除）只递增一次（见 DataVersion.bump_on_commit）。
+批量写入（bulk_create / update）不会触发信号，上述版本号由 VersionedQuerySet 按相同规则递增，
+成绩的学生成绩汇总由 ScoreQuerySet 更新。
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .changes import record_deletion
+from .models import ClassInformation, Course, DataVersion, Score, Student, StudentSummary
+from .summaries import rerank, update_students
+
+
+@receiver(post_save, sender=Score)
+@receiver(post_delete, sender=Score)
+def bump_score_version(sender, instance, **kwargs):
+    DataVersion.bump_on_commit(
+        DataVersion.SCORES, DataVersion.course_key(instance.Course_id),
+        DataVersion.student_key(instance.Student_id), DataVersion.model_key(Score)
+    )
+
+
+@receiver(post_save, sender=Score)
+@receiver(post_delete, sender=Score)
+def update_student_summary(sender, instance, **kwargs):
+    update_students([instance.Student_id])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def bump_course_version(sender, instance, **kwargs):
+    DataVersion.bump_on_commit(DataVersion.SCORES, DataVersion.course_key(instance.pk), DataVersion.model_key(Course))
+
+
+@receiver(post_save, sender=ClassInformation)
+@receiver(post_delete, sender=ClassInformation)
+def bump_class_version(sender, instance, **kwargs):
+    DataVersion.bump_on_commit(DataVersion.model_key(ClassInformation))
+
+
+@receiver(post_save, sender=Student)
+def bump_student_courses_version(sender, instance, **kwargs):
+    # 学生姓名等信息出现在其所选课程的统计排名中
+    course_ids = Score.objects.filter(Student=instance).values_list('Course_id', flat=True)
+    DataVersion.bump_on_commit(
+        DataVersion.SCORES, DataVersion.model_key(Student), *map(DataVersion.course_key, course_ids)
+    )
+
+
+@receiver(post_save, sender=Student)
+def move_student_summary(sender, instance, **kwargs):
+    # 学生调班后汇总中的班级、年级和新旧班级的排名都需要更新
+    if StudentSummary.objects.filter(Student=instance).exclude(Class_id=instance.Class_id).exists():
+        update_students([instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+def bump_student_delete_version(sender, instance, **kwargs):
+    # 学生的成绩被级联删除，各自的信号已使相关课程的版本失效
+    DataVersion.bump_on_commit(DataVersion.SCORES, DataVersion.model_key(Student))
+
+
+@receiver(post_delete, sender=Student)
+def rerank_after_student_delete(sender, instance, **kwargs):
+    # 学生的汇总在成绩之前被级联删除，成绩的信号找不到学生原来的班级，在此重新排名
+    grades = ClassInformation.objects.filter(pk=instance.Class_id).values_list('Grade', flat=True)
+    rerank(class_ids=[instance.Class_id], grades=list(grades))
+
+
+@receiver(post_delete, sender=ClassInformation)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Score)
+def record_tombstone(sender, instance, **kwargs):
+    # 级联删除和查询集的 delete() 同样逐条发送 post_delete 信号
+    record_deletion(instance)
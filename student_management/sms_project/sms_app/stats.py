@@ -0,0 +1,131 @@
+"""
+课程成绩统计。
+
+每门课程的统计由一条带窗口函数的查询得到：每行成绩附带全课程的均值、
+平方均值、最高/最低分、排名以及所在分数段和等级的人数，Python 只负责读取结果和取百分位。
+窗口函数要求 MySQL 8.0+ 或 SQLite 3.25+。
+
+统计结果按课程的数据版本号缓存，该课程的成绩变化后自动失效，
+重新计算期间其他请求返回旧结果（见 caching.get_or_refresh）。
+"""
+import math
+
+from django.db.models import Avg, Count, F, IntegerField, Max, Min, Value, Window
+from django.db.models.functions import Floor, Least, Rank
+
+from .caching import get_or_refresh
+from .grading import GRADE_LEVELS
+from .models import DataVersion, Score
+
+# 分数段宽度及段数：[0, 10)、[10, 20) …… [90, 100]
+HISTOGRAM_BUCKET_WIDTH = 10
+HISTOGRAM_BUCKETS = 10
+
+# 返回的百分位
+PERCENTILES = (10, 50, 90)
+
+# 统计缓存时间（秒）：课程版本号变化时不等超时即重新计算
+COURSE_STATS_TIMEOUT = 24 * 60 * 60
+
+
+def get_course_stats(course):
+    """
+    获取课程的成绩统计，优先使用缓存。
+
+    参数:
+        course (Course): 课程。
+
+    返回:
+        dict: 见 compute_course_stats。
+    """
+    version, _changed_at = DataVersion.current(DataVersion.course_key(course.pk))
+    return get_or_refresh(
+        f'course_stats:{course.pk}', lambda: compute_course_stats(course),
+        version=version, timeout=COURSE_STATS_TIMEOUT
+    )
+
+
+def compute_course_stats(course):
+    """
+    用一条窗口函数查询计算课程的成绩统计。
+
+    参数:
+        course (Course): 课程。
+
+    返回:
+        dict: 包含人数、均值、标准差（总体）、最高/最低分、P10/P50/P90、
+            分数段直方图、各等级人数以及每个学生的课程排名。
+    """
+    bucket = Least(
+        Floor(F('TotalGrade') / HISTOGRAM_BUCKET_WIDTH), Value(HISTOGRAM_BUCKETS - 1),
+        output_field=IntegerField()
+    )
+    rows = list(
+        Score.objects.filter(Course=course)
+        .annotate(
+            rank=Window(Rank(), order_by=F('TotalGrade').desc()),
+            course_mean=Window(Avg('TotalGrade')),
+            course_mean_square=Window(Avg(F('TotalGrade') * F('TotalGrade'))),
+            course_min=Window(Min('TotalGrade')),
+            course_max=Window(Max('TotalGrade')),
+            bucket=bucket,
+            bucket_count=Window(Count('pk'), partition_by=[bucket]),
+            level_count=Window(Count('pk'), partition_by=[F('GradeLevel')]),
+        )
+        .order_by('rank', 'Student_id')
+        .values(
+            'Student__StudentID', 'Student__Name', 'TotalGrade', 'GradeLevel', 'rank',
+            'course_mean', 'course_mean_square', 'course_min', 'course_max',
+            'bucket', 'bucket_count', 'level_count',
+        )
+    )
+
+    stats = {
+        'course_id': course.CourseID,
+        'course_name': course.CourseName,
+        'count': len(rows),
+        'mean': None,
+        'stddev': None,
+        'min': None,
+        'max': None,
+        'percentiles': {f'p{p}': None for p in PERCENTILES},
+        'histogram': [
+            {
+                'range': f'{i * HISTOGRAM_BUCKET_WIDTH}-{(i + 1) * HISTOGRAM_BUCKET_WIDTH}',
+                'count': 0,
+            }
+            for i in range(HISTOGRAM_BUCKETS)
+        ],
+        'grade_levels': {level: 0 for level in GRADE_LEVELS},
+        'ranks': [],
+    }
+    if not rows:
+        return stats
+
+    first = rows[0]
+    mean = first['course_mean']
+    stats.update({
+        'mean': round(mean, 2),
+        # 总体标准差 sqrt(E[x²] - E[x]²)，浮点误差可能使差值略小于 0
+        'stddev': round(math.sqrt(max(first['course_mean_square'] - mean * mean, 0)), 2),
+        'min': first['course_min'],
+        'max': first['course_max'],
+    })
+
+    # 行按总成绩从高到低排列，百分位使用最近秩法：升序第 ceil(p% * n) 个值
+    count = len(rows)
+    for p in PERCENTILES:
+        position = max(math.ceil(p / 100 * count), 1)
+        stats['percentiles'][f'p{p}'] = rows[count - position]['TotalGrade']
+
+    for row in rows:
+        stats['histogram'][int(row['bucket'])]['count'] = row['bucket_count']
+        stats['grade_levels'][row['GradeLevel']] = row['level_count']
+        stats['ranks'].append({
+            'student_id': row['Student__StudentID'],
+            'name': row['Student__Name'],
+            'total_grade': row['TotalGrade'],
+            'grade_level': row['GradeLevel'],
+            'rank': row['rank'],
+        })
+    return stats
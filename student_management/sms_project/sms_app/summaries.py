@@ -0,0 +1,210 @@
+"""
+学生成绩汇总（StudentSummary）的增量维护。
+
+成绩变化时只重新汇总涉及的学生（一条按学生分组的聚合查询 + 一条批量 upsert），
+再用窗口函数重新计算涉及的班级和年级的排名，只写回排名有变化的行。
+窗口函数要求 MySQL 8.0+ 或 SQLite 3.25+。
+
+调用方:
+    - 单条成绩保存/删除、学生调班、班级改年级：signals 模块；
+    - 批量导入：ScoreImporter 每块汇总一次，全部导入完成后统一重新排名（包括续传时跳过的块）；
+    - 批量写入成绩（bulk_create / bulk_update / update，包括重新计算成绩）、修改课程学分：models 模块；
+    - 整体重建：``python manage.py rebuild_student_summaries``。
+"""
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When, Window
+from django.db.models.functions import Rank
+
+from .grading import GRADE_POINTS
+from .models import Score, Student, StudentSummary
+
+# 每条聚合查询涉及的学生数，避免 IN 列表过长
+STUDENT_BATCH_SIZE = 1000
+
+# 排名写回时每条 UPDATE 的行数
+RANK_UPDATE_BATCH_SIZE = 500
+
+SUMMARY_UPDATE_FIELDS = ['Class', 'Grade', 'CourseCount', 'TotalCredits', 'WeightedAverage', 'GPA', 'UpdatedAt']
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def refresh_students(student_ids):
+    """
+    重新汇总指定学生的成绩，不重新排名。
+
+    参数:
+        student_ids (iterable): 学号。
+
+    返回:
+        tuple: (班级编号集合, 年级集合)，包含学生当前和汇总前所在的班级和年级，
+            调用方应对其调用 rerank。
+    """
+    class_ids, grades = set(), set()
+    for batch in _batches(set(student_ids), STUDENT_BATCH_SIZE):
+        batch_class_ids, batch_grades = _refresh_batch(batch)
+        class_ids |= batch_class_ids
+        grades |= batch_grades
+    return class_ids, grades
+
+
+def _refresh_batch(student_ids):
+    # 学生原来所在的班级和年级也要重新排名（调班、成绩被全部删除）
+    previous = list(StudentSummary.objects.filter(Student_id__in=student_ids).values_list('Class_id', 'Grade'))
+    class_ids = {class_id for class_id, _grade in previous}
+    grades = {grade for _class_id, grade in previous}
+
+    credits = F('Course__Credits')
+    grade_points = Case(
+        *(When(GradeLevel=level, then=Value(points)) for level, points in GRADE_POINTS.items()),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = (
+        Score.objects.filter(Student_id__in=student_ids)
+        .values('Student_id', 'Student__Class_id', 'Student__Class__Grade')
+        .annotate(
+            course_count=Count('pk'),
+            total_credits=Sum(credits),
+            weighted_total=Sum(F('TotalGrade') * credits, output_field=FloatField()),
+            weighted_points=Sum(grade_points * credits, output_field=FloatField()),
+        )
+        .order_by()
+    )
+    summaries = []
+    for row in rows:
+        total_credits = row['total_credits'] or 0
+        summaries.append(StudentSummary(
+            Student_id=row['Student_id'],
+            Class_id=row['Student__Class_id'],
+            Grade=row['Student__Class__Grade'],
+            CourseCount=row['course_count'],
+            TotalCredits=total_credits,
+            WeightedAverage=round(row['weighted_total'] / total_credits, 2) if total_credits else 0.0,
+            GPA=round(row['weighted_points'] / total_credits, 2) if total_credits else 0.0,
+        ))
+        class_ids.add(row['Student__Class_id'])
+        grades.add(row['Student__Class__Grade'])
+
+    with transaction.atomic():
+        if summaries:
+            # MySQL 的 ON DUPLICATE KEY UPDATE 不支持指定冲突列
+            unique_fields = None
+            if connection.features.supports_update_conflicts_with_target:
+                unique_fields = ['Student']
+            StudentSummary.objects.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=SUMMARY_UPDATE_FIELDS,
+            )
+        # 已没有成绩的学生不保留汇总
+        summarized = {summary.Student_id for summary in summaries}
+        StudentSummary.objects.filter(Student_id__in=set(student_ids) - summarized).delete()
+    return class_ids, grades
+
+
+def summary_partitions(student_ids):
+    """
+    查询学生汇总当前所在的班级和年级，不重新汇总。
+
+    用于续传导入时跳过的块：这些块的汇总已在上次运行中随成绩一起提交，但排名尚未计算。
+
+    参数:
+        student_ids (iterable): 学号。
+
+    返回:
+        tuple: (班级编号集合, 年级集合)，调用方应对其调用 rerank。
+    """
+    class_ids, grades = set(), set()
+    for batch in _batches(set(student_ids), STUDENT_BATCH_SIZE):
+        for class_id, grade in StudentSummary.objects.filter(Student_id__in=batch).values_list('Class_id', 'Grade'):
+            class_ids.add(class_id)
+            grades.add(grade)
+    return class_ids, grades
+
+
+def rerank(class_ids=(), grades=()):
+    """
+    按学分加权平均分重新计算班级和年级排名，并列名次相同（1, 1, 3 ……）。
+
+    参数:
+        class_ids (iterable): 需要重新计算班级排名的班级编号。
+        grades (iterable): 需要重新计算年级排名的年级。
+
+    返回:
+        int: 排名有变化的汇总条数。
+    """
+    changed = 0
+    class_ids = set(class_ids)
+    grades = set(grades)
+    if class_ids:
+        changed += _rerank(StudentSummary.objects.filter(Class_id__in=class_ids), 'Class_id', 'ClassRank')
+    if grades:
+        changed += _rerank(StudentSummary.objects.filter(Grade__in=grades), 'Grade', 'GradeRank')
+    return changed
+
+
+def _rerank(queryset, partition, rank_field):
+    # 过滤条件按整个分区筛选，窗口内的排名与不加过滤时相同
+    ranked = queryset.annotate(
+        new_rank=Window(Rank(), partition_by=[F(partition)], order_by=F('WeightedAverage').desc())
+    ).values_list('Student_id', rank_field, 'new_rank')
+    updates = [
+        StudentSummary(Student_id=student_id, **{rank_field: new_rank})
+        for student_id, rank, new_rank in ranked
+        if rank != new_rank
+    ]
+    if updates:
+        StudentSummary.objects.bulk_update(updates, [rank_field], batch_size=RANK_UPDATE_BATCH_SIZE)
+    return len(updates)
+
+
+def update_students(student_ids):
+    """
+    重新汇总指定学生的成绩，并重新计算其所在班级和年级的排名。
+
+    参数:
+        student_ids (iterable): 学号。
+    """
+    rerank(*refresh_students(student_ids))
+
+
+def move_class_grade(class_information, previous_grade):
+    """
+    班级的年级变化后，更新该班学生汇总中的年级并重新计算新旧两个年级的排名。
+
+    参数:
+        class_information (ClassInformation): 已保存的班级。
+        previous_grade (str): 修改前的年级。
+    """
+    updated = StudentSummary.objects.filter(Class=class_information).update(Grade=class_information.Grade)
+    if updated:
+        rerank(grades={previous_grade, class_information.Grade})
+
+
+def rebuild_all():
+    """
+    从成绩表整体重建全部学生汇总和排名。
+
+    返回:
+        int: 重建后的汇总条数。
+    """
+    student_ids = Score.objects.values_list('Student_id', flat=True).distinct().order_by()
+    # 删除没有成绩的学生遗留的汇总
+    StudentSummary.objects.exclude(Student_id__in=Student.objects.filter(score__isnull=False)).delete()
+    refresh_students(student_ids.iterator())
+    rerank(
+        StudentSummary.objects.values_list('Class_id', flat=True).distinct().order_by(),
+        StudentSummary.objects.values_list('Grade', flat=True).distinct().order_by(),
+    )
+    return StudentSummary.objects.count()
@@ -1,3 +1,1437 @@
-from django.test import TestCase
+import codecs
+import csv
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.http import JsonResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+import pandas as pd
+
+from . import responses
+from .cache_backends import AtomicFileBasedCache, InstrumentedCache, metrics
+from .caching import get_or_refresh
+from .changes import TOMBSTONE_RETENTION_DAYS, make_token, oldest_open_write_age, parse_token
+from .export_cache import ExportCache
+from .exporters import (
+    CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE, export_header, iter_score_batches, parse_export_columns, stream_scores_csv,
+    write_scores_xlsx,
+)
+from .grading import calculate_total_grade, grade_batch
+from .importers import (
+    MAX_SAMPLE_ERRORS, REQUIRED_COLUMNS, ErrorReport, ScoreImporter, build_frame, flag_duplicates, validate_frame,
+)
+from .jobs import Heartbeat, claim_next_job, enqueue_export, requeue_stale_jobs, run_job
+from .models import (
+    ClassInformation, Course, DataVersion, GradingScheme, ImportCheckpoint, Job, Score, Snapshot, Student,
+    StudentSummary, Tombstone,
+)
+from .readers import count_score_rows, read_score_frames, read_score_rows, validate_score_file
+from .score_batch import MAX_STUDENTS as MAX_BATCH_STUDENTS
+from .search import MySQLFulltextSearch, search_students
+from .stats import get_course_stats
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sms-app-tests',
+    }
+}
+
+
+def create_school(students=3, courses=('01',), class_id='C1', grade='2024', first_id=1000):
+    """
+    创建一个班级、若干学生和课程，供各测试用例使用。
+
+    返回:
+        tuple: (班级, 学生列表, 课程列表)，学号从 first_id 开始，课程学分为 2。
+    """
+    klass = ClassInformation.objects.create(ClassID=class_id, ClassName=f'{class_id}班', Grade=grade, ClassAdviser='王')
+    student_list = [
+        Student.objects.create(StudentID=str(first_id + i), Name=f'学生{first_id + i}', Gender='男', Age=18,
+                               Class=klass, EnrollmentDate=date(2024, 9, 1))
+        for i in range(students)
+    ]
+    course_list = [
+        Course.objects.get_or_create(CourseID=course_id, defaults={
+            'CourseName': f'课程{course_id}', 'CourseDescription': '', 'Credits': 2,
+        })[0]
+        for course_id in courses
+    ]
+    return klass, student_list, course_list
+
+
+def score_row(row_number, student_id, course_id, regular=80, midterm=80, final=80):
+    """导入引擎接收的一行数据"""
+    return row_number, {'学号': student_id, '课程编号': course_id, '平时成绩': regular, '期中成绩': midterm, '期末成绩': final}
+
+
+class TemporaryMediaMixin:
+    """上传文件、任务结果和导出缓存写入临时目录，测试结束后删除。"""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.export_cache_dir = os.path.join(media.name, 'export_cache')
+        override = override_settings(MEDIA_ROOT=media.name, EXPORT_CACHE_DIR=self.export_cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class ScoreImporterTests(TestCase):
+    """批量导入的写入、更新、逐行错误和查询数。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_school(students=40, courses=('01', '02'))
+
+    def test_inserts_and_updates_in_place(self):
+        result = ScoreImporter().run([score_row(2, '1000', '01'), score_row(3, '1001', '1', final=90)])
+        self.assertEqual((result.success_count, result.error_count), (2, 0))
+        # 课程编号 1 补零为 01
+        self.assertEqual(Score.objects.get(Student_id='1001').Course_id, '01')
+
+        ScoreImporter().run([score_row(2, '1000', '01', final=50)])
+        score = Score.objects.get(Student_id='1000', Course_id='01')
+        self.assertEqual(Score.objects.count(), 2)
+        self.assertEqual((score.FinalGrade, score.TotalGrade, score.GradeLevel), (50, 68.0, 'D'))
+
+    def test_reports_errors_per_row(self):
+        result = ScoreImporter().run([
+            score_row(2, '1000', '01'),
+            score_row(3, '9999', '01'),
+            score_row(4, '1000', '99'),
+            score_row(5, '1001', '01', regular='缺考'),
+            score_row(6, '1001', '01', midterm=120),
+            score_row(7, '1000', '01'),
+        ])
+        self.assertEqual((result.success_count, result.error_count), (1, 5))
+        self.assertEqual([row for row, _message in result.errors], [3, 4, 5, 6, 7])
+        self.assertIn('学号 9999 不存在', result.error_details()[0])
+        self.assertEqual(Score.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def count(rows):
+            with CaptureQueriesContext(connection) as context:
+                ScoreImporter(chunk_size=100).run(rows)
+            return len(context.captured_queries)
+
+        rows = [score_row(i, f'{1000 + i}', '01') for i in range(40)]
+        # 先导入一次，使两次比较都是更新已有成绩、递增已有的版本号
+        ScoreImporter().run(rows)
+        self.assertEqual(count(rows[:2]), count(rows))
+
+
+class ScoreFileReaderTests(SimpleTestCase):
+    """CSV（UTF-8/GBK）和 xlsx 导入文件的逐行读取。"""
+
+    HEADER = '学号,课程编号,平时成绩,期中成绩,期末成绩,备注'
+
+    def test_reads_csv_in_utf8_and_gbk(self):
+        text = f'{self.HEADER}\r\n1000,01,80,70,60,张三\r\n,,,,,\r\n1001,2,90,,100,\r\n'
+        for encoded in (codecs.BOM_UTF8 + text.encode('utf-8'), text.encode('gbk')):
+            with self.subTest(encoded=encoded[:3]):
+                rows = list(read_score_rows(BytesIO(encoded), 'scores.csv'))
+                # 空行被跳过，行号与表格中的行号一致
+                self.assertEqual([row_number for row_number, _row in rows], [2, 4])
+                self.assertEqual(rows[0][1], {'学号': '1000', '课程编号': '01', '平时成绩': '80', '期中成绩': '70', '期末成绩': '60'})
+                self.assertEqual(rows[1][1]['期中成绩'], '')
+                self.assertEqual(count_score_rows(BytesIO(encoded), 'scores.csv'), 3)
+
+    def test_reads_csv_frames_in_chunks(self):
+        # 列顺序与模板不同，第 3 行为空，第 5 行缺少末尾的单元格，第 6 行多出单元格
+        text = (
+            '备注,课程编号,学号,平时成绩,期中成绩,期末成绩\r\n'
+            'a, 01 ,0042,80,70,60\r\n,,,,,\r\nb,2,1001,缺考,80,90\r\nc,03,1002\r\nd,04,1003,1,2,3,x\r\n'
+        )
+        frames = list(read_score_frames(BytesIO(text.encode('utf-8')), 'scores.csv', chunk_size=2))
+        self.assertEqual([frame.index.tolist() for frame in frames], [[2], [4, 5], [6]])
+        self.assertEqual(list(frames[0].columns), REQUIRED_COLUMNS)
+
+        frame, errors = validate_frame(pd.concat(frames))
+        self.assertEqual(frame['student_id'].tolist(), ['0042', '1001', '1002', '1003'])
+        self.assertEqual(frame['course_id'].tolist(), ['01', '2', '03', '04'])
+        self.assertEqual(errors.tolist(), ['', '成绩必须是数字', '成绩必须是数字', ''])
+
+    def test_reads_xlsx_integers_without_float_suffix(self):
+        workbook = Workbook()
+        workbook.active.append(self.HEADER.split(','))
+        workbook.active.append([1000.0, 1, 80, 70.5, 60, None])
+        output = BytesIO()
+        workbook.save(output)
+        output.seek(0)
+
+        self.assertEqual(count_score_rows(output, 'scores.xlsx'), 1)
+        rows = list(read_score_rows(output, 'scores.xlsx'))
+        self.assertEqual(rows, [(2, {'学号': 1000, '课程编号': 1, '平时成绩': 80, '期中成绩': 70.5, '期末成绩': 60})])
+
+    def test_rejects_missing_columns_and_unknown_formats(self):
+        with self.assertRaisesMessage(ValueError, '期末成绩'):
+            validate_score_file(BytesIO('学号,课程编号,平时成绩,期中成绩\r\n'.encode('utf-8')), 'scores.csv')
+        with self.assertRaisesMessage(ValueError, '不支持的文件格式'):
+            read_score_rows(BytesIO(b''), 'scores.txt')
+
+
+class BackgroundJobTests(TemporaryMediaMixin, TestCase):
+    """导入、导出任务由工作进程执行，进度和结果通过任务接口查询。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_school(students=2)
+        cls.user = User.objects.create_superuser('jobs', 'jobs@example.com', 'jobs')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def run_worker(self):
+        """相当于 run_jobs --once（该命令会关闭测试事务中的数据库连接）"""
+        while (job := claim_next_job()) is not None:
+            run_job(job)
+
+    def test_import_job_runs_in_worker(self):
+        upload = SimpleUploadedFile('scores.csv', '学号,课程编号,平时成绩,期中成绩,期末成绩\n1000,01,80,80,80\n9999,01,80,80,80\n'.encode('utf-8'))
+        response = self.client.post(reverse('import_scores'), {'score_file': upload})
+        job = Job.objects.get()
+        self.assertRedirects(response, f"{reverse('score_list')}?job={job.pk}", fetch_redirect_response=False)
+        # 请求中只提交任务，不导入
+        self.assertEqual((job.Status, Score.objects.count()), (Job.STATUS_PENDING, 0))
+
+        self.run_worker()
+        status = self.client.get(reverse('job_status', args=[job.pk])).json()
+        self.assertEqual(status['status'], Job.STATUS_SUCCESS)
+        self.assertEqual((status['processed_rows'], status['success_count'], status['error_count']), (2, 1, 1))
+        self.assertIsNotNone(status['error_report_url'])
+        self.assertEqual(Score.objects.count(), 1)
+
+    def test_export_job_result_can_be_downloaded(self):
+        Score.objects.create(Student_id='1000', Course_id='01', RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+        job = enqueue_export(self.user, filters={'course_id': '01'})
+        self.run_worker()
+
+        status = self.client.get(reverse('job_status', args=[job.pk])).json()
+        self.assertEqual((status['status'], status['success_count']), (Job.STATUS_SUCCESS, 1))
+        response = self.client.get(status['download_url'])
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        self.assertEqual(len(list(workbook.active.iter_rows())), 2)
+
+    def test_job_is_claimed_once(self):
+        job = enqueue_export(self.user)
+        self.assertEqual(claim_next_job().pk, job.pk)
+        self.assertIsNone(claim_next_job())
+        # 其他用户不能查看任务
+        self.client.force_login(User.objects.create_user('other', 'other@example.com', 'other'))
+        self.assertEqual(self.client.get(reverse('job_status', args=[job.pk])).status_code, 404)
+
+
+class ImportValidationTests(TestCase):
+    """按列校验导入数据，失败行写入错误报告。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_school(students=1)
+
+    def test_validate_frame_keeps_first_error_per_row(self):
+        frame, errors = validate_frame(build_frame([
+            score_row(2, ' 1000 ', '01', regular='85.5'),
+            score_row(3, None, '01', regular='缺考'),
+            score_row(4, '1000', '', midterm=-1),
+            score_row(5, '1000', '01', final=100.5),
+        ]))
+        self.assertEqual(errors.tolist(), ['', '学号不能为空', '课程编号不能为空', '成绩必须在0-100之间'])
+        self.assertEqual((frame.loc[2, 'student_id'], frame.loc[2, 'RegularGrade']), ('1000', 85.5))
+
+    def test_flag_duplicates_across_chunks(self):
+        seen_pairs = set()
+        flagged = []
+        for chunk in ([score_row(2, '1000', '01'), score_row(3, '1000', '01'), score_row(4, '', '01')],
+                      [score_row(5, '1000', '02'), score_row(6, '1000', '01')]):
+            frame, errors = validate_frame(build_frame(chunk))
+            flag_duplicates(frame, errors, seen_pairs)
+            flagged += errors.tolist()
+        self.assertEqual(flagged, ['', '(学号, 课程编号) 与前面的行重复', '学号不能为空', '', '(学号, 课程编号) 与前面的行重复'])
+
+    def test_error_report_lists_failed_rows(self):
+        report = ErrorReport()
+        rows = [score_row(2, '1000', '01')] + [
+            score_row(row_number, '9999', '01') for row_number in range(3, MAX_SAMPLE_ERRORS + 8)
+        ]
+        result = ScoreImporter(chunk_size=50, error_sink=report).run(rows)
+        self.assertEqual((result.success_count, result.error_count), (1, MAX_SAMPLE_ERRORS + 5))
+        # 结果中只保留部分样例，完整错误在报告中
+        self.assertEqual(len(result.errors), MAX_SAMPLE_ERRORS)
+
+        output = BytesIO()
+        report.save(output)
+        output.seek(0)
+        sheet = load_workbook(output, read_only=True).active
+        values = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(values[0], tuple(ErrorReport.HEADER))
+        self.assertEqual(len(values), 1 + report.count)
+        self.assertEqual(values[1], (3, '9999', '01', 80, 80, 80, '学号 9999 不存在'))
+
+
+class ResumableImportTests(TestCase):
+    """中断的导入按检查点从中断处继续，任务在执行期间不会被误判为中断。"""
+
+    FILE_HASH = 'f' * 64
+
+    @classmethod
+    def setUpTestData(cls):
+        create_school(students=6)
+
+    def rows(self, fail_at=None):
+        for i in range(6):
+            if i == fail_at:
+                raise RuntimeError('worker killed')
+            yield score_row(i + 2, f'{1000 + i}', '01', final=60 + i)
+
+    def test_resumes_after_crash(self):
+        with self.assertRaises(RuntimeError):
+            ScoreImporter(chunk_size=2, file_hash=self.FILE_HASH).run(self.rows(fail_at=4))
+        self.assertEqual(Score.objects.count(), 4)
+        self.assertEqual(ImportCheckpoint.objects.count(), 2)
+
+        # 已提交的块不再写入：之后修改的成绩不会被续传覆盖
+        Score.objects.filter(Student_id='1000').update(FinalGrade=0)
+        result = ScoreImporter(chunk_size=2, file_hash=self.FILE_HASH).run(self.rows())
+        self.assertEqual((result.processed_rows, result.resumed_rows, result.success_count), (6, 4, 6))
+        self.assertEqual(Score.objects.count(), 6)
+        self.assertEqual(Score.objects.get(Student_id='1000').FinalGrade, 0)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_resumed_chunks_are_reranked(self):
+        # 续传时只写入另一个年级的学生，之前已提交的块所在的班级和年级也要计算排名
+        create_school(students=2, class_id='C2', grade='2025', first_id=2000)
+        rows = [score_row(i + 2, f'{1000 + i}', '01', final=60 + i) for i in range(4)]
+        rows += [score_row(6, '2000', '01'), score_row(7, '2001', '01')]
+
+        def crashing_rows():
+            yield from rows[:4]
+            raise RuntimeError('worker killed')
+
+        with self.assertRaises(RuntimeError):
+            ScoreImporter(chunk_size=2, file_hash=self.FILE_HASH).run(crashing_rows())
+        self.assertFalse(StudentSummary.objects.filter(ClassRank__isnull=False).exists())
+
+        ScoreImporter(chunk_size=2, file_hash=self.FILE_HASH).run(iter(rows))
+        ranks = dict(StudentSummary.objects.values_list('Student_id', 'ClassRank'))
+        self.assertEqual(ranks, {'1003': 1, '1002': 2, '1001': 3, '1000': 4, '2000': 1, '2001': 1})
+        self.assertEqual(StudentSummary.objects.get(Student_id='1003').GradeRank, 1)
+
+    def test_requeued_job_does_not_overwrite_new_run(self):
+        Job.objects.create(Kind=Job.KIND_DASHBOARD)
+        first = claim_next_job()
+        # 模拟第一次执行长时间没有心跳
+        first.StartedAt = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(pk=first.pk).update(StartedAt=first.StartedAt, UpdatedAt=first.StartedAt)
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=10)), 1)
+        second = claim_next_job()
+
+        run_job(first)
+        job = Job.objects.get()
+        self.assertEqual((job.Status, job.StartedAt, job.Message), (Job.STATUS_RUNNING, second.StartedAt, ''))
+        run_job(second)
+        self.assertEqual(Job.objects.get().Status, Job.STATUS_SUCCESS)
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    """心跳在独立的线程和数据库连接中更新，需要已提交的数据。"""
+
+    def test_heartbeat_keeps_long_job_from_being_requeued(self):
+        Job.objects.create(Kind=Job.KIND_DASHBOARD)
+        job = claim_next_job()
+        Job.objects.filter(pk=job.pk).update(UpdatedAt=timezone.now() - timedelta(hours=1))
+        with Heartbeat(job, interval=0.05):
+            time.sleep(0.3)
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=10)), 0)
+        self.assertEqual(Job.objects.get().Status, Job.STATUS_RUNNING)
+
+
+class CsvExportTests(TemporaryMediaMixin, TestCase):
+    """CSV 导出按批查询、逐段输出。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=5, courses=('01', '02'))
+        for student in students:
+            for course in courses:
+                Score.objects.create(Student=student, Course=course, RegularGrade=80, MidtermGrade=70, FinalGrade=60)
+        cls.user = User.objects.create_superuser('export', 'export@example.com', 'export')
+
+    def test_streams_one_chunk_per_batch(self):
+        with CaptureQueriesContext(connection) as context:
+            chunks = list(stream_scores_csv(chunk_size=3))
+        # 表头一段，10 条成绩每批 3 条共 4 段；最后一次查询确认没有更多数据
+        self.assertEqual(len(chunks), 1 + 4)
+        self.assertEqual(len(context.captured_queries), 4 + 1)
+        self.assertTrue(chunks[0].startswith('\ufeff学号,姓名,课程编号'))
+        rows = list(csv.reader(StringIO(''.join(chunks[1:]))))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0], ['1000', '学生1000', '01', '课程01', '80.0', '70.0', '60.0', '69.0', 'D'])
+
+    def test_export_view_streams_csv(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_scores'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], CSV_CONTENT_TYPE)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(len(content.splitlines()), 1 + 10)
+
+
+class XlsxExportTests(TemporaryMediaMixin, TestCase):
+    """xlsx 导出以只写模式写入文件。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=3)
+        for student in students:
+            Score.objects.create(Student=student, Course=courses[0], RegularGrade=90, MidtermGrade=90, FinalGrade=90)
+        cls.user = User.objects.create_superuser('xlsx', 'xlsx@example.com', 'xlsx')
+
+    def test_writes_header_and_rows(self):
+        progress = []
+        with tempfile.TemporaryFile() as output:
+            count = write_scores_xlsx(output, progress=progress.append)
+            output.seek(0)
+            rows = list(load_workbook(output, read_only=True)['成绩表'].iter_rows(values_only=True))
+        self.assertEqual((count, progress), (3, [3]))
+        self.assertEqual(rows[0], tuple(export_header()))
+        self.assertEqual(rows[1], ('1000', '学生1000', '01', '课程01', 90, 90, 90, 90, 'A'))
+
+    def test_export_view_downloads_workbook(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_scores'))
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        self.assertEqual(len(list(workbook.active.iter_rows())), 1 + 3)
+
+
+class FilteredExportTests(TemporaryMediaMixin, TestCase):
+    """导出使用成绩列表的筛选条件，只查询和输出所选的列。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=2, courses=('01', '02'))
+        for student in students:
+            for course, final in zip(courses, (95, 40)):
+                Score.objects.create(Student=student, Course=course, RegularGrade=final, MidtermGrade=final, FinalGrade=final)
+        create_school(students=1, class_id='C2', first_id=2000)
+        Score.objects.create(Student_id='2000', Course_id='01', RegularGrade=95, MidtermGrade=95, FinalGrade=95)
+        cls.user = User.objects.create_superuser('filter', 'filter@example.com', 'filter')
+
+    def export(self, **params):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_scores'), {'format': 'csv', **params})
+        return list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+
+    def test_applies_list_filters_and_columns(self):
+        rows = self.export(class_id='C1', grade_level='a', columns='student_id,total_grade')
+        self.assertEqual(rows, [['学号', '总成绩'], ['1000', '95.0'], ['1001', '95.0']])
+        self.assertEqual(len(self.export(course_id='02')), 1 + 2)
+
+    def test_parse_columns(self):
+        self.assertEqual(parse_export_columns(['name,student_id', 'name']), ['name', 'student_id'])
+        self.assertIsNone(parse_export_columns([]))
+        with self.assertRaisesMessage(ValueError, 'password'):
+            parse_export_columns(['name,password'])
+
+    def test_selects_only_needed_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            list(iter_score_batches(columns=['total_grade', 'grade_level']))
+        sql = context.captured_queries[0]['sql']
+        # 未选择学生和课程列时不关联学生表和课程表
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('RegularGrade', sql)
+
+
+class ExportCacheTests(TemporaryMediaMixin, TestCase):
+    """导出文件按数据版本缓存在磁盘上，重新验证时返回 304。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=2)
+        for student in students:
+            Score.objects.create(Student=student, Course=courses[0], RegularGrade=70, MidtermGrade=70, FinalGrade=70)
+        cls.user = User.objects.create_superuser('cache', 'cache@example.com', 'cache')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def download(self, **headers):
+        response = self.client.get(reverse('export_scores'), **headers)
+        # 读完流式内容时测试客户端会关闭响应中的文件
+        content = b''.join(response.streaming_content) if response.status_code == 200 else b''
+        return response, content
+
+    def test_second_download_is_served_from_cache(self):
+        first, content = self.download()
+        with CaptureQueriesContext(connection) as context:
+            second, cached = self.download()
+        self.assertEqual((cached, second['ETag']), (content, first['ETag']))
+        self.assertFalse(any(Score._meta.db_table in query['sql'] for query in context.captured_queries))
+        # 临时文件已重命名为缓存文件
+        self.assertEqual([name.endswith('.xlsx') for name in os.listdir(self.export_cache_dir)], [True])
+
+    def test_revalidation_and_invalidation(self):
+        first, _content = self.download()
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=first['ETag'])[0].status_code, 304)
+
+        score = Score.objects.first()
+        score.FinalGrade = 100
+        # 信号处理中的数据版本号在事务提交后递增
+        with self.captureOnCommitCallbacks(execute=True):
+            score.save()
+        changed, _content = self.download(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_build_reopens_committed_file(self):
+        export_cache = ExportCache()
+        version = DataVersion.current(DataVersion.SCORES)[0]
+        with export_cache.build('key', 'csv', version, lambda output: output.write(b'data')) as output:
+            self.assertEqual((output.name, output.read()), (export_cache.path('key', 'csv'), b'data'))
+
+        # 生成期间数据发生了变化：返回本次结果但不放入缓存
+        with export_cache.build('stale', 'csv', version - 1, lambda output: output.write(b'old')) as output:
+            self.assertEqual(output.read(), b'old')
+        self.assertEqual(os.listdir(self.export_cache_dir), ['key.csv'])
+
+
+class StoredTotalGradeTests(TestCase):
+    """总成绩和等级保存时写入，列表在数据库中按总成绩排序和按等级筛选。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=3)
+        for student, grade in zip(students, (50, 95, 75)):
+            Score.objects.create(Student=student, Course=courses[0], RegularGrade=grade, MidtermGrade=grade, FinalGrade=grade)
+        cls.user = User.objects.create_superuser('total', 'total@example.com', 'total')
+
+    def test_save_stores_total_and_level(self):
+        score = Score.objects.get(Student_id='1000')
+        self.assertEqual((score.TotalGrade, score.GradeLevel), (50.0, 'F'))
+        score.FinalGrade = 100
+        # 只保存部分字段时总成绩和等级一并更新
+        score.save(update_fields=['FinalGrade'])
+        score.refresh_from_db()
+        self.assertEqual((score.TotalGrade, score.GradeLevel), (70.0, 'C'))
+
+    def test_list_sorts_and_filters_in_database(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('score_list'), {'sort': '-total'})
+        self.assertEqual([score.Student_id for score in response.context['scores']], ['1001', '1002', '1000'])
+        response = self.client.get(reverse('score_list'), {'grade_level': 'A'})
+        self.assertEqual([score.Student_id for score in response.context['scores']], ['1001'])
+
+
+class TotalGradeRoundingTests(TestCase):
+    """Python 和 SQL 计算的总成绩使用同一舍入规则（四舍五入保留两位小数）。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, cls.students, courses = create_school(students=60)
+        cls.scheme = GradingScheme.objects.create(Name='舍入', RegularWeight=0.25, MidtermWeight=0.35, FinalWeight=0.4)
+        cls.weighted = Course.objects.create(CourseID='02', CourseName='课程02', CourseDescription='', Credits=2, Scheme=cls.scheme)
+        generator = random.Random(11)
+        # 评审示例：加权和为 46.965，按四舍五入应为 46.97
+        grades = [(65.16, 78.87, 9.39), (85.0, 85.0, 85.0)]
+        grades += [tuple(generator.randint(0, 10000) / 100 for _ in range(3)) for _ in range(len(cls.students) - 2)]
+        for student, (regular, midterm, final) in zip(cls.students, grades):
+            for course in (courses[0], cls.weighted):
+                Score.objects.create(Student=student, Course=course, RegularGrade=regular, MidtermGrade=midterm, FinalGrade=final)
+
+    def test_half_up_example(self):
+        self.assertEqual(calculate_total_grade(65.16, 78.87, 9.39), 46.97)
+        self.assertEqual(grade_batch([65.16], [78.87], [9.39])[0].tolist(), [46.97])
+
+    def test_python_and_sql_totals_agree(self):
+        scores = list(Score.objects.with_totals().select_related('Course__Scheme'))
+        for score in scores:
+            weights = score.Course.grading_scheme.weights
+            expected = calculate_total_grade(score.RegularGrade, score.MidtermGrade, score.FinalGrade, weights)
+            self.assertEqual((score.TotalGrade, score.weighted_total), (expected, expected), score.pk)
+            self.assertEqual(score.weighted_level, score.GradeLevel)
+            batch_totals, batch_levels = grade_batch(
+                [score.RegularGrade], [score.MidtermGrade], [score.FinalGrade], weights, score.Course.grading_scheme.thresholds
+            )
+            self.assertEqual((batch_totals[0], batch_levels[0]), (expected, score.GradeLevel))
+
+    def test_regrade_matches_save(self):
+        stored = dict(Score.objects.values_list('pk', 'TotalGrade'))
+        self.scheme.regrade()
+        Score.objects.filter(Course_id='01').regrade(GradingScheme.default())
+        self.assertEqual(dict(Score.objects.values_list('pk', 'TotalGrade')), stored)
+
+
+class RegradeTests(TestCase):
+    """修改成绩计算方案或更换课程方案时重新计算已保存的总成绩和等级。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, cls.students, courses = create_school(students=2)
+        cls.course = courses[0]
+        cls.scheme = GradingScheme.objects.create(Name='期末为主', RegularWeight=0.1, MidtermWeight=0.1, FinalWeight=0.8)
+        Score.objects.create(Student=cls.students[0], Course=cls.course, RegularGrade=100, MidtermGrade=100, FinalGrade=50)
+        Score.objects.create(Student=cls.students[1], Course=cls.course, RegularGrade=60, MidtermGrade=60, FinalGrade=95)
+
+    def stored(self):
+        return list(Score.objects.order_by('Student_id').values_list('TotalGrade', 'GradeLevel'))
+
+    def test_course_scheme_change_regrades_its_scores(self):
+        self.assertEqual(self.stored(), [(80.0, 'B'), (74.0, 'C')])
+        version = DataVersion.current(DataVersion.course_key(self.course.pk))[0]
+        self.course.Scheme = self.scheme
+        self.course.save()
+        self.assertEqual(self.stored(), [(60.0, 'D'), (88.0, 'B')])
+        self.assertGreater(DataVersion.current(DataVersion.course_key(self.course.pk))[0], version)
+
+    def test_scheme_rule_change_regrades_courses_using_it(self):
+        self.course.Scheme = self.scheme
+        self.course.save()
+        self.scheme.ThresholdB = 85
+        self.scheme.save()
+        self.assertEqual(self.stored(), [(60.0, 'D'), (88.0, 'B')])
+        self.scheme.ThresholdB, self.scheme.FinalWeight, self.scheme.RegularWeight = 89, 0.5, 0.4
+        self.scheme.save()
+        self.assertEqual(self.stored(), [(75.0, 'C'), (77.5, 'C')])
+
+    def test_with_totals_uses_each_course_scheme(self):
+        Course.objects.create(CourseID='02', CourseName='课程02', CourseDescription='', Credits=2, Scheme=self.scheme)
+        Score.objects.create(Student=self.students[0], Course_id='02', RegularGrade=100, MidtermGrade=100, FinalGrade=50)
+        totals = dict(
+            Score.objects.filter(Student=self.students[0]).with_totals().values_list('Course_id', 'weighted_total')
+        )
+        self.assertEqual(totals, {'01': 80.0, '02': 60.0})
+
+
+class BulkTotalGradeTests(TestCase):
+    """bulk_create / bulk_update / update 不调用 save()，由 ScoreQuerySet 按各课程的方案计算总成绩和等级。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, cls.students, courses = create_school(students=2, courses=('01', '02'))
+        scheme = GradingScheme.objects.create(Name='期末为主', RegularWeight=0.1, MidtermWeight=0.1, FinalWeight=0.8)
+        Course.objects.filter(pk='02').update(Scheme=scheme)
+
+    def stored(self):
+        return list(Score.objects.order_by('Student_id', 'Course_id').values_list('TotalGrade', 'GradeLevel'))
+
+    def create_scores(self):
+        Score.objects.bulk_create([
+            Score(Student=self.students[0], Course_id='01', RegularGrade=90, MidtermGrade=90, FinalGrade=90),
+            Score(Student=self.students[0], Course_id='02', RegularGrade=100, MidtermGrade=100, FinalGrade=50),
+            Score(Student=self.students[1], Course_id='01', RegularGrade=60, MidtermGrade=60, FinalGrade=60),
+        ])
+
+    def test_bulk_create_fills_totals(self):
+        self.create_scores()
+        self.assertEqual(self.stored(), [(90.0, 'A'), (60.0, 'D'), (60.0, 'D')])
+
+    def test_bulk_update_of_grades_refreshes_totals(self):
+        self.create_scores()
+        scores = list(Score.objects.order_by('Student_id', 'Course_id'))
+        for score in scores:
+            score.FinalGrade = 100
+        Score.objects.bulk_update(scores, ['FinalGrade'])
+        self.assertEqual(self.stored(), [(94.0, 'A'), (100.0, 'A'), (76.0, 'C')])
+
+    def test_update_of_grades_uses_each_course_scheme(self):
+        self.create_scores()
+        Score.objects.update(FinalGrade=10)
+        self.assertEqual(self.stored(), [(58.0, 'F'), (28.0, 'F'), (40.0, 'F')])
+        # 筛选条件引用被修改的字段，写入的表达式读取原值
+        Score.objects.filter(FinalGrade__lt=50).update(FinalGrade=F('FinalGrade') + 80, RegularGrade=100)
+        self.assertEqual(self.stored(), [(93.0, 'A'), (92.0, 'A'), (84.0, 'B')])
+
+    def test_update_of_course_uses_new_scheme(self):
+        Score.objects.bulk_create([
+            Score(Student=self.students[1], Course_id='01', RegularGrade=100, MidtermGrade=100, FinalGrade=50),
+        ])
+        Score.objects.update(Course_id='02')
+        self.assertEqual(self.stored(), [(60.0, 'D')])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CourseStatsTests(TestCase):
+    """课程统计的数值，以及成绩变化后缓存失效。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=5)
+        cls.course = courses[0]
+        for student, grade in zip(students, (95, 85, 85, 55, 100)):
+            Score.objects.create(Student=student, Course=cls.course, RegularGrade=grade, MidtermGrade=grade, FinalGrade=grade)
+        cls.students = students
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_values(self):
+        stats = get_course_stats(self.course)
+        self.assertEqual(stats['count'], 5)
+        self.assertEqual((stats['mean'], stats['min'], stats['max']), (84.0, 55.0, 100.0))
+        self.assertEqual(stats['stddev'], 15.62)
+        self.assertEqual(stats['percentiles'], {'p10': 55.0, 'p50': 85.0, 'p90': 100.0})
+        self.assertEqual([bucket['count'] for bucket in stats['histogram']], [0, 0, 0, 0, 0, 1, 0, 0, 2, 2])
+        self.assertEqual(stats['grade_levels'], {'A': 2, 'B': 2, 'C': 0, 'D': 0, 'F': 1})
+        self.assertEqual(
+            [(rank['student_id'], rank['rank']) for rank in stats['ranks']],
+            [('1004', 1), ('1000', 2), ('1001', 3), ('1002', 3), ('1003', 5)],
+        )
+
+    def test_empty_course(self):
+        course = Course.objects.create(CourseID='02', CourseName='课程02', CourseDescription='', Credits=2)
+        stats = get_course_stats(course)
+        self.assertEqual((stats['count'], stats['mean'], stats['ranks']), (0, None, []))
+
+    def test_cached_until_a_score_changes(self):
+        get_course_stats(self.course)
+        with self.assertNumQueries(1):
+            # 只查询课程的数据版本号
+            self.assertEqual(get_course_stats(self.course)['count'], 5)
+        score = Score.objects.get(Student=self.students[3], Course=self.course)
+        score.FinalGrade = score.RegularGrade = score.MidtermGrade = 65
+        with self.captureOnCommitCallbacks(execute=True):
+            score.save()
+        stats = get_course_stats(self.course)
+        self.assertEqual((stats['min'], stats['grade_levels']['D']), (65.0, 1))
+
+
+class StudentSummaryTests(TestCase):
+    """单条成绩变化和学生调班时增量更新学生汇总及班级、年级排名。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.klass, cls.students, cls.courses = create_school(students=3, courses=('01', '02'))
+        cls.other, _students, _courses = create_school(students=0, class_id='C2')
+        Course.objects.filter(CourseID='02').update(Credits=4)
+        for student, (first, second) in zip(cls.students, ((90, 60), (60, 80), (90, 60))):
+            for course, grade in zip(cls.courses, (first, second)):
+                Score.objects.create(Student=student, Course=course, RegularGrade=grade, MidtermGrade=grade, FinalGrade=grade)
+
+    def summaries(self, field):
+        return dict(StudentSummary.objects.values_list('Student_id', field))
+
+    def test_weighted_average_gpa_and_tied_ranks(self):
+        summary = StudentSummary.objects.get(Student_id='1000')
+        # (90 * 2 + 60 * 4) / 6；绩点 (4.0 * 2 + 1.0 * 4) / 6
+        self.assertEqual((summary.CourseCount, summary.TotalCredits, summary.WeightedAverage, summary.GPA), (2, 6, 70.0, 2.0))
+        self.assertEqual(self.summaries('ClassRank'), {'1000': 2, '1001': 1, '1002': 2})
+        self.assertEqual(self.summaries('GradeRank'), {'1000': 2, '1001': 1, '1002': 2})
+
+    def test_score_change_reranks(self):
+        score = Score.objects.get(Student_id='1000', Course_id='02')
+        score.RegularGrade = score.MidtermGrade = score.FinalGrade = 100
+        score.save()
+        self.assertEqual(self.summaries('ClassRank'), {'1000': 1, '1001': 2, '1002': 3})
+        score.delete()
+        self.assertEqual(self.summaries('ClassRank'), {'1000': 1, '1001': 2, '1002': 3})
+        Score.objects.filter(Student_id='1000').delete()
+        self.assertEqual(self.summaries('ClassRank'), {'1001': 1, '1002': 2})
+
+    def test_moving_class_reranks_both_classes(self):
+        student = self.students[1]
+        student.Class = self.other
+        student.save()
+        self.assertEqual(self.summaries('ClassRank'), {'1000': 1, '1001': 1, '1002': 1})
+        self.assertEqual(self.summaries('GradeRank'), {'1000': 2, '1001': 1, '1002': 2})
+
+    def test_bulk_writes_refresh_summaries(self):
+        student = Student.objects.create(StudentID='1003', Name='学生1003', Gender='男', Age=18,
+                                         Class=self.klass, EnrollmentDate=date(2024, 9, 1))
+        Score.objects.bulk_create([
+            Score(Student=student, Course=course, RegularGrade=100, MidtermGrade=100, FinalGrade=100)
+            for course in self.courses
+        ])
+        self.assertEqual(self.summaries('WeightedAverage')['1003'], 100.0)
+        self.assertEqual(self.summaries('ClassRank'), {'1000': 3, '1001': 2, '1002': 3, '1003': 1})
+        Score.objects.filter(Student=student).update(FinalGrade=0)
+        self.assertEqual(self.summaries('WeightedAverage')['1003'], 60.0)
+        self.assertEqual(self.summaries('ClassRank'), {'1000': 2, '1001': 1, '1002': 2, '1003': 4})
+        score = Score.objects.get(Student_id='1001', Course_id='01')
+        score.Student = Student.objects.create(StudentID='1004', Name='学生1004', Gender='男', Age=18,
+                                               Class=self.klass, EnrollmentDate=date(2024, 9, 1))
+        Score.objects.bulk_update([score], ['Student'])
+        # 更换学生时原来的学生和新学生都重新汇总
+        self.assertEqual(self.summaries('CourseCount'), {'1000': 2, '1001': 1, '1002': 2, '1003': 2, '1004': 1})
+
+
+class BulkWriteVersionTests(TestCase):
+    """批量写入与单条写入递增相同的数据版本号，依赖它们的缓存同样失效。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, cls.students, cls.courses = create_school(students=2, courses=('01', '02'))
+        Score.objects.create(Student=cls.students[0], Course=cls.courses[0], RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+        Score.objects.create(Student=cls.students[1], Course=cls.courses[1], RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+
+    def versions(self):
+        return dict(DataVersion.objects.values_list('Name', 'Version'))
+
+    def bumped(self, write):
+        before = self.versions()
+        write()
+        after = self.versions()
+        return {name for name, version in after.items() if version != before.get(name)}
+
+    def test_score_update_bumps_course_and_student(self):
+        bumped = self.bumped(lambda: Score.objects.filter(Student_id='1000').update(FinalGrade=90))
+        self.assertEqual(bumped, {'scores', 'course:01', 'student:1000', 'model:sms_app.score'})
+
+    def test_score_bulk_create_and_bulk_update(self):
+        score = Score(Student_id='1001', Course_id='01', RegularGrade=70, MidtermGrade=70, FinalGrade=70)
+        bumped = self.bumped(lambda: Score.objects.bulk_create([score]))
+        self.assertEqual(bumped, {'scores', 'course:01', 'student:1001', 'model:sms_app.score'})
+        score = Score.objects.get(Student_id='1000')
+        score.FinalGrade = 60
+        bumped = self.bumped(lambda: Score.objects.bulk_update([score], ['FinalGrade']))
+        self.assertEqual(bumped, {'scores', 'course:01', 'student:1000', 'model:sms_app.score'})
+
+    def test_course_and_student_update(self):
+        bumped = self.bumped(lambda: Course.objects.filter(CourseID='02').update(Credits=3))
+        self.assertEqual(bumped, {'scores', 'course:02', 'model:sms_app.course'})
+        # 学生姓名出现在所选课程的统计排名中
+        bumped = self.bumped(lambda: Student.objects.filter(StudentID='1001').update(Name='改名'))
+        self.assertEqual(bumped, {'scores', 'course:02', 'model:sms_app.student'})
+
+    def test_signals_bump_once_per_transaction(self):
+        Score.objects.create(Student=self.students[0], Course=self.courses[1], RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+
+        def delete_student():
+            with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks(execute=True):
+                # 级联删除两条成绩，逐条发送的信号在提交时合并为一次递增
+                self.students[0].delete()
+            updates = [query for query in context.captured_queries
+                       if query['sql'].startswith('UPDATE') and 'sms_app_dataversion' in query['sql']]
+            self.assertEqual(len(updates), 1)
+
+        bumped = self.bumped(delete_student)
+        self.assertEqual(
+            bumped, {'scores', 'course:01', 'course:02', 'student:1000', 'model:sms_app.score', 'model:sms_app.student'}
+        )
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    def test_course_stats_refresh_after_regrade(self):
+        cache.clear()
+        self.assertEqual(get_course_stats(self.courses[0])['max'], 80.0)
+        Score.objects.filter(Course_id='01').update(RegularGrade=100, MidtermGrade=100, FinalGrade=100)
+        Score.objects.filter(Course_id='01').regrade(GradingScheme.default())
+        self.assertEqual(get_course_stats(self.courses[0])['max'], 100.0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DashboardSnapshotTests(TestCase):
+    """仪表盘读取快照，数据变化后返回旧快照并提交一次后台刷新任务。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=2)
+        Score.objects.create(Student=students[0], Course=courses[0], RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+        cls.user = User.objects.create_superuser('dash', 'dash@example.com', 'dash')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_first_request_builds_snapshot(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['total_students'], response.context['snapshot_stale']), (2, False))
+        self.assertEqual(response.context['average_scores']['avg_total'], 80.0)
+        self.assertEqual(Snapshot.objects.count(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_stale_snapshot_is_served_while_refreshing(self):
+        self.client.get(reverse('dashboard'))
+        with self.captureOnCommitCallbacks(execute=True):
+            create_school(students=1, class_id='C2', first_id=2000)
+        for _ in range(2):
+            response = self.client.get(reverse('dashboard'))
+            self.assertEqual((response.context['total_students'], response.context['snapshot_stale']), (2, True))
+        # 多个过期请求只提交一个刷新任务
+        self.assertEqual(Job.objects.filter(Kind=Job.KIND_DASHBOARD).count(), 1)
+
+        run_job(claim_next_job())
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual((response.context['total_students'], response.context['snapshot_stale']), (3, False))
+        self.assertEqual(len(response.context['class_distribution']), 2)
+
+
+class StudentSearchTests(TestCase):
+    """SQLite 的 FTS5 虚拟表由触发器同步，搜索词中的特殊字符不会导致查询出错。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.klass, _students, _courses = create_school(students=0, class_id='C1')
+        for student_id, name in (('1000', '欧阳明月'), ('1001', '司马青云'), ('2000', '张三')):
+            Student.objects.create(StudentID=student_id, Name=name, Gender='男', Age=18, Class=cls.klass,
+                                   EnrollmentDate=date(2024, 9, 1))
+
+    def found(self, query):
+        return sorted(search_students(Student.objects.all(), query).values_list('pk', flat=True))
+
+    def test_name_class_and_id_prefix(self):
+        self.assertEqual(self.found('明月'), ['1000'])
+        self.assertEqual(self.found('司马青'), ['1001'])
+        self.assertEqual(self.found('C1班'), ['1000', '1001', '2000'])
+        self.assertEqual(self.found('100'), ['1000', '1001'])
+
+    def test_triggers_follow_writes(self):
+        student = Student.objects.get(pk='1000')
+        student.Name = '上官飞燕'
+        student.save()
+        self.assertEqual((self.found('欧阳明'), self.found('上官飞')), ([], ['1000']))
+
+        self.klass.ClassName = '实验班'
+        self.klass.save()
+        self.assertEqual(self.found('实验班'), ['1000', '1001', '2000'])
+        Student.objects.filter(pk='1001').update(Name='诸葛孔明')
+        self.assertEqual(self.found('诸葛孔'), ['1001'])
+
+        ClassInformation.objects.create(ClassID='C2', ClassName='新生班', Grade='2025', ClassAdviser='李')
+        Student.objects.filter(pk='2000').update(Class_id='C2')
+        self.assertEqual(self.found('新生班'), ['2000'])
+        Student.objects.get(pk='2000').delete()
+        self.assertEqual(self.found('新生班'), [])
+
+    def test_special_characters(self):
+        for query in ('(', '+', '"', '张"三', '%', '_', '\\', '*明月'):
+            self.found(query)
+        self.assertEqual(self.found('%'), [])
+
+    def test_mysql_boolean_query_strips_operators(self):
+        self.assertEqual(MySQLFulltextSearch.boolean_query('明'), '明*')
+        self.assertEqual(MySQLFulltextSearch.boolean_query('+明 (月)'), '"明 月"')
+        self.assertEqual(MySQLFulltextSearch.boolean_query('(+'), None)
+        self.assertEqual(MySQLFulltextSearch.boolean_query('"@欧阳~'), '"欧阳"')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StudentListViewTests(TestCase):
+    """学生列表页渲染搜索结果，并按游标翻页。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_school(students=12)
+        create_school(students=2, class_id='C2', first_id=2000)
+        cls.user = User.objects.create_superuser('list', 'list@example.com', 'list')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_paginated_search(self):
+        response = self.client.get(reverse('student_list'), {'search': '学生10'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'sms_app/student_list.html')
+        first_page = [student.pk for student in response.context['students']]
+        self.assertEqual(len(first_page), 10)
+        self.assertTrue(all(student_id.startswith('10') for student_id in first_page))
+        self.assertContains(response, 'search=%E5%AD%A6%E7%94%9F10')
+
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('student_list'), {'search': '学生10', 'after': cursor})
+        second_page = [student.pk for student in response.context['students']]
+        self.assertEqual(sorted(first_page + second_page), [str(1000 + i) for i in range(12)])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse('student_list'), {'after': 'garbage'})
+        self.assertEqual((response.status_code, response.context['page_obj'].number), (200, 1))
+
+    def test_search_by_class_name(self):
+        response = self.client.get(reverse('student_list'), {'search': 'C2班'})
+        self.assertEqual(sorted(student.pk for student in response.context['students']), ['2000', '2001'])
+        self.assertContains(response, '学生2000')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LookupApiTests(TestCase):
+    """下拉框查找按编号和名称前缀匹配、限制条数、检查权限，并随数据变化失效。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        klass, _students, _courses = create_school(students=0)
+        for student_id, name in (('1000', '王一'), ('1001', '王二'), ('1100', '李四'), ('2000', '10号')):
+            Student.objects.create(StudentID=student_id, Name=name, Gender='男', Age=18, Class=klass,
+                                   EnrollmentDate=date(2024, 9, 1))
+        cls.user = User.objects.create_superuser('lookup', 'lookup@example.com', 'lookup')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def lookup(self, kind='students', **params):
+        return self.client.get(reverse('lookup', args=[kind]), params)
+
+    def test_id_prefix_before_name_prefix(self):
+        results = self.lookup(q='10').json()['results']
+        self.assertEqual([row['id'] for row in results], ['1000', '1001', '2000'])
+        self.assertEqual(results[0]['text'], '王一 (1000)')
+        self.assertEqual([row['id'] for row in self.lookup(q='王').json()['results']], ['1000', '1001'])
+        self.assertEqual(self.lookup(q='  ').json()['results'], [])
+
+    def test_limit(self):
+        self.assertEqual(len(self.lookup(q='1', limit=2).json()['results']), 2)
+        # 无效的条数使用默认值
+        self.assertEqual(len(self.lookup(q='1', limit='x').json()['results']), 4)
+
+    def test_classes_and_courses(self):
+        Course.objects.create(CourseID='M01', CourseName='数学', CourseDescription='', Credits=2)
+        self.assertEqual(self.lookup('courses', q='数').json()['results'], [{'id': 'M01', 'text': '数学'}])
+        self.assertEqual(self.lookup('classes', q='C1').json()['results'], [{'id': 'C1', 'text': 'C1班'}])
+        self.assertEqual(self.lookup('teachers', q='C1').status_code, 404)
+
+    def test_requires_permission(self):
+        self.client.force_login(User.objects.create_user('plain', 'plain@example.com', 'plain'))
+        self.assertEqual(self.lookup(q='10').status_code, 403)
+
+    def test_cache_follows_writes(self):
+        self.assertEqual(len(self.lookup(q='王').json()['results']), 2)
+        Student.objects.filter(pk='1001').update(Name='赵二')
+        self.assertEqual([row['id'] for row in self.lookup(q='王').json()['results']], ['1000'])
+
+
+class JsonResponseEncodingTests(SimpleTestCase):
+    """orjson 与 DjangoJSONEncoder 的输出完全一致，包括时间、Decimal 和中文。"""
+
+    def test_encoders_agree(self):
+        data = {
+            'at': timezone.now(),
+            'day': date(2024, 9, 1),
+            'amount': Decimal('1.50'),
+            'name': '学生',
+            'total': 46.97,
+            'rows': [{'grade': None, 'passed': True}],
+        }
+        encoded = responses.dumps(data)
+        with mock.patch.object(responses, 'orjson', None):
+            self.assertEqual(responses.dumps(data), encoded)
+        # 时间截断到毫秒，UTC 输出 Z，与 JsonResponse 相同
+        self.assertEqual(json.loads(encoded)['at'], json.loads(JsonResponse(data).content)['at'])
+
+
+class ScoreBatchApiTests(TestCase):
+    """批量成绩接口按学号或班级查询，一条查询取出全部成绩。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=3, courses=('01', '02'))
+        for student in students[:2]:
+            for course in courses:
+                Score.objects.create(Student=student, Course=course, RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+        cls.user = User.objects.create_superuser('batch', 'batch@example.com', 'batch')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def batch(self, **params):
+        return self.client.get(reverse('get_scores_batch'), params)
+
+    def test_by_student_ids(self):
+        with self.assertNumQueries(3):
+            # 会话、用户和成绩各一条
+            response = self.batch(student_ids='1001,1000,1001,9999')
+        students = response.json()['students']
+        self.assertEqual(list(students), ['1001', '1000', '9999'])
+        self.assertEqual([row['course_name'] for row in students['1000']], ['课程01', '课程02'])
+        self.assertEqual(students['1000'][0], {
+            'course_name': '课程01', 'regular_grade': 80.0, 'midterm_grade': 80.0, 'final_grade': 80.0,
+            'total_grade': 80.0, 'grade_level': 'B',
+        })
+        self.assertEqual(students['9999'], [])
+
+    def test_by_class_with_fields(self):
+        students = self.batch(class_id='C1', fields='course_id,total_grade').json()['students']
+        self.assertEqual(set(students), {'1000', '1001', '1002'})
+        self.assertEqual(students['1001'], [{'course_id': '01', 'total_grade': 80.0}, {'course_id': '02', 'total_grade': 80.0}])
+        self.assertEqual(students['1002'], [])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.batch().status_code, 400)
+        self.assertEqual(self.batch(student_ids='1000', fields='password').status_code, 400)
+        too_many = ','.join(str(i) for i in range(MAX_BATCH_STUDENTS + 1))
+        self.assertEqual(self.batch(student_ids=too_many).status_code, 400)
+        self.client.force_login(User.objects.create_user('plain', 'plain@example.com', 'plain'))
+        self.assertEqual(self.batch(student_ids='1000').status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ScorecardApiTests(TestCase):
+    """成绩单带 ETag，未变化时返回 304，成绩或课程变化后返回新内容。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _klass, students, courses = create_school(students=2)
+        cls.course = courses[0]
+        cls.score = Score.objects.create(Student=students[0], Course=cls.course, RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+        Score.objects.create(Student=students[1], Course=cls.course, RegularGrade=60, MidtermGrade=60, FinalGrade=60)
+        cls.user = User.objects.create_superuser('card', 'card@example.com', 'card')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get(self, student_id='1000', etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('get_student_scores', args=[student_id]), **headers)
+
+    def test_not_modified_without_querying_scores(self):
+        response = self.get()
+        self.assertEqual(response.json()['scores'][0]['total_grade'], 80.0)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('sms_app_score' in query['sql'] for query in context.captured_queries))
+
+    def test_etag_changes_with_scores_and_courses(self):
+        etag = self.get()['ETag']
+        other_etag = self.get('1001')['ETag']
+        self.score.FinalGrade = 100
+        with self.captureOnCommitCallbacks(execute=True):
+            self.score.save()
+        response = self.get(etag=etag)
+        self.assertEqual((response.status_code, response.json()['scores'][0]['total_grade']), (200, 88.0))
+        # 其他学生的成绩单不受影响
+        self.assertEqual(self.get('1001', etag=other_etag).status_code, 304)
+
+        etag = response['ETag']
+        Course.objects.filter(pk=self.course.pk).update(CourseName='高等数学')
+        response = self.get(etag=etag)
+        self.assertEqual(response.json()['scores'][0]['course_name'], '高等数学')
+
+        etag = response['ETag']
+        Score.objects.filter(Student_id='1000').update(FinalGrade=90)
+        self.assertEqual(self.get(etag=etag).status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class GetOrRefreshConcurrencyTests(SimpleTestCase):
+    """并发请求同一缓存汇总数据时只重新计算一次。"""
+
+    THREADS = 16
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def compute(self, value):
+        def compute():
+            with self.calls_lock:
+                self.calls += 1
+            # 模拟耗时的统计查询，保证其他线程在计算期间到达
+            time.sleep(0.2)
+            return value
+        return compute
+
+    def run_parallel(self, version, value):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def request():
+            barrier.wait()
+            results.append(get_or_refresh('stats', self.compute(value), version=version, timeout=60))
+
+        threads = [threading.Thread(target=request) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_cold_cache_computes_once(self):
+        results = self.run_parallel(version=1, value='v1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['v1'] * self.THREADS)
+
+    def test_stale_value_served_while_recomputing(self):
+        get_or_refresh('stats', self.compute('v1'), version=1, timeout=60)
+        self.calls = 0
+
+        results = self.run_parallel(version=2, value='v2')
+        self.assertEqual(self.calls, 1)
+        # 取得锁的请求返回新值，其余请求在重新计算期间返回旧值
+        self.assertEqual(sorted(results), ['v1'] * (self.THREADS - 1) + ['v2'])
+        self.assertEqual(get_or_refresh('stats', self.compute('v3'), version=2, timeout=60), 'v2')
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_value_recomputed_once(self):
+        get_or_refresh('stats', self.compute('v1'), version=1, timeout=0)
+        self.calls = 0
+
+        results = self.run_parallel(version=1, value='v2')
+        self.assertEqual(self.calls, 1)
+        self.assertIn('v2', results)
+
+
+class InstrumentedCacheTests(SimpleTestCase):
+    """包装后端的调用转发和按前缀统计。"""
+
+    def setUp(self):
+        metrics.reset()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def make_cache(self):
+        """创建一个包装文件缓存的实例，相当于另一个工作进程中的缓存连接"""
+        return InstrumentedCache('', {'OPTIONS': {'TARGET': {
+            'BACKEND': 'sms_app.cache_backends.AtomicFileBasedCache',
+            'LOCATION': self.cache_dir.name,
+        }}})
+
+    def test_counts_hits_and_misses_per_prefix(self):
+        shared = self.make_cache()
+        self.assertIsNone(shared.get('course_stats:01'))
+        shared.set('course_stats:01', {'count': 3})
+        self.assertEqual(shared.get('course_stats:01'), {'count': 3})
+        self.assertEqual(shared.get('course_stats:01'), {'count': 3})
+        self.assertEqual(shared.get_many(['dashboard:a', 'dashboard:b']), {})
+
+        stats = metrics.snapshot()
+        self.assertEqual(stats['course_stats']['hits'], 2)
+        self.assertEqual(stats['course_stats']['misses'], 1)
+        self.assertEqual(stats['course_stats']['calls'], {'get': 3, 'set': 1})
+        self.assertEqual(stats['course_stats']['hit_rate'], round(2 / 3, 4))
+        self.assertEqual(stats['dashboard']['misses'], 2)
+
+    def test_cached_none_is_a_hit(self):
+        shared = self.make_cache()
+        shared.set('stats:none', None)
+        self.assertEqual(shared.get('stats:none', 'default'), None)
+        self.assertEqual(metrics.snapshot()['stats']['hits'], 1)
+
+    def test_writes_visible_to_other_connections(self):
+        worker_a, worker_b = self.make_cache(), self.make_cache()
+        worker_a.set('stats:shared', 1)
+        self.assertEqual(worker_b.get('stats:shared'), 1)
+        self.assertFalse(worker_b.add('stats:shared', 2))
+        worker_b.delete('stats:shared')
+        self.assertIsNone(worker_a.get('stats:shared'))
+
+    def test_concurrent_add_has_one_winner(self):
+        workers = [AtomicFileBasedCache(self.cache_dir.name, {}) for _ in range(8)]
+        barrier = threading.Barrier(len(workers))
+        results = []
+
+        def add(worker):
+            barrier.wait()
+            results.append(worker.add('stats:lock', 1, 30))
+
+        for _ in range(5):
+            workers[0].delete('stats:lock')
+            results.clear()
+            threads = [threading.Thread(target=add, args=(worker,)) for worker in workers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results.count(True), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RestApiTests(TestCase):
+    """只读接口的字段、筛选、游标分页和每页查询数。"""
+
+    RESOURCES = {
+        'classes': ClassInformation,
+        'students': Student,
+        'courses': Course,
+        'scores': Score,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        scheme = GradingScheme.objects.create(Name='期末为主', RegularWeight=0.2, MidtermWeight=0.2, FinalWeight=0.6)
+        classes = [
+            ClassInformation.objects.create(ClassID=f'C{i}', ClassName=f'{i}班', Grade='2024', ClassAdviser='王')
+            for i in range(3)
+        ]
+        courses = [
+            Course.objects.create(CourseID=f'0{i}', CourseName=f'课程{i}', CourseDescription='', Credits=2,
+                                  Scheme=scheme if i % 2 else None)
+            for i in range(3)
+        ]
+        for i in range(6):
+            student = Student.objects.create(
+                StudentID=f'100{i}', Name=f'学生{i}', Gender='男', Age=18,
+                Class=classes[i % len(classes)], EnrollmentDate=date(2024, 9, 1)
+            )
+            for course in courses:
+                Score.objects.create(Student=student, Course=course, RegularGrade=80, MidtermGrade=70, FinalGrade=60 + i)
+        cls.user = User.objects.create_superuser('api', 'api@example.com', 'api')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, resource, **params):
+        return self.client.get(reverse('rest_list', args=[resource]), params)
+
+    def count_queries(self, resource, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.get(resource, **params)
+        self.assertEqual(response.status_code, 200)
+        table = self.RESOURCES[resource]._meta.db_table
+        return len(context.captured_queries), sum(table in query['sql'] for query in context.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for resource in self.RESOURCES:
+            with self.subTest(resource=resource):
+                small = self.count_queries(resource, limit=1)
+                large = self.count_queries(resource, limit=100)
+                self.assertEqual(small, large)
+                # 关联对象通过 JOIN 取出，每页只查询一次资源表
+                self.assertEqual(large[1], 1)
+
+    def test_cursor_walks_every_row_once(self):
+        expected = list(Score.objects.order_by('-CreatedAt', '-ScoreID').values_list('ScoreID', flat=True))
+        seen, params = [], {'limit': 4, 'fields': 'score_id'}
+        while True:
+            data = self.get('scores', **params).json()
+            seen += [row['score_id'] for row in data['results']]
+            if not data['next_cursor']:
+                break
+            params['after'] = data['next_cursor']
+        self.assertEqual(seen, expected)
+
+        previous = self.get('scores', limit=4, fields='score_id', before=data['previous_cursor']).json()
+        # 18 条成绩每页 4 条，最后一页 2 条，其上一页为第 13-16 条
+        self.assertEqual([row['score_id'] for row in previous['results']], expected[12:16])
+
+    def test_fields_and_filters(self):
+        data = self.get('scores', fields='student_name,course_name,total_grade', student_id='1002').json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(set(data['results'][0]), {'student_name', 'course_name', 'total_grade'})
+        self.assertEqual({row['student_name'] for row in data['results']}, {'学生2'})
+
+        students = self.get('students', class_id='C1', fields='student_id,class_name').json()['results']
+        self.assertEqual(students, [{'student_id': '1004', 'class_name': '1班'}, {'student_id': '1001', 'class_name': '1班'}])
+
+    def test_rejects_unknown_fields_and_unindexed_filters(self):
+        self.assertEqual(self.get('students', fields='password').status_code, 400)
+        self.assertEqual(self.get('students', age='18').status_code, 400)
+        self.assertEqual(self.get('teachers').status_code, 404)
+
+    def test_rejects_invalid_cursor(self):
+        cursor = self.get('scores', limit=4).json()['next_cursor']
+        for params in ({'after': 'garbage'}, {'before': cursor[:-2] + 'xx'}, {'after': cursor + 'x'}):
+            with self.subTest(params=params):
+                response = self.get('scores', **params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': '翻页游标无效'})
+        # 其他资源的游标字段类型不同，同样无效
+        self.assertEqual(self.get('classes', after=cursor).status_code, 400)
+        self.assertEqual(self.get('scores', after=cursor).status_code, 200)
+
+    def test_requires_view_permission(self):
+        self.client.force_login(User.objects.create_user('plain', 'plain@example.com', 'plain'))
+        self.assertEqual(self.get('scores').status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CHANGES_SETTLE_SECONDS=0)
+class ChangesFeedTests(TestCase):
+    """增量同步返回 token 之后的新增、修改和删除。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.klass = ClassInformation.objects.create(ClassID='C1', ClassName='一班', Grade='2024', ClassAdviser='王')
+        cls.course = Course.objects.create(CourseID='01', CourseName='数学', CourseDescription='', Credits=2)
+        cls.students = [
+            Student.objects.create(StudentID=f'100{i}', Name=f'学生{i}', Gender='男', Age=18,
+                                   Class=cls.klass, EnrollmentDate=date(2024, 9, 1))
+            for i in range(3)
+        ]
+        for student in cls.students:
+            Score.objects.create(Student=student, Course=cls.course, RegularGrade=80, MidtermGrade=80, FinalGrade=80)
+        cls.user = User.objects.create_superuser('sync', 'sync@example.com', 'sync')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def sync(self, **params):
+        response = self.client.get(reverse('changes'), params)
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        return lines[:-1], lines[-1]['next_token']
+
+    def test_initial_sync_then_only_changes(self):
+        changes, token = self.sync()
+        self.assertEqual(len(changes), 1 + 1 + 3 + 3)
+        self.assertEqual([change['resource'] for change in changes[:2]], ['classes', 'courses'])
+
+        # 查询集的 update() 也会更新 UpdatedAt
+        Score.objects.filter(Student=self.students[0]).update(FinalGrade=90)
+        deleted_score = Score.objects.get(Student=self.students[1]).pk
+        self.students[1].delete()
+        changes, token = self.sync(since=token)
+        # 删除记录子表在前，变化在删除记录之后
+        self.assertEqual(changes[:2], [
+            {'resource': 'scores', 'op': 'delete', 'id': str(deleted_score)},
+            {'resource': 'students', 'op': 'delete', 'id': '1001'},
+        ])
+        self.assertEqual(len(changes), 3)
+        self.assertEqual(changes[2]['resource'], 'scores')
+        self.assertEqual(changes[2]['data']['student_id'], '1000')
+        self.assertEqual(changes[2]['data']['final_grade'], 90)
+
+        changes, _token = self.sync(since=token)
+        self.assertEqual(changes, [])
+
+    def test_batches_rows_with_equal_timestamps(self):
+        _changes, token = self.sync()
+        # 批量写入的行 UpdatedAt 相同，按 (UpdatedAt, 主键) 分批时不重复也不遗漏
+        Score.objects.update(FinalGrade=70)
+        Tombstone.objects.bulk_create([
+            Tombstone(Resource='courses', ObjectID=str(i), DeletedAt=timezone.now()) for i in range(3)
+        ])
+        with mock.patch('sms_app.changes.CHUNK_SIZE', 2):
+            changes, _token = self.sync(since=token)
+        self.assertEqual([change['id'] for change in changes if change['op'] == 'delete'], ['0', '1', '2'])
+        score_ids = [change['data']['score_id'] for change in changes if change['op'] == 'upsert']
+        self.assertEqual(score_ids, sorted(Score.objects.values_list('pk', flat=True)))
+
+    def test_token_stays_before_open_write_transactions(self):
+        since = make_token(timezone.now() - timedelta(minutes=5))
+        # 模拟 60 秒前开始、30 秒前写入且尚未提交的长事务
+        stamped = timezone.now() - timedelta(seconds=30)
+        Score.objects.filter(Student=self.students[0]).update(FinalGrade=95, UpdatedAt=stamped)
+        with mock.patch('sms_app.changes.oldest_open_write_age', return_value=60.0):
+            changes, token = self.sync(since=since)
+        self.assertEqual(changes, [])
+        self.assertLess(parse_token(token), stamped)
+
+        # 事务提交后，下一次同步从 token 开始能读到它写入的行
+        changes, _token = self.sync(since=token)
+        scores = [change['data'] for change in changes if change['resource'] == 'scores']
+        self.assertIn(('1000', 95), [(score['student_id'], score['final_grade']) for score in scores])
+
+    def test_open_write_age_without_introspection(self):
+        # SQLite 无法查询其他连接的事务，只使用等待时间
+        self.assertEqual(oldest_open_write_age(), 0.0)
+
+    def test_rejects_invalid_and_expired_tokens(self):
+        self.assertEqual(self.client.get(reverse('changes'), {'since': 'garbage'}).status_code, 400)
+        expired = make_token(timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS + 1))
+        self.assertEqual(self.client.get(reverse('changes'), {'since': expired}).status_code, 410)
+        self.assertEqual(self.client.get(reverse('changes'), {'resources': 'teachers'}).status_code, 400)
@@ -4,23 +4,46 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView, DetailView
 from django.contrib.messages.views import SuccessMessageMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
-from django.db.models import Q, Avg, Count
+from django.core.exceptions import PermissionDenied
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
-from django.core.cache import cache
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 import logging
+import os
 from functools import wraps
 import pandas as pd
 from io import BytesIO
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import format_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+from urllib.parse import urlencode
 
-from .models import Student, ClassInformation, Score, Course
+from .models import Student, ClassInformation, Score, Course, Job, DataVersion, StudentSummary
+from .grading import GRADE_LEVELS
 from .forms import StudentForm, ScoreForm
+from .exporters import (
+    CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE, parse_export_columns, stream_scores_csv, write_scores_xlsx
+)
+from .cache_backends import cache_metrics
+from .changes import SYNC_ORDER, TokenExpired, parse_token as parse_changes_token, stream_changes
+from .dashboard import get_snapshot as get_dashboard_snapshot
+from .export_cache import ExportCache
+from .filters import SCORE_SORTS, filter_scores, get_score_filters, order_scores
+from .importers import REQUIRED_COLUMNS
+from .lookups import LOOKUPS, parse_limit
+from .jobs import enqueue_export, enqueue_import, eta_seconds, has_unfinished_import
+from .pagination import COUNT_CACHED, KeysetPaginationMixin
+from .readers import validate_score_file
+from .responses import FastJsonResponse
+from .rest_api import RESOURCES
+from .score_batch import DEFAULT_FIELDS, parse_list, scores_by_student
+from .scorecards import get_scorecard, scorecard_version
+from .search import search_students
+from .stats import get_course_stats
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +113,8 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     """
     显示仪表盘页面的类视图。
 
+    统计数据来自预先计算的快照（见 dashboard 模块），数据变化后在后台刷新。
+
     属性:
         template_name (str): 使用的模板名称。
     """
@@ -100,37 +125,13 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         获取仪表盘页面的上下文数据。
 
         返回:
-            dict: 包含统计数据和缓存信息的上下文字典。
+            dict: 包含统计数据和快照生成时间的上下文字典。
         """
         context = super().get_context_data(**kwargs)
-
-        # 使用缓存获取统计数据
-        cache_key = 'dashboard_stats'
-        stats = cache.get(cache_key)
-
-        if stats is None:
-            # 如果缓存中没有数据，则从数据库中查询并缓存
-            stats = {
-                'total_students': Student.objects.count(),
-                'total_classes': ClassInformation.objects.count(),
-                'total_courses': Course.objects.count(),
-                'recent_students': Student.objects.all().order_by('-CreatedAt')[:5],
-                'recent_scores': Score.objects.all().order_by('-CreatedAt')[:5],
-                'average_scores': Score.objects.aggregate(
-                    avg_regular=Avg('RegularGrade'),
-                    avg_midterm=Avg('MidtermGrade'),
-                    avg_final=Avg('FinalGrade')
-                ),
-                'class_distribution': ClassInformation.objects.annotate(
-                    student_count=Count('student')
-                ).values('ClassName', 'student_count')
-            }
-            cache.set(cache_key, stats, 300)  # 缓存5分钟
-
-        context.update(stats)
+        context.update(get_dashboard_snapshot())
         return context
 
-class StudentListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class StudentListView(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     """
     显示学生列表的类视图。
 
@@ -140,16 +141,20 @@ class StudentListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         context_object_name (str): 上下文中使用的变量名。
         paginate_by (int): 每页显示的学生数量。
         permission_required (str): 所需权限。
+        keyset_ordering (tuple): 键集分页使用的排序字段。
     """
     model = Student
-    template_name = 'students/list.html'
+    template_name = 'sms_app/student_list.html'
     context_object_name = 'students'
     paginate_by = 10
     permission_required = 'sms_app.view_student'
+    keyset_ordering = ('-CreatedAt', '-StudentID')
+    keyset_count = COUNT_CACHED
+    keyset_count_depends_on = (Student, ClassInformation)
 
     def get_queryset(self):
         """
-        获取学生查询集，支持按名称、学号或班级名称搜索。
+        获取学生查询集，支持按姓名、班级名称或学号前缀搜索。
 
         返回:
             QuerySet: 过滤后的学生查询集。
@@ -157,11 +162,8 @@ class StudentListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         queryset = Student.objects.select_related('Class')
         search_query = self.request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
-                Q(Name__icontains=search_query) |
-                Q(StudentID__icontains=search_query) |
-                Q(Class__ClassName__icontains=search_query)
-            )
+            # 使用数据库的全文索引搜索，见 search 模块
+            queryset = search_students(queryset, search_query)
         return queryset
 
     def get_context_data(self, **kwargs):
@@ -204,7 +206,6 @@ class StudentCreateView(LoginRequiredMixin, PermissionRequiredMixin, SuccessMess
         try:
             response = super().form_valid(form)
             logger.info(f"Student {form.instance.Name} added successfully")
-            cache.delete('dashboard_stats')  # 清除缓存
             return response
         except Exception as e:
             logger.error(f"Error adding student: {str(e)}")
@@ -240,7 +241,6 @@ class StudentUpdateView(LoginRequiredMixin, PermissionRequiredMixin, SuccessMess
         try:
             response = super().form_valid(form)
             logger.info(f"Student {form.instance.Name} updated successfully")
-            cache.delete('dashboard_stats')  # 清除缓存
             return response
         except Exception as e:
             logger.error(f"Error updating student: {str(e)}")
@@ -272,14 +272,13 @@ class StudentDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView)
         try:
             response = super().delete(request, *args, **kwargs)
             logger.info(f"Student {self.object.Name} deleted successfully")
-            cache.delete('dashboard_stats')  # 清除缓存
             return response
         except Exception as e:
             logger.error(f"Error deleting student: {str(e)}")
             messages.error(request, "删除学生失败，请重试")
             return redirect('student_list')
 
-class ScoreListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class ScoreListView(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     """
     显示成绩列表的类视图。
 
@@ -289,41 +288,50 @@ class ScoreListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         context_object_name (str): 上下文中使用的变量名。
         paginate_by (int): 每页显示的成绩数量。
         permission_required (str): 所需权限。
+        keyset_ordering (tuple): 默认排序时键集分页使用的排序字段，按总成绩排序时使用 SCORE_SORTS 中的字段。
     """
     model = Score
     template_name = 'scores/list.html'
     context_object_name = 'scores'
     paginate_by = 10
     permission_required = 'sms_app.view_score'
+    keyset_ordering = ('-CreatedAt', '-ScoreID')
+    keyset_count = COUNT_CACHED
+    keyset_count_depends_on = (Score, Student)
 
     def get_queryset(self):
         """
-        获取成绩查询集，支持按学生ID或课程ID过滤。
+        获取成绩查询集，支持按学生、课程、班级和成绩等级过滤，以及按总成绩排序。
 
         返回:
             QuerySet: 过滤后的成绩查询集。
         """
         queryset = Score.objects.select_related('Student', 'Course')
-        student_id = self.request.GET.get('student_id')
-        course_id = self.request.GET.get('course_id')
-
-        if student_id:
-            queryset = queryset.filter(Student__StudentID=student_id)
-        if course_id:
-            queryset = queryset.filter(Course__CourseID=course_id)
-
-        return queryset
+        queryset = filter_scores(queryset, get_score_filters(self.request.GET))
+        return order_scores(queryset, self.request.GET.get('sort'))
 
     def get_context_data(self, **kwargs):
         """
         获取成绩列表页面的上下文数据。
 
         返回:
-            dict: 包含学生和课程信息的上下文字典。
+            dict: 包含筛选条件、当前选中的学生、课程和班级等信息的上下文字典。
         """
         context = super().get_context_data(**kwargs)
-        context['students'] = Student.objects.all()
-        context['courses'] = Course.objects.all()
+        context['grade_levels'] = GRADE_LEVELS
+        # 当前筛选条件，用于分页和导出链接
+        context['score_filters'] = get_score_filters(self.request.GET)
+        # 学生、课程、班级筛选框通过查找接口加载选项，这里只查询当前选中的对象
+        for name, model in (('student', Student), ('course', Course), ('class', ClassInformation)):
+            pk = context['score_filters'].get(f'{name}_id')
+            context[f'selected_{name}'] = model.objects.filter(pk=pk).first() if pk else None
+        context['filter_query'] = urlencode(context['score_filters'])
+        sort = self.request.GET.get('sort')
+        context['sort'] = sort if sort in SCORE_SORTS else ''
+        # 刚提交的后台任务，页面据此轮询任务进度
+        job_id = self.request.GET.get('job')
+        if job_id and job_id.isdigit():
+            context['job'] = Job.objects.filter(pk=job_id, CreatedBy=self.request.user).first()
         return context
 
 class ScoreCreateView(LoginRequiredMixin, PermissionRequiredMixin, SuccessMessageMixin, CreateView):
@@ -355,7 +363,6 @@ class ScoreCreateView(LoginRequiredMixin, PermissionRequiredMixin, SuccessMessag
         try:
             response = super().form_valid(form)
             logger.info(f"Score for {form.instance.Student.Name} added successfully")
-            cache.delete('dashboard_stats')  # 清除缓存
             return response
         except Exception as e:
             logger.error(f"Error adding score: {str(e)}")
@@ -391,7 +398,6 @@ class ScoreUpdateView(LoginRequiredMixin, PermissionRequiredMixin, SuccessMessag
         try:
             response = super().form_valid(form)
             logger.info(f"Score for {form.instance.Student.Name} updated successfully")
-            cache.delete('dashboard_stats')  # 清除缓存
             return response
         except Exception as e:
             logger.error(f"Error updating score: {str(e)}")
@@ -423,7 +429,6 @@ class ScoreDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
         try:
             response = super().delete(request, *args, **kwargs)
             logger.info(f"Score for {self.object.Student.Name} deleted successfully")
-            cache.delete('dashboard_stats')  # 清除缓存
             return response
         except Exception as e:
             logger.error(f"Error deleting score: {str(e)}")
@@ -436,28 +441,225 @@ def get_student_scores(request, student_id):
     """
     获取指定学生的成绩数据并返回JSON响应。
 
+    编码后的成绩单按该学生的成绩版本缓存，响应带 ETag，
+    客户端携带 If-None-Match 重新验证且成绩没有变化时返回 304。
+
     参数:
         request (HttpRequest): HTTP请求对象。
         student_id (str): 学生的唯一标识符。
 
     返回:
-        JsonResponse: 包含成绩数据的JSON响应。
+        HttpResponse: 包含成绩数据的JSON响应或 304 响应。
     """
     try:
-        scores = Score.objects.filter(Student__StudentID=student_id).select_related('Course')
-        data = [{
-            'course_name': score.Course.CourseName,
-            'regular_grade': score.RegularGrade,
-            'midterm_grade': score.MidtermGrade,
-            'final_grade': score.FinalGrade,
-            'total_grade': score.total_grade,
-            'grade_level': score.grade_level
-        } for score in scores]
-        return JsonResponse({'scores': data})
+        version = scorecard_version(student_id)
+        etag = quote_etag(f'scorecard-{version}')
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = HttpResponse(get_scorecard(student_id, version), content_type='application/json')
+        response['ETag'] = etag
+        # 客户端可以保存响应，但每次使用前需要重新验证
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
     except Exception as e:
         logger.error(f"Error getting student scores: {str(e)}")
         return JsonResponse({'error': '获取成绩失败'}, status=500)
 
+@require_http_methods(["GET"])
+@login_required
+@permission_required('sms_app.view_score', raise_exception=True)
+def get_scores_batch_api(request):
+    """
+    批量获取多个学生的成绩数据，按学生分组返回。
+
+    参数:
+        request (HttpRequest): HTTP请求对象，student_ids 为逗号分隔的学号，或 class_id 为班级编号；
+            fields 为可选的逗号分隔字段列表，见 score_batch.SCORE_FIELDS。
+
+    返回:
+        HttpResponse: {'students': {学号: [成绩, ...]}} 的JSON响应；参数无效时返回 400。
+    """
+    student_ids = parse_list(request.GET.get('student_ids'))
+    class_id = request.GET.get('class_id', '').strip() or None
+    if not student_ids and class_id is None:
+        return JsonResponse({'error': '请提供 student_ids 或 class_id'}, status=400)
+    fields = parse_list(request.GET.get('fields')) or DEFAULT_FIELDS
+    try:
+        grouped = scores_by_student(student_ids=student_ids, class_id=class_id, fields=fields)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return FastJsonResponse({'students': grouped})
+
+@require_http_methods(["GET"])
+@login_required
+@permission_required('sms_app.view_score', raise_exception=True)
+def get_course_stats_api(request, course_id):
+    """
+    获取课程成绩统计的JSON数据。
+
+    参数:
+        request (HttpRequest): HTTP请求对象。
+        course_id (str): 课程编号。
+
+    返回:
+        JsonResponse: 包含人数、均值、标准差、最高/最低分、百分位、分数段、等级分布和学生排名的JSON响应。
+    """
+    course = get_object_or_404(Course, CourseID=course_id)
+    return JsonResponse(get_course_stats(course))
+
+@require_http_methods(["GET"])
+@login_required
+@permission_required('sms_app.view_score', raise_exception=True)
+def get_class_ranking_api(request, class_id):
+    """
+    获取班级排行榜的JSON数据。
+
+    排行榜直接读取学生成绩汇总表，按 (班级, 班级排名) 索引一次查询得到。
+
+    参数:
+        request (HttpRequest): HTTP请求对象。
+        class_id (str): 班级编号。
+
+    返回:
+        JsonResponse: 包含按班级排名排列的学生学分加权平均分、学分绩点、课程数和排名的JSON响应。
+    """
+    class_information = get_object_or_404(ClassInformation, ClassID=class_id)
+    summaries = (
+        StudentSummary.objects.filter(Class=class_information)
+        .order_by('ClassRank', 'Student_id')
+        .values(
+            'Student_id', 'Student__Name', 'CourseCount', 'TotalCredits',
+            'WeightedAverage', 'GPA', 'ClassRank', 'GradeRank',
+        )
+    )
+    data = [{
+        'student_id': summary['Student_id'],
+        'name': summary['Student__Name'],
+        'course_count': summary['CourseCount'],
+        'total_credits': summary['TotalCredits'],
+        'weighted_average': summary['WeightedAverage'],
+        'gpa': summary['GPA'],
+        'class_rank': summary['ClassRank'],
+        'grade_rank': summary['GradeRank'],
+    } for summary in summaries]
+    return JsonResponse({
+        'class_id': class_information.ClassID,
+        'class_name': class_information.ClassName,
+        'grade': class_information.Grade,
+        'ranking': data,
+    })
+
+@require_http_methods(["GET"])
+@login_required
+def lookup_api(request, kind):
+    """
+    下拉框远程查找的JSON接口，按编号或名称的开头部分查找学生、课程或班级。
+
+    参数:
+        request (HttpRequest): HTTP请求对象，q 为搜索词，limit 为最多返回条数（不超过 50）。
+        kind (str): 查找类型，students、courses 或 classes。
+
+    返回:
+        JsonResponse: {'results': [{'id': 编号, 'text': 显示文本}]}。
+
+    异常:
+        Http404: 查找类型不存在。
+        PermissionDenied: 没有查看该类对象的权限。
+    """
+    lookup = LOOKUPS.get(kind)
+    if lookup is None:
+        raise Http404
+    if not request.user.has_perm(lookup.permission):
+        raise PermissionDenied
+    query = request.GET.get('q', '')
+    return JsonResponse({'results': lookup.cached_search(query, parse_limit(request.GET.get('limit')))})
+
+@require_http_methods(["GET"])
+@login_required
+def rest_list_api(request, resource):
+    """
+    只读JSON接口，按游标分页读取班级、学生、课程或成绩，见 rest_api 模块。
+
+    参数:
+        request (HttpRequest): HTTP请求对象，fields 为逗号分隔的字段，limit 为每页行数（不超过 1000），
+            after / before 为上一次响应中的 next_cursor / previous_cursor，其余参数为筛选条件。
+        resource (str): 资源名称，classes、students、courses 或 scores。
+
+    返回:
+        HttpResponse: {'results': [...], 'next_cursor': ..., 'previous_cursor': ...}；参数无效时返回 400。
+
+    异常:
+        Http404: 资源不存在。
+        PermissionDenied: 没有查看该资源的权限。
+    """
+    api_resource = RESOURCES.get(resource)
+    if api_resource is None:
+        raise Http404
+    if not request.user.has_perm(api_resource.permission):
+        raise PermissionDenied
+    try:
+        return FastJsonResponse(api_resource.page(request.GET))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@require_http_methods(["GET"])
+@login_required
+def changes_api(request):
+    """
+    增量同步接口，以 NDJSON 流返回 since 之后新增、修改和删除的数据，见 changes 模块。
+
+    参数:
+        request (HttpRequest): HTTP请求对象，since 为上次同步返回的 next_token（首次同步不传），
+            resources 为逗号分隔的资源名称，默认为 classes、courses、students、scores 全部。
+
+    返回:
+        StreamingHttpResponse: NDJSON 响应；参数无效时返回 400，token 过期时返回 410。
+
+    异常:
+        PermissionDenied: 没有查看所请求资源的权限。
+    """
+    resources = parse_list(request.GET.get('resources')) or list(SYNC_ORDER)
+    unknown = [name for name in resources if name not in RESOURCES]
+    if unknown:
+        return JsonResponse({'error': f'无法识别的资源: {", ".join(unknown)}'}, status=400)
+    if not all(request.user.has_perm(RESOURCES[name].permission) for name in resources):
+        raise PermissionDenied
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_changes_token(request.GET['since'])
+        except TokenExpired as e:
+            return JsonResponse({'error': str(e)}, status=410)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return StreamingHttpResponse(stream_changes(since, resources), content_type='application/x-ndjson')
+
+class CourseStatsView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+    """
+    显示课程成绩统计的类视图。
+
+    属性:
+        model (Model): 使用的课程模型。
+        template_name (str): 使用的模板名称。
+        permission_required (str): 所需权限。
+    """
+    model = Course
+    template_name = 'scores/course_stats.html'
+    context_object_name = 'course'
+    permission_required = 'sms_app.view_score'
+
+    def get_context_data(self, **kwargs):
+        """
+        获取课程统计页面的上下文数据。
+
+        返回:
+            dict: 包含课程统计数据的上下文字典。
+        """
+        context = super().get_context_data(**kwargs)
+        context['stats'] = get_course_stats(self.object)
+        return context
+
 class UserProfileView(LoginRequiredMixin, TemplateView):
     """
     显示用户个人资料页面的类视图。
@@ -493,40 +695,63 @@ class UserProfileView(LoginRequiredMixin, TemplateView):
         return context
 
 def export_scores(request):
-    """导出成绩数据到Excel"""
+    """
+    导出成绩数据到Excel，format=csv 时以流式CSV导出。
+
+    支持与成绩列表相同的筛选参数（student_id、course_id、class_id、grade_level），
+    以及 columns 参数指定导出列，过滤和列选择都在数据库查询中完成。
+    生成的文件按 (导出参数, 数据版本号) 缓存在磁盘上，并返回 ETag/Last-Modified，
+    数据没有变化时重复下载直接返回缓存文件或 304。
+    """
     try:
-        # 获取所有成绩数据
-        scores = Score.objects.select_related('Student', 'Course').all()
-        
-        # 创建DataFrame
-        data = []
-        for score in scores:
-            data.append({
-                '学号': score.Student.StudentID,
-                '姓名': score.Student.Name,
-                '课程编号': score.Course.CourseID,
-                '课程名称': score.Course.CourseName,
-                '平时成绩': score.RegularGrade,
-                '期中成绩': score.MidtermGrade,
-                '期末成绩': score.FinalGrade,
-                '总成绩': score.total_grade,
-                '等级': score.grade_level
-            })
-        
-        df = pd.DataFrame(data)
-        
-        # 创建Excel文件
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='成绩表')
-        
-        # 设置响应头
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename=scores.xlsx'
-        
+        columns = parse_export_columns(request.GET.getlist('columns'))
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('score_list')
+    filters = get_score_filters(request.GET)
+    fmt = 'csv' if request.GET.get('format') == 'csv' else 'xlsx'
+    content_type = CSV_CONTENT_TYPE if fmt == 'csv' else XLSX_CONTENT_TYPE
+
+    try:
+        version, changed_at = DataVersion.current(DataVersion.SCORES)
+        export_cache = ExportCache()
+        key = export_cache.make_key(fmt, filters, columns, version)
+        etag = quote_etag(key)
+        last_modified = int(changed_at.timestamp())
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cached_path = export_cache.get(key, fmt)
+        queryset = filter_scores(Score.objects.all(), filters)
+        if cached_path is not None:
+            response = FileResponse(
+                open(cached_path, 'rb'), as_attachment=True,
+                filename=f'scores.{fmt}', content_type=content_type
+            )
+        elif fmt == 'csv':
+            # 边查询边输出，首字节时间和内存占用与成绩表大小无关，同时写入缓存
+            response = StreamingHttpResponse(
+                export_cache.tee(key, fmt, version, stream_scores_csv(queryset, columns)),
+                content_type=content_type
+            )
+            response['Content-Disposition'] = 'attachment; filename=scores.csv'
+        else:
+            # 分批写入缓存目录中的文件，再以文件流返回
+            output = export_cache.build(
+                key, fmt, version,
+                lambda output: write_scores_xlsx(output, queryset=queryset, columns=columns)
+            )
+            response = FileResponse(
+                output, as_attachment=True,
+                filename='scores.xlsx', content_type=content_type
+            )
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # 浏览器可以保存文件，但每次使用前需要重新验证
+        patch_cache_control(response, private=True, no_cache=True)
         return response
     except Exception as e:
         logger.error(f"Error exporting scores: {str(e)}")
@@ -536,14 +761,17 @@ def export_scores(request):
 def download_template(request):
     """下载成绩导入模板"""
     try:
+        # CSV模板：带BOM以便Excel正确识别中文表头
+        if request.GET.get('format') == 'csv':
+            response = HttpResponse(
+                '\ufeff' + ','.join(REQUIRED_COLUMNS) + '\r\n',
+                content_type='text/csv; charset=utf-8'
+            )
+            response['Content-Disposition'] = 'attachment; filename=score_template.csv'
+            return response
+
         # 创建模板DataFrame
-        template_data = {
-            '学号': [],
-            '课程编号': [],
-            '平时成绩': [],
-            '期中成绩': [],
-            '期末成绩': []
-        }
+        template_data = {column: [] for column in REQUIRED_COLUMNS}
         df = pd.DataFrame(template_data)
         
         # 创建Excel文件
@@ -552,10 +780,7 @@ def download_template(request):
             df.to_excel(writer, index=False, sheet_name='成绩导入模板')
         
         # 设置响应头
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        response = HttpResponse(output.getvalue(), content_type=XLSX_CONTENT_TYPE)
         response['Content-Disposition'] = 'attachment; filename=score_template.xlsx'
         
         return response
@@ -567,87 +792,116 @@ def download_template(request):
 @login_required
 @permission_required('sms_app.add_score')
 def import_scores(request):
-    """导入成绩数据"""
+    """提交成绩导入任务，由后台工作进程执行"""
     if request.method == 'POST':
         try:
             # 获取上传的文件
-            excel_file = request.FILES['score_file']
+            score_file = request.FILES['score_file']
             
-            # 读取Excel文件，确保课程编号列以字符串形式读取
-            df = pd.read_excel(excel_file, dtype={'课程编号': str})
-            
-            # 验证必要的列是否存在
-            required_columns = ['学号', '课程编号', '平时成绩', '期中成绩', '期末成绩']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                messages.error(request, f'Excel文件缺少以下列：{", ".join(missing_columns)}')
+            # 提交任务前先校验文件格式和表头，尽早向用户反馈
+            try:
+                validate_score_file(score_file, score_file.name)
+            except ValueError as e:
+                messages.error(request, str(e))
                 return redirect('score_list')
             
-            # 导入数据
-            success_count = 0
-            error_count = 0
-            error_details = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # 验证数据
-                    student_id = str(row['学号']).strip()
-                    course_id = str(row['课程编号']).strip()
-                    
-                    # 检查学号是否存在
-                    if not Student.objects.filter(StudentID=student_id).exists():
-                        raise ValueError(f'学号 {student_id} 不存在')
-                    
-                    # 检查课程编号是否存在
-                    if not Course.objects.filter(CourseID=course_id).exists():
-                        # 尝试补零后再检查
-                        course_id = course_id.zfill(2)  # 补零到2位
-                        if not Course.objects.filter(CourseID=course_id).exists():
-                            raise ValueError(f'课程编号 {row["课程编号"]} 不存在')
-                    
-                    # 验证成绩数据
-                    try:
-                        regular_grade = float(row['平时成绩'])
-                        midterm_grade = float(row['期中成绩'])
-                        final_grade = float(row['期末成绩'])
-                    except ValueError:
-                        raise ValueError('成绩必须是数字')
-                    
-                    # 验证成绩范围
-                    if not all(0 <= grade <= 100 for grade in [regular_grade, midterm_grade, final_grade]):
-                        raise ValueError('成绩必须在0-100之间')
-                    
-                    student = Student.objects.get(StudentID=student_id)
-                    course = Course.objects.get(CourseID=course_id)
-                    
-                    # 创建或更新成绩记录
-                    score, created = Score.objects.update_or_create(
-                        Student=student,
-                        Course=course,
-                        defaults={
-                            'RegularGrade': regular_grade,
-                            'MidtermGrade': midterm_grade,
-                            'FinalGrade': final_grade
-                        }
-                    )
-                    success_count += 1
-                except ValueError as e:
-                    error_details.append(f'第{index + 2}行: {str(e)}')
-                    error_count += 1
-                except Exception as e:
-                    error_details.append(f'第{index + 2}行: 未知错误 - {str(e)}')
-                    error_count += 1
-            
-            # 显示导入结果
-            if success_count > 0:
-                messages.success(request, f"成功导入 {success_count} 条成绩记录")
-            if error_count > 0:
-                error_message = f"有 {error_count} 条记录导入失败：\n" + "\n".join(error_details)
-                messages.warning(request, error_message)
-            
-            return redirect('score_list')
+            job = enqueue_import(score_file, request.user, dry_run=bool(request.POST.get('dry_run')))
+            messages.info(request, f"已提交导入任务 #{job.pk}，完成后将在此页面显示结果")
+            if not job.Params.get('dry_run') and has_unfinished_import(job.FileHash):
+                messages.info(request, "检测到该文件有未完成的导入，将跳过已提交的部分，从中断处继续")
+            return redirect(f"{reverse('score_list')}?job={job.pk}")
         except Exception as e:
             logger.error(f"Error importing scores: {str(e)}")
             messages.error(request, f'导入成绩失败：{str(e)}')
             return redirect('score_list')
     return redirect('score_list')
+
+@login_required
+@require_http_methods(["POST"])
+def export_scores_job(request):
+    """提交成绩导出任务，由后台工作进程按当前筛选条件生成Excel文件"""
+    try:
+        columns = parse_export_columns(request.POST.getlist('columns'))
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('score_list')
+    job = enqueue_export(request.user, filters=get_score_filters(request.POST), columns=columns)
+    messages.info(request, f"已提交导出任务 #{job.pk}，完成后可在此页面下载")
+    return redirect(f"{reverse('score_list')}?job={job.pk}")
+
+@require_http_methods(["GET"])
+@login_required
+def cache_metrics_api(request):
+    """
+    返回当前进程的缓存统计JSON数据，仅管理员可查看。
+
+    返回:
+        JsonResponse: 包含进程号、缓存后端以及按缓存键前缀统计的命中、未命中次数和耗时。
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse(cache_metrics())
+
+def _get_user_job(request, pk):
+    """获取当前用户可查看的任务，管理员可查看全部任务"""
+    jobs = Job.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(CreatedBy=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+@require_http_methods(["GET"])
+@login_required
+def job_status(request, pk):
+    """
+    返回后台任务进度的JSON数据，供成绩列表页面轮询。
+
+    参数:
+        request (HttpRequest): HTTP请求对象。
+        pk (int): 任务编号。
+
+    返回:
+        JsonResponse: 包含状态、已处理行数、错误信息和预计剩余时间的JSON响应。
+    """
+    job = _get_user_job(request, pk)
+    return JsonResponse({
+        'id': job.pk,
+        'kind': job.Kind,
+        'status': job.Status,
+        'status_display': job.get_Status_display(),
+        'finished': job.is_finished,
+        'total_rows': job.TotalRows,
+        'processed_rows': job.ProcessedRows,
+        'success_count': job.SuccessCount,
+        'error_count': job.ErrorCount,
+        'errors': job.Errors,
+        'message': job.Message,
+        'eta_seconds': eta_seconds(job),
+        'download_url': reverse('job_download', args=[job.pk]) if job.ResultFile else None,
+        'error_report_url': reverse('job_error_report', args=[job.pk]) if job.ErrorFile else None,
+    })
+
+@require_http_methods(["GET"])
+@login_required
+def job_download(request, pk):
+    """下载后台任务生成的结果文件"""
+    job = _get_user_job(request, pk)
+    if not job.ResultFile:
+        raise Http404(_('结果文件不存在'))
+    return FileResponse(
+        job.ResultFile.open('rb'),
+        as_attachment=True,
+        filename=os.path.basename(job.ResultFile.name)
+    )
+
+@require_http_methods(["GET"])
+@login_required
+def job_error_report(request, pk):
+    """下载导入任务的错误报告"""
+    job = _get_user_job(request, pk)
+    if not job.ErrorFile:
+        raise Http404(_('错误报告不存在'))
+    return FileResponse(
+        job.ErrorFile.open('rb'),
+        as_attachment=True,
+        filename=os.path.basename(job.ErrorFile.name)
+    )
@@ -0,0 +1,43 @@
+"""
+表单控件。
+"""
+from django import forms
+from django.urls import reverse
+
+
+class RemoteSelect(forms.Select):
+    """
+    通过查找接口加载选项的下拉框，用于 ModelChoiceField。
+
+    渲染时只查询当前选中的对象，不列出整张表；页面脚本（base.html）在下拉框前
+    添加输入框，按输入内容请求 ``/api/lookup/<lookup>/`` 并替换选项。
+    表单校验由 ModelChoiceField 按提交的主键查询一条记录。
+
+    参数:
+        lookup (str): sms_app.lookups.LOOKUPS 中的查找名称。
+        attrs (dict): 额外的 HTML 属性。
+    """
+
+    def __init__(self, lookup, attrs=None):
+        super().__init__(attrs)
+        self.lookup = lookup
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-lookup-url'] = reverse('lookup', args=[self.lookup])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        selected = [item for item in value if item not in ('', None)]
+        choices = []
+        if iterator.field.empty_label is not None:
+            choices.append(('', iterator.field.empty_label))
+        if selected:
+            choices += [iterator.choice(obj) for obj in iterator.queryset.filter(pk__in=selected)]
+        # 临时替换为只含选中项的选项列表，其余渲染逻辑沿用 Select
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
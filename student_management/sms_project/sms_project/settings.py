@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 from django.utils.translation import gettext_lazy as _
 
@@ -152,6 +153,10 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 导出文件缓存目录及总大小上限（字节），超出后淘汰最久未使用的文件
+EXPORT_CACHE_DIR = BASE_DIR / 'export_cache'
+EXPORT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -165,10 +170,42 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 
 # Cache
+# 所有 Web 进程和 run_jobs 工作进程共享同一个缓存，任一进程写入或删除的缓存对其他进程立即可见。
+# 设置 REDIS_URL（如 redis://127.0.0.1:6379/1）时使用 Redis，否则使用本机文件缓存（同一台机器上的进程共享）。
+# 缓存的重新计算锁依赖原子的 add()：文件缓存用文件锁实现，只在同一台机器上有效，
+# Web 进程或工作进程分布在多台机器上时必须设置 REDIS_URL。
+# 运行测试时使用进程内缓存，不写入缓存目录，也不连接 Redis。
+# 实际后端由 InstrumentedCache 包装，按缓存键前缀统计命中率和耗时，见 /api/cache/metrics/。
+REDIS_URL = os.environ.get('REDIS_URL', '')
+TESTING = sys.argv[1:2] == ['test']
+if TESTING:
+    CACHE_TARGET = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sms-tests',
+    }
+elif REDIS_URL:
+    CACHE_TARGET = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    }
+else:
+    CACHE_TARGET = {
+        'BACKEND': 'sms_app.cache_backends.AtomicFileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'sms_app.cache_backends.InstrumentedCache',
+        'OPTIONS': {
+            'TARGET': CACHE_TARGET,
+        },
     }
 }
 
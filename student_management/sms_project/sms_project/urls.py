@@ -52,14 +52,38 @@ urlpatterns = [
     path('scores/<int:pk>/update/', views.ScoreUpdateView.as_view(), name='update_score'),
     # 删除成绩界面URL
     path('scores/<int:pk>/delete/', views.ScoreDeleteView.as_view(), name='delete_score'),
+    # 批量获取学生成绩的API接口URL（须在单个学生的URL之前）
+    path('api/scores/batch/', views.get_scores_batch_api, name='get_scores_batch'),
     # 获取学生成绩的API接口URL
     path('api/scores/<str:student_id>/', views.get_student_scores, name='get_student_scores'),
+    # 课程成绩统计界面URL
+    path('courses/<str:pk>/stats/', views.CourseStatsView.as_view(), name='course_stats'),
+    # 获取课程成绩统计的API接口URL
+    path('api/courses/<str:course_id>/stats/', views.get_course_stats_api, name='get_course_stats'),
+    # 获取班级排行榜的API接口URL
+    path('api/classes/<str:class_id>/ranking/', views.get_class_ranking_api, name='get_class_ranking'),
+    # 下拉框远程查找的API接口URL
+    path('api/lookup/<str:kind>/', views.lookup_api, name='lookup'),
+    # 增量同步的API接口URL（须在只读数据API之前）
+    path('api/v1/changes/', views.changes_api, name='changes'),
+    # 只读数据API接口URL
+    path('api/v1/<str:resource>/', views.rest_list_api, name='rest_list'),
     # 成绩导出界面URL
     path('scores/export/', views.export_scores, name='export_scores'),
     # 成绩导入界面URL
     path('scores/import/', views.import_scores, name='import_scores'),
     # 成绩模板下载界面URL
     path('scores/template/', views.download_template, name='download_template'),
+    # 提交后台成绩导出任务URL
+    path('scores/export/job/', views.export_scores_job, name='export_scores_job'),
+    # 缓存命中率统计API接口URL
+    path('api/cache/metrics/', views.cache_metrics_api, name='cache_metrics'),
+    # 后台任务进度查询API接口URL
+    path('jobs/<int:pk>/', views.job_status, name='job_status'),
+    # 后台任务结果文件下载URL
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
+    # 导入任务错误报告下载URL
+    path('jobs/<int:pk>/errors/', views.job_error_report, name='job_error_report'),
     # 首页界面URL
     path('', views.DashboardView.as_view(), name='dashboard'),
 ]